@@ -0,0 +1,160 @@
+"""Teste de estresse dos caixas concorrentes: várias threads vendem e repõem poucos produtos muito
+disputados (e alguns frios) e, no fim, confere a conservação do estoque: para cada produto,
+estoque inicial + reposições - unidades vendidas = estoque final, sem nunca ficar negativo.
+Depois, uma thread de consultas roda contra outra que cadastra e remove produtos, e nenhuma
+consulta pode falhar por ler um índice no meio de uma alteração.
+
+Uso: python -m benchmarks.concurrency [threads] [operações por thread]
+"""
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, date, timedelta
+from uuid import uuid4
+from models import Product
+from repositories import repository, sales_repository, ProductQuery
+from services import add_product, sell_products, restock_product
+from utils import ValidationError
+
+HOT_PRODUCTS = 4
+COLD_PRODUCTS = 60
+INITIAL_STOCK = 200
+SELLER = "Caixa Teste"
+BUYER_CPF = "52998224725"
+
+def yielding_getter(getter):
+  """Cede o GIL logo depois da leitura, alargando a janela entre ler e gravar o estoque"""
+  def get(self):
+    value = getter(self)
+    time.sleep(0)
+    return value
+  return get
+
+def worker(seed: int, operations: int, barcodes: list[str], restocked: Counter, rejected: list[int], lock: threading.Lock):
+  rng = random.Random(seed)
+  local_restocked = Counter()
+  local_rejected = 0
+  for _ in range(operations):
+    # Três em cada quatro operações mexem nos produtos disputados
+    pool = barcodes[:HOT_PRODUCTS] if rng.random() < 0.75 else barcodes[HOT_PRODUCTS:]
+    if rng.random() < 0.3:
+      barcode, quantity = rng.choice(pool), rng.randint(1, 20)
+      restock_product(barcode, quantity)
+      local_restocked[barcode] += quantity
+      continue
+    items = [(barcode, rng.randint(1, 5)) for barcode in rng.sample(pool, rng.randint(1, 2))]
+    try:
+      sell_products(items, SELLER, BUYER_CPF)
+    except ValidationError:
+      local_rejected += 1
+  with lock:
+    restocked.update(local_restocked)
+    rejected.append(local_rejected)
+
+def run(threads: int = 16, operations: int = 2000):
+  now = datetime.now()
+  barcodes = [str(7891000000000 + i) for i in range(HOT_PRODUCTS + COLD_PRODUCTS)]
+  for barcode in barcodes:
+    add_product(barcode, f"Produto {barcode}", "Teste de estresse", 9.9, "Marca", INITIAL_STOCK, False, now=now)
+
+  restocked: Counter = Counter()
+  rejected: list[int] = []
+  lock = threading.Lock()
+  # Sem isso, o GIL quase nunca troca de thread entre a leitura e a gravação do estoque e
+  # um código sem sincronização passaria no teste por sorte
+  get_quantity = Product.get_quantity
+  Product.get_quantity = yielding_getter(get_quantity)
+  start = time.perf_counter()
+  workers = [
+    threading.Thread(target=worker, args=(seed, operations, barcodes, restocked, rejected, lock))
+    for seed in range(threads)
+  ]
+  for thread in workers:
+    thread.start()
+  for thread in workers:
+    thread.join()
+  elapsed = time.perf_counter() - start
+  Product.get_quantity = get_quantity
+
+  sold = Counter()
+  for sale in sales_repository.list_sales():
+    for item in sale.get_items():
+      sold[item.get_barcode()] += item.get_quantity()
+
+  errors = []
+  for barcode in barcodes:
+    product = repository.get_product_by_barcode(barcode)
+    expected = INITIAL_STOCK + restocked[barcode] - sold[barcode]
+    if product.get_quantity() != expected or product.get_quantity() < 0:
+      errors.append(f"{barcode}: estoque {product.get_quantity()}, esperado {expected}")
+  if not repository.check_indexes():
+    errors.append("índices inconsistentes com o estoque")
+
+  total = threads * operations
+  print(f"{threads} threads x {operations} operações em {elapsed:.2f}s ({total / elapsed:.0f} op/s)")
+  print(f"{len(sales_repository.list_sales())} vendas, {sum(rejected)} recusadas por falta de estoque")
+  for error in errors:
+    print(f"ERRO {error}")
+  print("estoque conservado" if not errors else "estoque NÃO conservado")
+  return not errors
+
+def churn(operations: int, stop: threading.Event, seed: int):
+  """Cadastra e remove produtos perecíveis, mexendo em todos os índices do repositório"""
+  rng = random.Random(seed)
+  now = datetime.now()
+  live = []
+  for i in range(operations):
+    if live and rng.random() < 0.5:
+      repository.remove_product(live.pop(rng.randrange(len(live))))
+      continue
+    product = Product(
+      uuid4(), f"Leite Churn {i}", "Teste de leitura", rng.uniform(1, 50), "Marca Churn", rng.randint(0, 30),
+      str(7892000000000 + i), now, now, True, date.today() + timedelta(days=rng.randint(-10, 60)),
+    )
+    repository.insert_product(product)
+    live.append(product.get_id())
+  stop.set()
+
+def read(stop: threading.Event, failures: list[str]):
+  queries = [
+    lambda: repository.find_products(max_quantity=10, is_perishable=True),
+    lambda: repository.search_by_name("leite churn", 20),
+    lambda: repository.search_by_brand("churn", 20),
+    lambda: repository.query(ProductQuery(name="churn", max_price=30.0)),
+    lambda: repository.query(ProductQuery(max_quantity=5)),
+    lambda: repository.classify_expiration(),
+    lambda: repository.list_expired_products(),
+    lambda: repository.list_products_by_brand("Marca Churn"),
+  ]
+  while not stop.is_set():
+    for query in queries:
+      try:
+        query()
+      except Exception as e:
+        failures.append(f"{type(e).__name__}: {e}")
+
+def run_readers(operations: int = 5000) -> bool:
+  """Uma thread de consultas contra uma que cadastra e remove produtos"""
+  stop = threading.Event()
+  failures: list[str] = []
+  switch_interval = sys.getswitchinterval()
+  sys.setswitchinterval(1e-6)
+  reader = threading.Thread(target=read, args=(stop, failures))
+  writer = threading.Thread(target=churn, args=(operations, stop, 0))
+  reader.start()
+  writer.start()
+  writer.join()
+  reader.join()
+  sys.setswitchinterval(switch_interval)
+
+  for failure in sorted(set(failures)):
+    print(f"ERRO consulta concorrente: {failure}")
+  print("consultas concorrentes sem erros" if not failures else f"{len(failures)} consulta(s) concorrente(s) falharam")
+  return not failures and repository.check_indexes()
+
+if __name__ == "__main__":
+  ok = run(*(int(arg) for arg in sys.argv[1:3]))
+  ok = run_readers() and ok
+  sys.exit(0 if ok else 1)
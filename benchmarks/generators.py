@@ -0,0 +1,87 @@
+"""Geradores determinísticos de catálogo e vendas para os benchmarks: a mesma semente e a mesma
+data de referência geram sempre os mesmos produtos e vendas (inclusive os ids)."""
+import random
+from datetime import date, datetime, timedelta
+from uuid import UUID
+from models import Product, Sale, SaleItem
+
+WORDS = [
+  "Arroz", "Feijão", "Café", "Leite", "Açúcar", "Óleo", "Macarrão", "Farinha", "Sal", "Biscoito",
+  "Molho", "Sabão", "Detergente", "Iogurte", "Queijo", "Manteiga", "Suco", "Achocolatado",
+]
+BRANDS = [
+  "Tio João", "Camil", "Pilão", "Italac", "União", "Liza", "Renata", "Dona Benta",
+  "Nestlé", "Ypê", "Omo", "Piracanjuba", "Vigor", "Tirolez", "Del Valle", "Qualy",
+]
+SIZES = ["200g", "500g", "1kg", "2kg", "5kg", "1L", "2L"]
+SELLERS = ["Maria Silva", "João Souza", "Ana Costa", "Pedro Lima", "Carla Mendes", "Rafael Alves"]
+PERISHABLE_SHARE = 0.6
+HOT_PRODUCTS_SHARE = 0.2
+HOT_SALES_SHARE = 0.8
+
+def make_uuid(rng: random.Random) -> UUID:
+  return UUID(int=rng.getrandbits(128), version=4)
+
+def make_ean13(number: int) -> str:
+  """Código EAN-13 com prefixo brasileiro (789) e dígito verificador"""
+  digits = f"789{number:09d}"
+  total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits))
+  return digits + str((10 - total % 10) % 10)
+
+def make_cpf(rng: random.Random) -> str:
+  digits = [rng.randint(0, 9) for _ in range(9)]
+  for first_weight in (10, 11):
+    remainder = sum(d * w for d, w in zip(digits, range(first_weight, 1, -1))) % 11
+    digits.append(0 if remainder < 2 else 11 - remainder)
+  cpf = "".join(map(str, digits))
+  return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+
+def make_products(count: int, seed: int = 42, today: date | None = None) -> list[Product]:
+  """Catálogo com 60% de perecíveis, validades de 30 dias atrás a um ano à frente de today
+  (então há produtos em todas as faixas do relatório de validade) e estoques de 0 a 500"""
+  rng = random.Random(seed)
+  today = today or date(2026, 1, 1)
+  imported_at = datetime.combine(today, datetime.min.time()) - timedelta(days=400)
+  products = []
+  for i in range(count):
+    is_perishable = rng.random() < PERISHABLE_SHARE
+    created_at = imported_at + timedelta(seconds=rng.randint(0, 300 * 86400))
+    size = rng.choice(SIZES)
+    products.append(Product(
+      id=make_uuid(rng),
+      name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {size} {i}",
+      description=f"Embalagem de {size}",
+      price=round(rng.uniform(1, 500), 2),
+      brand=rng.choice(BRANDS),
+      quantity=rng.randint(0, 500),
+      barcode=make_ean13(i),
+      created_at=created_at,
+      updated_at=created_at,
+      is_perishable=is_perishable,
+      expiration_date=today + timedelta(days=rng.randint(-30, 365)) if is_perishable else None,
+    ))
+  return products
+
+def make_sales(products: list[Product], count: int, seed: int = 42, now: datetime | None = None) -> list[Sale]:
+  """Vendas de 1 a 4 itens distribuídas no último ano antes de now, em ordem de data; 80% dos
+  itens saem dos 20% primeiros produtos do catálogo"""
+  rng = random.Random(seed)
+  now = now or datetime(2026, 1, 1)
+  hot = max(1, int(len(products) * HOT_PRODUCTS_SHARE))
+  # CPFs só com dígitos, como o sell_products grava
+  buyers = [make_cpf(rng).replace(".", "").replace("-", "") for _ in range(max(1, count // 10))]
+  offsets = sorted(rng.randint(1, 365 * 86400) for _ in range(count))
+  sales = []
+  for offset in reversed(offsets):
+    chosen = {}
+    for _ in range(rng.randint(1, 4)):
+      product = products[rng.randrange(hot) if rng.random() < HOT_SALES_SHARE else rng.randrange(len(products))]
+      chosen[product.get_id()] = product
+    sales.append(Sale(
+      items=[SaleItem(product, rng.randint(1, 5)) for product in chosen.values()],
+      seller_name=rng.choice(SELLERS),
+      buyer_cpf=rng.choice(buyers),
+      sale_date=now - timedelta(seconds=offset),
+      id=make_uuid(rng),
+    ))
+  return sales
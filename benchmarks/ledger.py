@@ -0,0 +1,89 @@
+"""Compara "unidades de um produto por dia no último trimestre" calculadas pelo histórico de vendas
+(carregar os objetos Sale e percorrer os itens) e pelo ledger mapeado em memória (varrer as
+colunas). Também mede a gravação do ledger e a abertura das colunas e, com o NumPy instalado,
+confere as_numpy contra a varredura das colunas.
+
+Uso: python -m benchmarks.ledger [vendas] [diretório]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from repositories import SalesRepository, SalesLedger, SnapshotStorage
+from repositories.sales_ledger import MICROSECONDS_PER_DAY, to_micros
+from repositories.snapshot import EPOCH
+from benchmarks.generators import make_products, make_sales
+
+def run(count: int = 400000, directory: str | None = None):
+  directory = directory or tempfile.mkdtemp(prefix="ledger-benchmark-")
+  today = date.today()
+  products = make_products(max(1000, count // 100), today=today)
+  sales = make_sales(products, count, now=datetime.combine(today, datetime.min.time()))
+  items = sum(len(sale.get_items()) for sale in sales)
+  print(f"{count} vendas, {items} itens em {directory}")
+
+  storage = SnapshotStorage(os.path.join(directory, "inventory.snap"), os.path.join(directory, "sales"))
+  repository = SalesRepository(storage)
+  storage.save_sales([repository.sale_to_dict(sale, True) for sale in sales])
+
+  start = time.perf_counter()
+  ledger = SalesLedger(os.path.join(directory, "sales.ledger"))
+  ledger.append_sales(sales)
+  ledger.sync()
+  print(f"gravação do ledger        {time.perf_counter() - start:7.2f}s   {os.path.getsize(ledger.filename) / 2 ** 20:6.1f} MiB")
+  del sales
+
+  product_id = products[0].get_id()
+  period_start, period_end = today - timedelta(days=91), today
+
+  start = time.perf_counter()
+  repository.load_from_file(journal_filename=os.path.join(directory, "sales.journal"), ledger_filename=None)
+  expected = Counter()
+  for sale in repository.list_sales(period_start, period_end):
+    for item in sale.get_items():
+      if item.get_product_id() == product_id:
+        expected[sale.get_sale_date().date()] += item.get_quantity()
+  hydrated = time.perf_counter() - start
+  print(f"histórico (objetos Sale)  {hydrated:7.2f}s")
+
+  start = time.perf_counter()
+  with ledger.columns() as columns:
+    opened = time.perf_counter() - start
+    units = columns.units_by_day(ledger.product_index(product_id), period_start, period_end)
+  scanned = time.perf_counter() - start
+  print(f"ledger (colunas mmap)     {scanned:7.2f}s   (abertura {opened * 1000:.2f} ms)")
+
+  assert units == dict(sorted(expected.items())), "ledger e histórico divergem"
+  print(f"ganho                     {hydrated / scanned:6.1f}x   {len(units)} dia(s), {sum(units.values())} unidade(s)")
+  check_numpy(ledger, ledger.product_index(product_id), period_start, period_end, units)
+  repository.close()
+  ledger.close()
+
+def check_numpy(ledger: SalesLedger, product_index: int, period_start: date, period_end: date, units: dict[date, int]):
+  """Confere as_numpy contra a varredura das colunas; ignorada quando o NumPy não está instalado"""
+  try:
+    import numpy
+  except ImportError:
+    print("as_numpy                  ignorado (NumPy não instalado)")
+    return
+  with ledger.columns() as columns:
+    records = columns.as_numpy()
+    assert len(records) == len(columns), "as_numpy e colunas com tamanhos diferentes"
+    assert numpy.array_equal(records["quantity"], numpy.asarray(columns.quantity)), "as_numpy e colunas divergem"
+    timestamps = records["timestamp_us"]
+    selected = records[
+      (records["product_index"] == product_index)
+      & (timestamps >= to_micros(period_start)) & (timestamps <= to_micros(period_end, end=True))
+    ]
+    days = selected["timestamp_us"] // MICROSECONDS_PER_DAY
+    by_day = Counter()
+    for day, quantity in zip(days.tolist(), selected["quantity"].tolist()):
+      by_day[EPOCH.date() + timedelta(days=day)] += quantity
+    assert dict(sorted(by_day.items())) == units, "as_numpy e colunas divergem"
+    del records, timestamps, selected, days
+  print("as_numpy                  ok")
+
+if __name__ == "__main__":
+  run(int(sys.argv[1]) if len(sys.argv) > 1 else 400000, sys.argv[2] if len(sys.argv) > 2 else None)
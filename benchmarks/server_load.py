@@ -0,0 +1,152 @@
+"""Gerador de carga local para o servidor de estoque (server.py): várias conexões, cada uma com
+até --pipeline requisições em voo, numa mistura de consultas, buscas, vendas e reposições.
+Mede a latência de cada requisição (do envio à resposta) e reporta vazão, p50, p99 e máximo.
+
+Sem --port, sobe um servidor próprio numa porta livre, com os dados num diretório temporário.
+
+Uso: python -m benchmarks.server_load [--connections 8] [--requests 5000] [--pipeline 32] [--port N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PRODUCTS = 500
+BARCODE_BASE = 7892000000000
+SELLER = "Caixa Carga"
+BUYER_CPF = "52998224725"
+WORDS = ["Arroz", "Feijão", "Café", "Leite", "Açúcar", "Óleo", "Macarrão", "Farinha", "Sal", "Biscoito"]
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+  return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def make_request(rng: random.Random, request_id: int) -> dict:
+  barcode = str(BARCODE_BASE + rng.randrange(PRODUCTS))
+  draw = rng.random()
+  if draw < 0.6:
+    return {"id": request_id, "op": "product", "barcode": barcode}
+  if draw < 0.75:
+    return {"id": request_id, "op": "search", "name": rng.choice(WORDS)[:4], "limit": 10}
+  if draw < 0.95:
+    items = [[str(BARCODE_BASE + rng.randrange(PRODUCTS)), rng.randint(1, 3)] for _ in range(rng.randint(1, 3))]
+    return {"id": request_id, "op": "sell", "items": items, "seller": SELLER, "cpf": BUYER_CPF}
+  return {"id": request_id, "op": "restock", "barcode": barcode, "quantity": rng.randint(10, 50)}
+
+async def run_connection(host: str, port: int, requests: list[dict], pipeline: int, latencies: dict[str, list[float]]) -> int:
+  """Envia as requisições mantendo até pipeline em voo; retorna quantas responderam com erro"""
+  reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+  window = asyncio.Semaphore(pipeline)
+  sent_at: dict[int, tuple[str, float]] = {}
+  errors = 0
+
+  async def send():
+    for request in requests:
+      await window.acquire()
+      sent_at[request["id"]] = (request["op"], time.perf_counter())
+      writer.write(json.dumps(request).encode() + b"\n")
+      await writer.drain()
+
+  sender = asyncio.create_task(send())
+  for _ in requests:
+    response = json.loads(await reader.readline())
+    op, started = sent_at.pop(response["id"])
+    latencies.setdefault(op, []).append(time.perf_counter() - started)
+    if not response["ok"]:
+      errors += 1
+    window.release()
+  await sender
+  writer.close()
+  return errors
+
+async def seed(host: str, port: int):
+  """Cadastra os produtos usados pela carga (ignora os que já existem) com bastante estoque"""
+  reader, writer = await asyncio.open_connection(host, port)
+  for i in range(PRODUCTS):
+    name = f"{WORDS[i % len(WORDS)]} {WORDS[(i // len(WORDS)) % len(WORDS)]} {i}"
+    request = {
+      "id": i, "op": "add", "barcode": str(BARCODE_BASE + i), "name": name, "description": "Carga",
+      "price": round(1 + (i % 97) * 1.37, 2), "brand": "Marca Carga", "quantity": 1000000,
+    }
+    writer.write(json.dumps(request).encode() + b"\n")
+  await writer.drain()
+  for _ in range(PRODUCTS):
+    await reader.readline()
+  writer.close()
+
+async def run_load(host: str, port: int, connections: int, requests: int, pipeline: int, seed_value: int = 42):
+  await seed(host, port)
+  rng = random.Random(seed_value)
+  workloads = [
+    [make_request(rng, connection * requests + i) for i in range(requests)]
+    for connection in range(connections)
+  ]
+  latencies: dict[str, list[float]] = {}
+  start = time.perf_counter()
+  errors = await asyncio.gather(*(run_connection(host, port, workload, pipeline, latencies) for workload in workloads))
+  elapsed = time.perf_counter() - start
+
+  total = connections * requests
+  print(f"{connections} conexões x {requests} requisições, pipeline {pipeline}: {elapsed:.2f}s")
+  print(f"vazão {total / elapsed:,.0f} req/s, {sum(errors)} resposta(s) com erro")
+  print(f"{'operação':<10}{'qtd':>8}{'p50 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+  everything = []
+  for op, values in sorted(latencies.items()):
+    values.sort()
+    everything.extend(values)
+    print(f"{op:<10}{len(values):>8}{percentile(values, 0.5) * 1000:>10.2f}{percentile(values, 0.99) * 1000:>10.2f}{values[-1] * 1000:>10.2f}")
+  everything.sort()
+  print(f"{'total':<10}{len(everything):>8}{percentile(everything, 0.5) * 1000:>10.2f}{percentile(everything, 0.99) * 1000:>10.2f}{everything[-1] * 1000:>10.2f}")
+
+def free_port() -> int:
+  with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    return s.getsockname()[1]
+
+def start_server(port: int) -> subprocess.Popen:
+  root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  directory = tempfile.mkdtemp(prefix="server-load-")
+  env = dict(os.environ, PYTHONPATH=root)
+  env.pop("INVENTORY_DB", None)
+  process = subprocess.Popen(
+    [sys.executable, os.path.join(root, "server.py"), "--port", str(port)],
+    cwd=directory, env=env, stderr=subprocess.PIPE, text=True,
+  )
+  # O servidor avisa no stderr quando começa a aceitar conexões
+  for line in process.stderr:
+    if line.startswith("Servidor de estoque em"):
+      break
+  else:
+    raise RuntimeError("o servidor terminou antes de começar a aceitar conexões")
+  print(f"servidor local na porta {port}, dados em {directory}")
+  return process
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Gerador de carga para o servidor de estoque")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, help="servidor já em execução; sem isso, sobe um local")
+  parser.add_argument("--connections", type=int, default=8)
+  parser.add_argument("--requests", type=int, default=5000, help="requisições por conexão")
+  parser.add_argument("--pipeline", type=int, default=32, help="requisições em voo por conexão")
+  args = parser.parse_args(argv)
+
+  process = None
+  port = args.port
+  if port is None:
+    port = free_port()
+    process = start_server(port)
+  try:
+    asyncio.run(run_load(args.host, port, args.connections, args.requests, args.pipeline))
+  finally:
+    if process:
+      process.terminate()
+      _, summary = process.communicate()
+      print(summary.strip())
+
+if __name__ == "__main__":
+  main()
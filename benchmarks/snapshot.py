@@ -0,0 +1,42 @@
+"""Compara snapshot JSON e snapshot binário: gravação, leitura (até objetos Product) e tamanho.
+
+Uso: python -m benchmarks.snapshot [produtos] [diretório]
+"""
+import os
+import sys
+import tempfile
+import time
+from models import Product
+from repositories import ProductRepository, JsonStorage, SnapshotStorage
+from benchmarks.generators import make_products
+
+def measure(label: str, storage, products: list[Product], filename: str):
+  repository = ProductRepository(storage)
+  typed = storage.typed_records
+
+  start = time.perf_counter()
+  storage.save_products([repository.product_to_dict(p, typed) for p in products])
+  saved = time.perf_counter() - start
+
+  start = time.perf_counter()
+  loaded = [repository.dict_to_product(record) for record in storage.load_products()]
+  elapsed = time.perf_counter() - start
+
+  assert len(loaded) == len(products)
+  size = os.path.getsize(filename) / 2 ** 20
+  print(f"{label:<10} gravação {saved:7.2f}s   leitura {elapsed:7.2f}s   {size:8.1f} MiB")
+  return saved, elapsed
+
+def run(count: int = 1000000, directory: str | None = None):
+  directory = directory or tempfile.mkdtemp(prefix="snapshot-benchmark-")
+  products = make_products(count)
+  print(f"{count} produtos em {directory}")
+
+  json_filename = os.path.join(directory, "inventory.json")
+  snap_filename = os.path.join(directory, "inventory.snap")
+  json_times = measure("JSON", JsonStorage(json_filename, os.path.join(directory, "sales.json")), products, json_filename)
+  snap_times = measure("binário", SnapshotStorage(snap_filename, os.path.join(directory, "sales")), products, snap_filename)
+  print(f"ganho      gravação {json_times[0] / snap_times[0]:6.1f}x   leitura {json_times[1] / snap_times[1]:6.1f}x")
+
+if __name__ == "__main__":
+  run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,271 @@
+"""Suíte de benchmarks do estoque: gera catálogo e vendas sintéticos (benchmarks.generators) em
+cada escala e mede carga e gravação dos repositórios, busca por código de barras, cada critério
+da busca de produtos e cada relatório. O resultado é gravado em JSON para comparar commits.
+
+Cada escala roda num processo próprio, num diretório temporário, para que uma não herde a
+memória nem os arquivos da outra. Cada medição é repetida --repeat vezes; a comparação usa o
+menor tempo, que é o menos sujeito a ruído da máquina.
+
+Uso:
+  python -m benchmarks.suite [--scales 10k,100k,1m] [--storage snapshot|sqlite|json] [--repeat 3] [--report-workers N] [--output arquivo.json]
+  python -m benchmarks.suite --compare antes.json depois.json [--threshold 1.1]
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from functools import partial
+from typing import Callable
+
+RESULTS_VERSION = 1
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SCALES = "10k,100k"
+LOOKUPS = 10_000
+NAME_TERMS = ["Café", "Leite", "Arroz Feijão", "maca", "choco", "Iogurte 1L", "inexistente"]
+BRAND_TERMS = ["Camil", "Nestlé", "Dona", "ypê", "Piracanjuba", "inexistente"]
+REPORT_PREFIXES = ("sales_report_", "expiration_report_")
+
+def timed(repeat: int, function: Callable[[], object], operations: int = 1) -> dict:
+  """Executa function repeat vezes e resume os tempos (em segundos)"""
+  seconds = []
+  for _ in range(repeat):
+    gc.collect()
+    start = time.perf_counter()
+    function()
+    seconds.append(time.perf_counter() - start)
+  best = min(seconds)
+  return {
+    "operations": operations,
+    "seconds": [round(value, 6) for value in seconds],
+    "min": round(best, 6),
+    "median": round(statistics.median(seconds), 6),
+    "per_operation_us": round(best / operations * 1e6, 3),
+  }
+
+def open_backend(name: str):
+  from repositories import JsonStorage, SnapshotStorage, SqliteStorage
+  if name == "sqlite":
+    return SqliteStorage("inventory.db")
+  if name == "json":
+    return JsonStorage()
+  return SnapshotStorage()
+
+def remove_reports():
+  for filename in os.listdir("."):
+    if filename.startswith(REPORT_PREFIXES):
+      os.remove(filename)
+
+def run_scale(scale: str, storage_name: str, repeat: int, seed: int, report_workers: int | None = None) -> dict:
+  """Mede uma escala no diretório atual; chamado no processo filho (--worker)"""
+  from benchmarks.generators import make_products, make_sales
+  from repositories import ProductRepository, SalesRepository, ProductQuery, repository, sales_repository
+  from services import (
+    find_product, search_products_by_name, search_products_by_brand,
+    generate_sales_report, generate_sales_text_report, generate_sales_csv_report, generate_sales_reports,
+    generate_expiration_text_report, generate_expiration_csv_report,
+  )
+
+  count = SCALES[scale]
+  today = date.today()
+  results = {}
+
+  start = time.perf_counter()
+  products = make_products(count, seed, today)
+  sales = make_sales(products, count, seed, datetime.combine(today, datetime.min.time()))
+  results["generate"] = {"operations": 1, "seconds": [round(time.perf_counter() - start, 6)]}
+  sale_items = sum(len(sale.get_items()) for sale in sales)
+
+  storage = open_backend(storage_name)
+  typed = storage.typed_records
+  storage.save_products([repository.product_to_dict(product, typed) for product in products])
+  storage.save_sales([sales_repository.sale_to_dict(sale, typed) for sale in sales])
+  rng = random.Random(seed)
+  barcodes = [product.get_barcode() for product in rng.sample(products, min(LOOKUPS, count))]
+  del products, sales
+
+  def load_products():
+    loaded = ProductRepository(storage)
+    loaded.load_from_file()
+    loaded.close()
+
+  def open_sales():
+    loaded = SalesRepository(storage)
+    loaded.load_from_file()
+    loaded.close()
+
+  def load_sales():
+    loaded = SalesRepository(storage)
+    loaded.load_from_file()
+    loaded.load_history()
+    loaded.close()
+
+  results["product.load_from_file"] = timed(repeat, load_products, count)
+  # load_from_file das vendas só abre o journal; o histórico é lido pelo load_history
+  results["sales.load_from_file"] = timed(repeat, open_sales)
+  results["sales.load_history"] = timed(repeat, load_sales, count)
+
+  repository.storage = storage
+  sales_repository.storage = storage
+  repository.load_from_file()
+  sales_repository.load_from_file()
+  sales_repository.load_history()
+  results["product.save_to_file"] = timed(repeat, repository.save_to_file, count)
+
+  results["get_product_by_barcode"] = timed(
+    repeat, lambda: [repository.get_product_by_barcode(barcode) for barcode in barcodes], len(barcodes)
+  )
+
+  # Um item por opção do menu de busca (services.search_products)
+  searches = {
+    "search.barcode": (lambda: [find_product(barcode) for barcode in barcodes], len(barcodes)),
+    "search.name": (lambda: [search_products_by_name(term) for term in NAME_TERMS], len(NAME_TERMS)),
+    "search.brand": (lambda: [search_products_by_brand(term) for term in BRAND_TERMS], len(BRAND_TERMS)),
+    "search.low_stock": (lambda: repository.find_products(max_quantity=5), 1),
+    "search.price_range": (lambda: repository.find_products(min_price=50, max_price=60), 1),
+    "search.perishable": (lambda: [product for product, _ in repository.classify_expiration().perishable()], 1),
+    "search.non_perishable": (lambda: repository.find_products(is_perishable=False), 1),
+    "search.combined": (lambda: repository.query(ProductQuery(name="Café", brand="Pilão", max_price=100, is_perishable=True)), 1),
+  }
+  for name, (function, operations) in searches.items():
+    results[name] = timed(repeat, function, operations)
+
+  reports = {
+    "report.generate_sales_report": generate_sales_report,
+    "report.generate_sales_text_report": partial(generate_sales_text_report, workers=report_workers),
+    "report.generate_sales_csv_report": partial(generate_sales_csv_report, workers=report_workers),
+    "report.generate_sales_reports": partial(generate_sales_reports, workers=report_workers),
+    "report.generate_expiration_text_report": partial(generate_expiration_text_report, workers=report_workers),
+    "report.generate_expiration_csv_report": partial(generate_expiration_csv_report, workers=report_workers),
+  }
+  with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+    for name, function in reports.items():
+      results[name] = timed(repeat, function)
+      remove_reports()
+
+  repository.close()
+  sales_repository.close()
+  return {"products": count, "sales": count, "sale_items": sale_items, "results": results}
+
+def git_revision(root: str) -> dict:
+  def git(*args) -> str | None:
+    try:
+      return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+      return None
+  status = git("status", "--porcelain", "--untracked-files=no")
+  return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+def run(scales: list[str], storage_name: str, repeat: int, seed: int, output: str, report_workers: int | None = None) -> dict:
+  root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  env = dict(os.environ, PYTHONPATH=root)
+  results = {
+    "version": RESULTS_VERSION,
+    **git_revision(root),
+    "date": datetime.now().isoformat(timespec="seconds"),
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "storage": storage_name,
+    "repeat": repeat,
+    "seed": seed,
+    "report_workers": report_workers,
+    "scales": {},
+  }
+  worker_options = ["--report-workers", str(report_workers)] if report_workers else []
+  for scale in scales:
+    directory = tempfile.mkdtemp(prefix=f"benchmark-{scale}-")
+    scale_output = os.path.join(directory, "result.json")
+    print(f"{scale}: {SCALES[scale]} produtos e vendas em {directory}", flush=True)
+    try:
+      subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--worker", scale, "--storage", storage_name,
+         "--repeat", str(repeat), "--seed", str(seed), "--output", scale_output, *worker_options],
+        cwd=directory, env=env, check=True,
+      )
+      with open(scale_output, "r", encoding="utf-8") as f:
+        results["scales"][scale] = json.load(f)
+    finally:
+      shutil.rmtree(directory, ignore_errors=True)
+    print_scale(results["scales"][scale])
+
+  with open(output, "w", encoding="utf-8") as f:
+    json.dump(results, f, indent=2)
+  print(f"Resultados gravados em {output}")
+  return results
+
+def print_scale(scale: dict):
+  print(f"{'medição':<42}{'mín ms':>12}{'mediana ms':>12}{'µs/op':>12}")
+  for name, result in scale["results"].items():
+    best = min(result["seconds"])
+    median = statistics.median(result["seconds"])
+    per_operation = best / result["operations"] * 1e6
+    print(f"{name:<42}{best * 1000:>12.2f}{median * 1000:>12.2f}{per_operation:>12.2f}")
+  print()
+
+def compare(before_filename: str, after_filename: str, threshold: float) -> bool:
+  """Compara os menores tempos de duas execuções; retorna False se algo ficou mais lento que threshold"""
+  with open(before_filename, "r", encoding="utf-8") as f:
+    before = json.load(f)
+  with open(after_filename, "r", encoding="utf-8") as f:
+    after = json.load(f)
+  print(f"antes:  {before.get('commit')} ({before['storage']}, {before['date']})")
+  print(f"depois: {after.get('commit')} ({after['storage']}, {after['date']})")
+
+  regressions = 0
+  for scale in after["scales"]:
+    if scale not in before["scales"]:
+      continue
+    print(f"\n{scale}")
+    print(f"{'medição':<42}{'antes ms':>12}{'depois ms':>12}{'razão':>9}")
+    old_results = before["scales"][scale]["results"]
+    for name, result in after["scales"][scale]["results"].items():
+      if name not in old_results:
+        continue
+      old, new = min(old_results[name]["seconds"]), min(result["seconds"])
+      ratio = new / old if old else float("inf")
+      flag = "  REGRESSÃO" if ratio > threshold else ""
+      regressions += bool(flag)
+      print(f"{name:<42}{old * 1000:>12.2f}{new * 1000:>12.2f}{ratio:>8.2f}x{flag}")
+  print(f"\n{regressions} medição(ões) mais de {threshold:.2f}x mais lenta(s)")
+  return regressions == 0
+
+def main(argv=None) -> int:
+  parser = argparse.ArgumentParser(description="Suíte de benchmarks do estoque")
+  parser.add_argument("--scales", default=DEFAULT_SCALES, help=f"escalas separadas por vírgula ({', '.join(SCALES)})")
+  parser.add_argument("--storage", choices=["snapshot", "sqlite", "json"], default="snapshot")
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--seed", type=int, default=42)
+  parser.add_argument("--output", help="arquivo JSON de resultados")
+  parser.add_argument("--report-workers", type=int, metavar="N", help="gera os relatórios em N processos")
+  parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois arquivos de resultados")
+  parser.add_argument("--threshold", type=float, default=1.1, help="razão a partir da qual --compare aponta regressão")
+  parser.add_argument("--worker", choices=list(SCALES), help=argparse.SUPPRESS)
+  args = parser.parse_args(argv)
+
+  if args.compare:
+    return 0 if compare(*args.compare, args.threshold) else 1
+  if args.worker:
+    result = run_scale(args.worker, args.storage, args.repeat, args.seed, args.report_workers)
+    with open(args.output, "w", encoding="utf-8") as f:
+      json.dump(result, f)
+    return 0
+
+  scales = [scale.strip().lower() for scale in args.scales.split(",") if scale.strip()]
+  unknown = [scale for scale in scales if scale not in SCALES]
+  if unknown:
+    parser.error(f"escala(s) desconhecida(s): {', '.join(unknown)}")
+  output = args.output or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+  run(scales, args.storage, args.repeat, args.seed, output, args.report_workers)
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,92 @@
+"""Compara a validação campo a campo com a validação em lote (BatchValidators).
+
+A coluna "anterior" reproduz as regras como eram antes dos padrões pré-compilados e da
+tabela de pesos do CPF (re.match com a string do padrão e int() por dígito).
+
+Uso: python -m benchmarks.validation [linhas]
+"""
+import random
+import re
+import sys
+import time
+from utils import Validators, ValidationError, BatchValidators
+from benchmarks.generators import make_cpf
+
+def make_columns(rows: int, seed: int = 42) -> dict[str, list]:
+  rng = random.Random(seed)
+  words = ["arroz", "feijão", "café", "leite", "açúcar", "óleo", "macarrão", "farinha", "sal"]
+  brands = ["Tio João", "Camil", "Pilão", "Italac", "União", "Liza", "Renata", "Dona Benta"]
+  sellers = ["Maria Silva", "João Souza", "Ana Costa", "Pedro Lima"]
+  return {
+    "name": [f"{rng.choice(words)} {rng.choice(words)} {rng.randint(1, 5)}kg" for _ in range(rows)],
+    "brand": [rng.choice(brands) for _ in range(rows)],
+    "seller_name": [rng.choice(sellers) for _ in range(rows)],
+    "cpf": [make_cpf(rng) for _ in range(rows)],
+    "barcode": [str(rng.randint(10 ** 12, 10 ** 13 - 1)) for _ in range(rows)],
+  }
+
+def legacy_name(name: str) -> str:
+  name = Validators.validate_non_empty_string(name, "Nome")
+  if len(name) < 2 or len(name) > 100 or not re.match(r'^[a-zA-Z0-9\sÀ-ÿ\-\.\,\(\)]+$', name):
+    raise ValidationError("Nome inválido")
+  return name.title()
+
+def legacy_brand(brand: str) -> str:
+  brand = Validators.validate_non_empty_string(brand, "Marca")
+  if len(brand) < 2 or len(brand) > 50 or not re.match(r'^[a-zA-Z0-9\sÀ-ÿ\-\.\&]+$', brand):
+    raise ValidationError("Marca inválida")
+  return brand.title()
+
+def legacy_seller_name(name: str) -> str:
+  name = Validators.validate_non_empty_string(name, "Nome do vendedor")
+  if len(name) < 2 or len(name) > 100 or not re.match(r'^[a-zA-ZÀ-ÿ\s]+$', name):
+    raise ValidationError("Nome do vendedor inválido")
+  return name.title()
+
+def legacy_cpf(cpf: str) -> str:
+  cpf = re.sub(r'[^0-9]', '', Validators.validate_non_empty_string(cpf, "CPF"))
+  if len(cpf) != 11 or cpf == cpf[0] * 11:
+    raise ValidationError("CPF inválido")
+
+  def calculate_digit(cpf_digits, position):
+    remainder = sum(int(digit) * weight for digit, weight in zip(cpf_digits, range(position, 1, -1))) % 11
+    return 0 if remainder < 2 else 11 - remainder
+
+  if int(cpf[9]) != calculate_digit(cpf[:9], 10) or int(cpf[10]) != calculate_digit(cpf[:10], 11):
+    raise ValidationError("CPF inválido")
+  return cpf
+
+def per_call(validator, values: list) -> int:
+  errors = 0
+  for value in values:
+    try:
+      validator(value)
+    except ValidationError:
+      errors += 1
+  return errors
+
+CASES = [
+  ("name", legacy_name, Validators.validate_name, BatchValidators.names),
+  ("brand", legacy_brand, Validators.validate_brand, BatchValidators.brands),
+  ("seller_name", legacy_seller_name, Validators.validate_seller_name, BatchValidators.seller_names),
+  ("cpf", legacy_cpf, Validators.validate_cpf, BatchValidators.cpfs),
+  ("barcode", Validators.validate_barcode, Validators.validate_barcode, BatchValidators.barcodes),
+]
+
+def timed(function, values: list) -> float:
+  start = time.perf_counter()
+  function(values)
+  return time.perf_counter() - start
+
+def run(rows: int = 200000):
+  columns = make_columns(rows)
+  print(f"{'coluna':<12} {'anterior':>10} {'por chamada':>12} {'em lote':>10} {'ganho':>7}")
+  for column, legacy, validator, batch_rule in CASES:
+    values = columns[column]
+    before = timed(lambda v: per_call(legacy, v), values)
+    single = timed(lambda v: per_call(validator, v), values)
+    batch = timed(batch_rule, values)
+    print(f"{column:<12} {before:>9.3f}s {single:>11.3f}s {batch:>9.3f}s {before / batch:>6.2f}x")
+
+if __name__ == "__main__":
+  run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
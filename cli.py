@@ -0,0 +1,277 @@
+import argparse
+import os
+import shlex
+import sys
+from datetime import date
+from repositories import repository, sales_repository, open_storage, ProductQuery
+from services import (
+  add_product, restock_product, edit_product, find_product, search_products_by_name,
+  search_products_by_brand, sell_products, purge_expired_products,
+  generate_sales_report, generate_sales_text_report, generate_sales_csv_report,
+  generate_sales_reports, show_expiration_report, generate_expiration_text_report,
+  generate_expiration_csv_report, import_products
+)
+from utils import ValidationError
+
+PRODUCTS = "products"
+SALES = "sales"
+
+class RepositoryLoader:
+  """Carrega sob demanda apenas os repositórios que cada comando precisa"""
+
+  def __init__(self):
+    self.loaded: set[str] = set()
+    storage = open_storage(os.environ.get("INVENTORY_DB"))
+    repository.storage = storage
+    sales_repository.storage = storage
+
+  def require(self, *names: str):
+    if SALES in names and PRODUCTS not in self.loaded:
+      names = (PRODUCTS, *names)
+    for name in names:
+      if name in self.loaded:
+        continue
+      if name == PRODUCTS:
+        repository.load_from_file()
+      elif name == SALES:
+        sales_repository.load_from_file()
+      self.loaded.add(name)
+
+  def compact(self):
+    self.require(PRODUCTS, SALES)
+    sales_repository.load_history()
+    repository.save_to_file()
+    sales_repository.save_to_file()
+
+  def close(self):
+    repository.close()
+    sales_repository.close()
+
+def print_product(product):
+  expiration = product.get_expiration_date().isoformat() if product.get_expiration_date() else "-"
+  print(f"{product.get_barcode()}\t{product.get_name()}\t{product.get_brand()}\t{product.get_price():.2f}\t{product.get_quantity()}\t{expiration}")
+
+def parse_sale_item(value: str) -> tuple[str, int]:
+  barcode, _, quantity = value.partition(":")
+  try:
+    return barcode, int(quantity or 1)
+  except ValueError:
+    raise argparse.ArgumentTypeError(f"item inválido '{value}', use CODIGO:QUANTIDADE")
+
+def build_parser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(prog="inventory", description="Gerenciador de estoque em modo não interativo")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  for name in ("add", "update"):
+    command = commands.add_parser(name, help="cadastra um produto" if name == "add" else "atualiza um produto")
+    command.add_argument("barcode")
+    command.add_argument("--name", required=True)
+    command.add_argument("--description", required=True)
+    command.add_argument("--price", type=float, required=True)
+    command.add_argument("--brand", required=True)
+    command.add_argument("--quantity", type=int, required=True)
+    command.add_argument("--expiration-date", type=date.fromisoformat, help="AAAA-MM-DD; torna o produto perecível")
+
+  restock = commands.add_parser("restock", help="soma unidades ao estoque de um produto")
+  restock.add_argument("barcode")
+  restock.add_argument("quantity", type=int)
+
+  get = commands.add_parser("get", help="mostra um produto pelo código de barras")
+  get.add_argument("barcode")
+
+  search = commands.add_parser("search", help="busca produtos; critérios combinados valem todos juntos")
+  search.add_argument("--barcode")
+  search.add_argument("--name")
+  search.add_argument("--brand")
+  search.add_argument("--low-stock", type=int, metavar="N", help="quantidade menor que N")
+  search.add_argument("--price-range", type=float, nargs=2, metavar=("MIN", "MAX"))
+  search.add_argument("--expiring-before", type=date.fromisoformat, metavar="AAAA-MM-DD")
+  perishable = search.add_mutually_exclusive_group()
+  perishable.add_argument("--perishable", action="store_true")
+  perishable.add_argument("--non-perishable", action="store_true")
+  search.add_argument("--explain", action="store_true", help="mostra o índice escolhido pelo planejador")
+
+  sell = commands.add_parser("sell", help="registra uma venda")
+  sell.add_argument("items", nargs="+", type=parse_sale_item, metavar="CODIGO:QUANTIDADE")
+  sell.add_argument("--seller", required=True)
+  sell.add_argument("--cpf", required=True)
+
+  commands.add_parser("remove-expired", help="remove os produtos vencidos")
+
+  report = commands.add_parser("report", help="gera relatórios")
+  report.add_argument("kind", choices=("sales", "expiration"))
+  formats = report.add_mutually_exclusive_group()
+  formats.add_argument("--txt", action="store_true")
+  formats.add_argument("--csv", action="store_true")
+  formats.add_argument("--both", action="store_true", help="TXT e CSV em uma única passada (vendas)")
+  report.add_argument("--start", type=date.fromisoformat)
+  report.add_argument("--end", type=date.fromisoformat)
+  report.add_argument("--compress", choices=("gzip", "lzma"))
+  report.add_argument("--workers", type=int, metavar="N", help="formata os relatórios em N processos (mesmo resultado)")
+
+  bulk = commands.add_parser("import", help="importa produtos de um arquivo CSV ou JSON Lines")
+  bulk.add_argument("file")
+  bulk.add_argument("--errors", help="arquivo JSON Lines para as linhas rejeitadas")
+  bulk.add_argument("--batch-size", type=int, default=10000)
+
+  commands.add_parser("compact", help="grava snapshots completos e esvazia os journals")
+
+  ledger = commands.add_parser("ledger", help="consultas sobre o ledger binário de itens vendidos")
+  ledger_commands = ledger.add_subparsers(dest="ledger_command", required=True)
+  ledger_commands.add_parser("rebuild", help="regrava o ledger a partir do histórico de vendas")
+  units = ledger_commands.add_parser("units", help="unidades vendidas por dia, sem carregar as vendas")
+  units.add_argument("barcode", nargs="?", help="sem código, soma todos os produtos")
+  units.add_argument("--start", type=date.fromisoformat)
+  units.add_argument("--end", type=date.fromisoformat)
+
+  batch = commands.add_parser("batch", help="executa os comandos de um arquivo (um por linha)")
+  batch.add_argument("file")
+
+  return parser
+
+def run_command(args, loader: RepositoryLoader):
+  if args.command in ("add", "update"):
+    loader.require(PRODUCTS)
+    operation = add_product if args.command == "add" else edit_product
+    product = operation(
+      args.barcode, args.name, args.description, args.price, args.brand, args.quantity,
+      args.expiration_date is not None, args.expiration_date
+    )
+    print_product(product)
+
+  elif args.command == "restock":
+    loader.require(PRODUCTS)
+    print_product(restock_product(args.barcode, args.quantity))
+
+  elif args.command == "get":
+    loader.require(PRODUCTS)
+    product = find_product(args.barcode)
+    if product is None:
+      raise ValidationError(f"Produto com código {args.barcode} não encontrado")
+    print_product(product)
+
+  elif args.command == "search":
+    loader.require(PRODUCTS)
+    query = ProductQuery(
+      barcode=args.barcode,
+      name=args.name,
+      brand=args.brand,
+      min_price=args.price_range[0] if args.price_range else None,
+      max_price=args.price_range[1] if args.price_range else None,
+      max_quantity=args.low_stock,
+      is_perishable=True if args.perishable else False if args.non_perishable else None,
+      expiring_before=args.expiring_before,
+    )
+    criteria = query.filters()
+    if not criteria:
+      raise ValidationError("Informe ao menos um critério de busca")
+    if args.explain:
+      print(repository.explain(query))
+    else:
+      # Um único critério de texto usa a busca ranqueada (com aproximação); o resto vai ao planejador
+      if criteria.keys() == {"name"}:
+        found_products = search_products_by_name(args.name)
+      elif criteria.keys() == {"brand"}:
+        found_products = search_products_by_brand(args.brand)
+      else:
+        found_products = repository.query(query)
+      for product in found_products:
+        print_product(product)
+
+  elif args.command == "sell":
+    loader.require(PRODUCTS, SALES)
+    sale = sell_products(args.items, args.seller, args.cpf)
+    print(f"{sale.get_id()}\t{sale.get_total():.2f}")
+
+  elif args.command == "remove-expired":
+    loader.require(PRODUCTS)
+    for product in purge_expired_products():
+      print_product(product)
+
+  elif args.command == "report":
+    if args.kind == "sales":
+      loader.require(PRODUCTS, SALES)
+      if args.both:
+        generate_sales_reports(args.start, args.end, args.compress, args.workers)
+      elif args.csv:
+        generate_sales_csv_report(args.start, args.end, args.compress, args.workers)
+      elif args.txt:
+        generate_sales_text_report(args.start, args.end, args.compress, args.workers)
+      else:
+        generate_sales_report(args.start, args.end)
+    else:
+      loader.require(PRODUCTS)
+      if args.csv:
+        generate_expiration_csv_report(args.compress, args.workers)
+      elif args.txt or args.both:
+        generate_expiration_text_report(args.compress, args.workers)
+      else:
+        show_expiration_report()
+
+  elif args.command == "import":
+    loader.require(PRODUCTS)
+    result = import_products(args.file, args.errors, args.batch_size)
+    print(f"{result.inserted} inserido(s), {result.updated} atualizado(s), {result.rejected} rejeitado(s)")
+
+  elif args.command == "compact":
+    loader.compact()
+
+  elif args.command == "ledger":
+    loader.require(PRODUCTS, SALES)
+    if args.ledger_command == "rebuild":
+      print(f"{sales_repository.rebuild_ledger()} item(ns) no ledger")
+    else:
+      product_id = None
+      if args.barcode:
+        product = find_product(args.barcode)
+        if product is None:
+          raise ValidationError(f"Produto com código {args.barcode} não encontrado")
+        product_id = product.get_id()
+      if sales_repository.ledger is None:
+        raise ValidationError("O ledger de vendas está desativado (load_from_file com ledger_filename=None)")
+      for day, units in sales_repository.ledger.units_by_day(product_id, args.start, args.end).items():
+        print(f"{day.isoformat()}\t{units}")
+
+  elif args.command == "batch":
+    return run_batch(args.file, loader)
+
+  return 0
+
+def run_batch(filename: str, loader: RepositoryLoader) -> int:
+  """Executa um comando por linha no mesmo processo; linhas vazias e iniciadas por # são ignoradas"""
+  parser = build_parser()
+  executed = failed = 0
+  with open(filename, "r", encoding="utf-8") as f:
+    for line_number, line in enumerate(f, 1):
+      line = line.strip()
+      if not line or line.startswith("#"):
+        continue
+      try:
+        args = parser.parse_args(shlex.split(line))
+        if args.command == "batch":
+          raise ValidationError("comandos batch não podem ser aninhados")
+        run_command(args, loader)
+        executed += 1
+      except (ValidationError, ValueError) as e:
+        failed += 1
+        print(f"Linha {line_number}: erro: {e}", file=sys.stderr)
+      except SystemExit:
+        failed += 1
+        print(f"Linha {line_number}: comando inválido", file=sys.stderr)
+
+  print(f"{executed} comando(s) executado(s), {failed} com erro", file=sys.stderr)
+  return 1 if failed else 0
+
+def main(argv=None) -> int:
+  args = build_parser().parse_args(argv)
+  loader = RepositoryLoader()
+  try:
+    return run_command(args, loader)
+  except ValidationError as e:
+    print(f"Erro: {e}", file=sys.stderr)
+    return 1
+  finally:
+    loader.close()
+
+if __name__ == "__main__":
+  sys.exit(main())
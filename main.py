@@ -1,51 +1,76 @@
+import os
+import signal
 from datetime import datetime, date
 from uuid import uuid4, UUID
 from models import Product 
-from repositories import repository, sales_repository
+from repositories import repository, sales_repository, open_storage
 from services import (
     insert_product, update_product, show_inventory, make_sale, 
     generate_sales_report, generate_sales_text_report, 
     generate_sales_csv_report, get_product, search_products,
     show_expiration_report, generate_expiration_text_report,
-    generate_expiration_csv_report, remove_expired_products
+    generate_expiration_csv_report, remove_expired_products, show_metrics
 )
-from utils import show_options_menu
+from utils import show_options_menu, AutoSaver
+
+storage = open_storage(os.environ.get("INVENTORY_DB"))
+repository.storage = storage
+sales_repository.storage = storage
 
 repository.load_from_file()
 sales_repository.load_from_file()
+
+autosaver = AutoSaver(
+  [repository, sales_repository],
+  interval=float(os.environ.get("INVENTORY_AUTOSAVE_INTERVAL", "2")),
+  max_dirty=int(os.environ.get("INVENTORY_AUTOSAVE_MAX_DIRTY", "500")),
+)
+autosaver.start()
+
+def handle_sigterm(signum, frame):
+  raise SystemExit(0)
+
+signal.signal(signal.SIGTERM, handle_sigterm)
 keep_application_working = True
 
-while keep_application_working:
-  show_options_menu()
-  option = int(input("\nDigite o número da opção escolhida: "))
-  match option:
-    case 1:
-      insert_product()
-    case 2:
-      update_product()
-    case 3:
-      make_sale()
-    case 4:
-      get_product()
-    case 5:
-      search_products()
-    case 6:
-      show_inventory()
-    case 7:
-      generate_sales_report()
-    case 8:
-      generate_sales_text_report()
-    case 9:
-      generate_sales_csv_report()
-    case 10:
-      show_expiration_report()
-    case 11:
-      generate_expiration_text_report()
-    case 12:
-      generate_expiration_csv_report()
-    case 13:
-      remove_expired_products()
-    case 14:
-      keep_application_working = False
-      repository.save_to_file()
-      sales_repository.save_to_file()
\ No newline at end of file
+try:
+  while keep_application_working:
+    show_options_menu()
+    option = int(input("\nDigite o número da opção escolhida: "))
+    match option:
+      case 1:
+        insert_product()
+      case 2:
+        update_product()
+      case 3:
+        make_sale()
+      case 4:
+        get_product()
+      case 5:
+        search_products()
+      case 6:
+        show_inventory()
+      case 7:
+        generate_sales_report()
+      case 8:
+        generate_sales_text_report()
+      case 9:
+        generate_sales_csv_report()
+      case 10:
+        show_expiration_report()
+      case 11:
+        generate_expiration_text_report()
+      case 12:
+        generate_expiration_csv_report()
+      case 13:
+        remove_expired_products()
+      case 14:
+        show_metrics()
+      case 15:
+        keep_application_working = False
+        repository.save_to_file()
+        sales_repository.save_to_file()
+finally:
+  autosaver.stop()
+  repository.close()
+  sales_repository.close()
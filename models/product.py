@@ -1,6 +1,6 @@
 from datetime import date, datetime
 from uuid import UUID
-from typing import Optional
+from typing import Callable, Optional
 
 class Product:
   def __init__(
@@ -28,39 +28,74 @@ class Product:
     self.__updated_at = updated_at
     self.__is_perishable = is_perishable
     self.__expiration_date = expiration_date
+    self.__dirty = False
+    self.__version = 0
+    self.__change_listener = None
 
   def set_id(self, id: UUID):
     self.__id = id
+    self.__mark_dirty()
 
   def set_name(self, name: str):
     self.__name = name
+    self.__mark_dirty()
 
   def set_description(self, description: str):
     self.__description = description
+    self.__mark_dirty()
 
   def set_price(self, price: float):
     self.__price = price
+    self.__mark_dirty()
 
   def set_brand(self, brand: str):
     self.__brand = brand
+    self.__mark_dirty()
 
   def set_quantity(self, quantity: int):
     self.__quantity = quantity
+    self.__mark_dirty()
 
   def set_barcode(self, barcode: str):
     self.__barcode = barcode
+    self.__mark_dirty()
 
   def set_created_at(self, created_at: datetime):
-    self.__created_at = created_at  
+    self.__created_at = created_at
+    self.__mark_dirty()
 
   def set_updated_at(self, updated_at: datetime):
     self.__updated_at = updated_at
+    self.__mark_dirty()
 
   def set_is_perishable(self, is_perishable: bool):
     self.__is_perishable = is_perishable
+    self.__mark_dirty()
 
   def set_expiration_date(self, expiration_date: Optional[date]):
     self.__expiration_date = expiration_date
+    self.__mark_dirty()
+
+  def get_version(self) -> int:
+    """Contador incrementado a cada alteração; base do compare-and-swap do estoque"""
+    return self.__version
+
+  def is_dirty(self) -> bool:
+    """Indica se o produto mudou desde a última vez que foi persistido"""
+    return self.__dirty
+
+  def mark_clean(self):
+    self.__dirty = False
+
+  def set_change_listener(self, listener: Optional[Callable[["Product"], None]]):
+    """Função chamada a cada alteração feita pelos setters (usada pelo repositório para o autosave)"""
+    self.__change_listener = listener
+
+  def __mark_dirty(self):
+    self.__version += 1
+    self.__dirty = True
+    if self.__change_listener is not None:
+      self.__change_listener(self)
 
   def get_id(self):
     return self.__id
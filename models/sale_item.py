@@ -1,15 +1,49 @@
+from uuid import UUID
+from typing import Optional
 from models import Product
 
 class SaleItem:
-  def __init__(self, product: Product, quantity: int):
+  """Item de venda autossuficiente: guarda o preço unitário, o nome e o código de barras do
+  produto no momento da venda, de forma que a venda pode ser carregada, totalizada e
+  relatada sem o estoque. O produto em si é só um vínculo opcional (veja
+  SalesRepository.resolve_product)."""
+
+  def __init__(
+    self,
+    product: Optional[Product] = None,
+    quantity: int = 0,
+    product_id: Optional[UUID] = None,
+    unit_price: Optional[float] = None,
+    product_name: Optional[str] = None,
+    barcode: Optional[str] = None,
+  ):
     self.__product = product
     self.__quantity = quantity
+    self.__product_id = product_id if product_id is not None else product.get_id()
+    self.__unit_price = unit_price if unit_price is not None else product.get_price()
+    self.__product_name = product_name if product_name is not None else product.get_name()
+    self.__barcode = barcode if barcode is not None else product.get_barcode()
 
-  def get_product(self):
+  def get_product(self) -> Optional[Product]:
     return self.__product
 
+  def set_product(self, product: Optional[Product]):
+    self.__product = product
+
+  def get_product_id(self):
+    return self.__product_id
+
+  def get_unit_price(self):
+    return self.__unit_price
+
+  def get_product_name(self):
+    return self.__product_name
+
+  def get_barcode(self):
+    return self.__barcode
+
   def get_quantity(self):
     return self.__quantity
 
   def get_subtotal(self):
-    return self.__product.get_price() * self.__quantity
+    return self.__unit_price * self.__quantity
@@ -1,4 +1,24 @@
+from .storage import (
+  StorageBackend, JsonStorage, SnapshotStorage, SqliteStorage, migrate_to_sqlite, migrate_json_to_sqlite, open_storage
+)
+from .snapshot import SnapshotError
+from .sales_segments import SalesSegments
+from .expiration_index import (
+  ExpirationIndex, ExpirationClassification, classify_days, EXPIRED, EXPIRING_SOON, EXPIRING_MONTH, VALID
+)
+from .text_index import TrigramIndex, fold_text
+from .sorted_index import SortedIndex
+from .product_query import ProductQuery, QueryPlan
 from .product_repository import ProductRepository, repository
+from .sales_aggregates import SalesAggregates
+from .sales_ledger import SalesLedger, LedgerColumns
 from .sales_repository import SalesRepository, sales_repository
 
-__all__ = ["ProductRepository", "repository", "SalesRepository", "sales_repository"]
\ No newline at end of file
+__all__ = [
+  "ProductRepository", "repository", "SalesRepository", "sales_repository", "SalesAggregates", "SalesLedger", "LedgerColumns",
+  "StorageBackend", "JsonStorage", "SnapshotStorage", "SqliteStorage", "migrate_to_sqlite",
+  "migrate_json_to_sqlite", "open_storage", "SnapshotError", "SalesSegments",
+  "ExpirationIndex", "ExpirationClassification", "classify_days",
+  "EXPIRED", "EXPIRING_SOON", "EXPIRING_MONTH", "VALID",
+  "TrigramIndex", "fold_text", "SortedIndex", "ProductQuery", "QueryPlan",
+]
\ No newline at end of file
@@ -0,0 +1,43 @@
+from datetime import date
+from models import Product
+from .sorted_index import SortedIndex
+
+EXPIRING_SOON_DAYS = 7
+EXPIRING_MONTH_DAYS = 30
+
+EXPIRED = "expired"
+EXPIRING_SOON = "expiring_soon"
+EXPIRING_MONTH = "expiring_month"
+VALID = "valid"
+
+def classify_days(days_until_expiration: int) -> str:
+  """Classifica a quantidade de dias até o vencimento nas faixas usadas pelos relatórios"""
+  if days_until_expiration < 0:
+    return EXPIRED
+  if days_until_expiration <= EXPIRING_SOON_DAYS:
+    return EXPIRING_SOON
+  if days_until_expiration <= EXPIRING_MONTH_DAYS:
+    return EXPIRING_MONTH
+  return VALID
+
+class ExpirationIndex(SortedIndex):
+  """Produtos perecíveis com data de validade, ordenados por (ordinal da data de validade, id).
+  position(ordinal) é a posição do primeiro produto que vence depois desse dia."""
+
+class ExpirationClassification:
+  """Produtos perecíveis separados por faixa de validade em relação a uma única data de avaliação.
+
+  Cada faixa é uma lista de (produto, dias até o vencimento) em ordem de validade; os dias dos
+  produtos vencidos são negativos.
+  """
+
+  def __init__(self, today: date, buckets: dict[str, list[tuple[Product, int]]], non_perishable: list[Product]):
+    self.today = today
+    self.expired = buckets[EXPIRED]
+    self.expiring_soon = buckets[EXPIRING_SOON]
+    self.expiring_month = buckets[EXPIRING_MONTH]
+    self.valid = buckets[VALID]
+    self.non_perishable = non_perishable
+
+  def perishable(self) -> list[tuple[Product, int]]:
+    return self.expired + self.expiring_soon + self.expiring_month + self.valid
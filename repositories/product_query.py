@@ -0,0 +1,118 @@
+from datetime import date
+from typing import Callable
+from models import Product
+from .product_table import price_to_cents, price_bounds_cents
+from .text_index import fold_text
+
+BARCODE = "barcode"
+NAME = "name"
+BRAND = "brand"
+PRICE = "price"
+QUANTITY = "quantity"
+PERISHABLE = "perishable"
+EXPIRATION = "expiration"
+TABLE_SCAN = "scan"
+
+INDEX_LABELS = {
+  BARCODE: "código de barras",
+  NAME: "trigramas do nome",
+  BRAND: "trigramas da marca",
+  PRICE: "preço (ordenado)",
+  QUANTITY: "quantidade (ordenado)",
+  EXPIRATION: "validade (ordenado)",
+  TABLE_SCAN: "varredura da tabela colunar",
+}
+
+# Predicados que a varredura colunar (ProductTable.filter_ids) já resolve
+TABLE_SCAN_COVERS = {PRICE, QUANTITY, PERISHABLE, EXPIRATION}
+
+# Custo relativo de uma linha na varredura colunar frente a um produto lido por índice e
+# conferido pelos filtros restantes em Python
+TABLE_SCAN_ROW_COST = 0.1
+
+class ProductQuery:
+  """Predicados combinados com E lógico; None significa sem restrição naquele campo.
+  name e brand casam por trecho, sem diferenciar acentos; max_quantity é exclusivo."""
+
+  def __init__(
+    self,
+    barcode: str | None = None,
+    name: str | None = None,
+    brand: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    max_quantity: int | None = None,
+    is_perishable: bool | None = None,
+    expiring_before: date | None = None,
+  ):
+    self.barcode = barcode
+    self.name = name
+    self.brand = brand
+    self.min_price = min_price
+    self.max_price = max_price
+    self.max_quantity = max_quantity
+    self.is_perishable = is_perishable
+    self.expiring_before = expiring_before
+
+  def filters(self) -> dict[str, tuple[str, Callable[[Product], bool]]]:
+    """Predicados ativos, cada um com uma descrição para o explain e o teste sobre o produto"""
+    filters = {}
+    if self.barcode is not None:
+      barcode = self.barcode
+      filters[BARCODE] = (f"código de barras = {barcode}", lambda p: p.get_barcode() == barcode)
+    if self.name:
+      name = fold_text(self.name)
+      filters[NAME] = (f"nome contém '{name}'", lambda p: name in fold_text(p.get_name()))
+    if self.brand:
+      brand = fold_text(self.brand)
+      filters[BRAND] = (f"marca contém '{brand}'", lambda p: brand in fold_text(p.get_brand()))
+    if self.min_price is not None or self.max_price is not None:
+      low, high = price_bounds_cents(self.min_price, self.max_price)
+      filters[PRICE] = (self.describe_price(), lambda p: low <= price_to_cents(p.get_price()) <= high)
+    if self.max_quantity is not None:
+      max_quantity = self.max_quantity
+      filters[QUANTITY] = (f"quantidade < {max_quantity}", lambda p: p.get_quantity() < max_quantity)
+    if self.is_perishable is not None:
+      is_perishable = self.is_perishable
+      filters[PERISHABLE] = (
+        "perecível" if is_perishable else "não perecível",
+        lambda p: p.get_is_perishable() == is_perishable,
+      )
+    if self.expiring_before is not None:
+      expiring_before = self.expiring_before
+      filters[EXPIRATION] = (
+        f"validade antes de {expiring_before.strftime('%d/%m/%Y')}",
+        lambda p: bool(p.get_is_perishable() and p.get_expiration_date() and p.get_expiration_date() < expiring_before),
+      )
+    return filters
+
+  def describe_price(self) -> str:
+    if self.min_price is not None and self.max_price is not None:
+      return f"preço entre R$ {self.min_price:.2f} e R$ {self.max_price:.2f}"
+    if self.min_price is not None:
+      return f"preço a partir de R$ {self.min_price:.2f}"
+    return f"preço até R$ {self.max_price:.2f}"
+
+class QueryPlan:
+  """Caminho de acesso escolhido pelo planejador: o índice que gera os candidatos, as estimativas
+  de todos os caminhos considerados e os filtros que ainda são conferidos produto a produto"""
+
+  def __init__(
+    self,
+    index: str,
+    estimates: dict[str, int],
+    residual: list[tuple[str, Callable[[Product], bool]]],
+    fetch: Callable[[], list],
+  ):
+    self.index = index
+    self.estimates = estimates
+    self.residual = residual
+    self.fetch = fetch
+
+  def explain(self) -> str:
+    lines = [f"Índice usado: {INDEX_LABELS[self.index]} (~{self.estimates[self.index]} candidato(s))"]
+    alternatives = [f"{INDEX_LABELS[name]} ~{rows}" for name, rows in self.estimates.items() if name != self.index]
+    if alternatives:
+      lines.append("Alternativas: " + "; ".join(alternatives))
+    lines.append("Filtros restantes: " + (", ".join(description for description, _ in self.residual) or "nenhum"))
+    return "\n".join(lines)
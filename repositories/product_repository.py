@@ -1,96 +1,590 @@
+import threading
 from models import Product
 from uuid import UUID
-from utils import save_json, load_json
+from utils import save_json, iter_json_records, iter_batches, Journal, read_journal, instrument_methods
 from datetime import datetime, date
+from typing import Callable
+from .storage import StorageBackend, JsonStorage
+from .product_table import ProductTable, price_to_cents, price_bounds_cents
+from .product_query import (
+  ProductQuery, QueryPlan, BARCODE, NAME, BRAND, PRICE, QUANTITY, EXPIRATION, TABLE_SCAN,
+  TABLE_SCAN_COVERS, TABLE_SCAN_ROW_COST,
+)
+from .sorted_index import SortedIndex
+from .text_index import TrigramIndex
+from .expiration_index import (
+  ExpirationIndex, ExpirationClassification, EXPIRED, EXPIRING_SOON, EXPIRING_MONTH, VALID,
+  EXPIRING_SOON_DAYS, EXPIRING_MONTH_DAYS,
+)
+
+# Locks por produto distribuídos em faixas pelo id: vendas de produtos diferentes quase nunca
+# disputam o mesmo lock, sem manter um lock por produto em memória
+PRODUCT_LOCK_STRIPES = 1024
+
+def normalize_key(value: str) -> str:
+  return " ".join(value.split()).casefold()
+
+# Auxiliares chamados por produto dentro de métodos já medidos (flush, load_from_file, adjust_quantity...)
+@instrument_methods(exclude=(
+  "product_to_dict", "dict_to_product", "apply_journal_record", "product_lock", "compare_and_set_quantity",
+))
 class ProductRepository:
-  def __init__(self):
+  """Repositório em memória seguro para várias threads (ex.: vários caixas): alterações de
+  produtos e índices são serializadas por um lock do repositório, as consultas que percorrem os
+  índices também o seguram (um índice nunca é lido no meio de uma alteração), e o estoque é ajustado por
+  compare-and-swap sobre a versão de cada produto (veja adjust_quantity), sem passar por esse
+  lock: os índices de estoque são atualizados na próxima consulta que depende deles."""
+
+  def __init__(self, storage: StorageBackend | None = None):
     self.inventory: dict[UUID, Product] = {}
+    self.storage: StorageBackend = storage or JsonStorage()
+    self.__barcode_index: dict[str, UUID] = {}
+    self.__name_index: dict[str, set[UUID]] = {}
+    self.__brand_index: dict[str, set[UUID]] = {}
+    self.__indexed_keys: dict[UUID, tuple] = {}
+    self.expiration_index = ExpirationIndex()
+    self.price_index = SortedIndex()
+    self.quantity_index = SortedIndex()
+    self.table = ProductTable()
+    self.name_search = TrigramIndex()
+    self.brand_search = TrigramIndex()
+    self.journal: Journal | None = None
+    self.__loading = False
+    self.__lock = threading.RLock()
+    self.__dirty_ids: set[UUID] = set()
+    self.__dirty_lock = threading.Lock()
+    self.__stale_quantities: set[UUID] = set()
+    self.__stale_lock = threading.Lock()
+    self.dirty_listener: Callable[[int], None] | None = None
+    self.__change_listener = self.__on_product_change
+    self.__product_locks = [threading.Lock() for _ in range(PRODUCT_LOCK_STRIPES)]
 
   def insert_product(self, product: Product):
-    self.inventory[product.get_id()] = product
+    with self.__lock:
+      self.inventory[product.get_id()] = product
+      self.__index(product)
+      self.__track(product)
+      self.__journal_upsert(product)
+      self.__mark_dirty(product.get_id())
+
+  def insert_products(self, products: list[Product]):
+    """Insere ou substitui um lote de produtos; journal, backend e índice de validade são
+    atualizados uma única vez para o lote inteiro"""
+    products = list({product.get_id(): product for product in products}.values())
+    pending: dict[SortedIndex, list[tuple[int, UUID]]] = {}
+    with self.__lock:
+      for product in products:
+        self.inventory[product.get_id()] = product
+        self.__index(product, pending)
+        self.__track(product)
+      for index, entries in pending.items():
+        index.add_many(entries)
+
+      if self.__loading:
+        return
+      self.__write_upserts(products)
+      with self.__dirty_lock:
+        for product in products:
+          self.__dirty_ids.discard(product.get_id())
 
   def update_product(self, id: UUID, product: Product) -> Product | None:
-    self.inventory[id] = product
+    with self.__lock:
+      if product.get_id() != id:
+        self.__unindex(id)
+        self.inventory.pop(id, None)
+        self.__journal_remove(id)
+        self.__mark_dirty(id)
+      self.inventory[product.get_id()] = product
+      self.__index(product)
+      self.__track(product)
+      self.__journal_upsert(product)
+      self.__mark_dirty(product.get_id())
     return product
 
+  def product_lock(self, id: UUID) -> threading.Lock:
+    """Lock que protege as alterações de um produto (compartilhado com outros ids da mesma faixa)"""
+    return self.__product_locks[id.int % PRODUCT_LOCK_STRIPES]
+
+  def compare_and_set_quantity(
+    self, product: Product, expected_version: int, quantity: int, now: datetime | None = None
+  ) -> bool:
+    """Grava quantity (e updated_at, com now) só se o produto continua na versão lida por quem
+    calculou o novo valor. Só o lock do produto é usado: o índice de estoque e a tabela colunar
+    são atualizados depois, pela próxima consulta que os lê (veja __refresh_quantities).
+    O registro vai para o journal ainda sob o lock do produto, na ordem das alterações."""
+    with self.product_lock(product.get_id()):
+      if product.get_version() != expected_version:
+        return False
+      product.set_quantity(quantity)
+      if now is not None:
+        product.set_updated_at(now)
+      # Um produto removido não volta a existir na reaplicação do journal
+      if self.inventory.get(product.get_id()) is product:
+        self.__journal_upsert(product)
+    with self.__stale_lock:
+      self.__stale_quantities.add(product.get_id())
+    return True
+
+  def adjust_quantity(self, id: UUID, delta: int, now: datetime | None = None) -> Product | None:
+    """Soma delta ao estoque de forma atômica, repetindo o compare-and-swap se outra thread
+    alterou o produto no meio; retorna None se o produto não existe ou o estoque ficaria negativo"""
+    product = self.inventory.get(id)
+    if product is None:
+      return None
+    while True:
+      version = product.get_version()
+      quantity = product.get_quantity() + delta
+      if quantity < 0:
+        return None
+      if self.compare_and_set_quantity(product, version, quantity, now):
+        return product
+
   def list_products(self) -> dict[UUID, Product]:
     return self.inventory
 
   def list_products_by_brand(self, brand: str) -> list[Product]:
-    return [
-      product for product in self.inventory.values() if product.get_brand().lower() == brand.lower()
-    ]
+    with self.__lock:
+      ids = self.__brand_index.get(normalize_key(brand), ())
+      return [self.inventory[id] for id in ids]
+
+  def search_by_name(self, query: str, limit: int | None = None) -> list[Product]:
+    """Produtos cujo nome contém query, sem diferenciar acentos e maiúsculas, do melhor casamento
+    para o pior; quando nenhum nome contém o trecho, devolve os nomes mais parecidos"""
+    with self.__lock:
+      return [self.inventory[id] for id in self.name_search.search(query, limit)]
+
+  def search_by_brand(self, query: str, limit: int | None = None) -> list[Product]:
+    """Como search_by_name, sobre as marcas"""
+    with self.__lock:
+      return [self.inventory[id] for id in self.brand_search.search(query, limit)]
 
   def get_product(self, id: UUID) -> Product | None:
     return self.inventory.get(id)
 
   def get_product_by_name(self, name: str) -> Product | None:
-    for product in self.inventory.values():
-      if product.get_name() == name.lower():
-        return product
-
-    return None
+    with self.__lock:
+      ids = self.__name_index.get(normalize_key(name))
+      return self.inventory[next(iter(ids))] if ids else None
 
   def get_product_by_barcode(self, barcode: str) -> Product | None:
-    for product in self.inventory.values():
-      if product.get_barcode() == barcode:
-        return product
-
-    return None
+    id = self.__barcode_index.get(barcode)
+    return self.inventory.get(id) if id else None
 
   def remove_product(self, id: UUID) -> bool:
-    if id in self.inventory:
-      del self.inventory[id]
-      return True
-    return False
-  
-  def save_to_file(self, filename="inventory.json"):
-    data = [self.product_to_dict(p) for p in self.inventory.values()]
-    save_json(data, filename)
-
-  def load_from_file(self, filename="inventory.json"):
-    data = load_json(filename)
-    if not data:
+    # Com o lock do produto, nenhum compare-and-swap grava no journal um produto já removido
+    with self.__lock, self.product_lock(id):
+      if id in self.inventory:
+        self.__unindex(id)
+        self.inventory.pop(id).set_change_listener(None)
+        self.__journal_remove(id)
+        self.__mark_dirty(id)
+        return True
+      return False
+
+  def find_products(
+    self,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    max_quantity: int | None = None,
+    is_perishable: bool | None = None,
+    expiring_before: date | None = None,
+  ) -> list[Product]:
+    """Filtra produtos por faixa de preço, estoque abaixo de um limite, perecibilidade e validade.
+    Enquanto há alterações ainda não gravadas no backend, responde pela tabela em memória."""
+    self.__refresh_quantities()
+    with self.__lock:
+      ids = None
+      if not self.__dirty_ids:
+        ids = self.storage.query_product_ids(min_price, max_price, max_quantity, is_perishable, expiring_before)
+      if ids is not None:
+        products = (self.inventory.get(UUID(id)) for id in ids)
+        return [product for product in products if product is not None]
+
+      ids = self.table.filter_ids(min_price, max_price, max_quantity, is_perishable, expiring_before)
+      return [self.inventory[id] for id in ids]
+
+  def query(self, query: ProductQuery | None = None, **predicates) -> list[Product]:
+    """Produtos que atendem a todos os predicados (veja ProductQuery), na ordem do índice escolhido"""
+    with self.__lock:
+      plan = self.plan_query(query or ProductQuery(**predicates))
+      products = (self.inventory[id] for id in plan.fetch())
+      tests = [test for _, test in plan.residual]
+      return [product for product in products if all(test(product) for test in tests)]
+
+  def explain(self, query: ProductQuery | None = None, **predicates) -> str:
+    with self.__lock:
+      return self.plan_query(query or ProductQuery(**predicates)).explain()
+
+  def plan_query(self, query: ProductQuery) -> QueryPlan:
+    """Estima quantos candidatos cada índice aplicável geraria e escolhe o mais barato.
+    A varredura colunar custa menos por linha, mas o que ela deixa passar ainda é conferido
+    em Python pelos filtros de texto; essa sobra é estimada pelo índice numérico mais seletivo."""
+    self.__refresh_quantities()
+    paths: dict[str, tuple[int, Callable[[], list]]] = {}
+    if query.barcode is not None:
+      id = self.__barcode_index.get(query.barcode)
+      ids = [id] if id else []
+      paths[BARCODE] = (len(ids), lambda: ids)
+    if query.name:
+      paths[NAME] = (self.name_search.estimate(query.name), lambda: self.name_search.matches(query.name))
+    if query.brand:
+      paths[BRAND] = (self.brand_search.estimate(query.brand), lambda: self.brand_search.matches(query.brand))
+    if query.min_price is not None or query.max_price is not None:
+      low, high = price_bounds_cents(query.min_price, query.max_price)
+      paths[PRICE] = (self.price_index.count(low, high), lambda: self.price_index.ids(low, high))
+    if query.max_quantity is not None:
+      high = query.max_quantity - 1
+      paths[QUANTITY] = (self.quantity_index.count(None, high), lambda: self.quantity_index.ids(None, high))
+    if query.expiring_before is not None:
+      end = self.expiration_index.position(query.expiring_before.toordinal() - 1)
+      paths[EXPIRATION] = (end, lambda: [id for _, _, id in self.expiration_index.keys()[:end]])
+    paths[TABLE_SCAN] = (len(self.table), lambda: self.table.filter_ids(
+      query.min_price, query.max_price, query.max_quantity, query.is_perishable, query.expiring_before
+    ))
+
+    filters = query.filters()
+    scan_output = min(rows for name, (rows, _) in paths.items() if name in TABLE_SCAN_COVERS or name == TABLE_SCAN)
+    scan_has_residual = any(name not in TABLE_SCAN_COVERS for name in filters)
+
+    def cost(name: str) -> float:
+      rows = paths[name][0]
+      if name != TABLE_SCAN:
+        return rows
+      return rows * TABLE_SCAN_ROW_COST + (scan_output if scan_has_residual else 0)
+
+    index = min(paths, key=cost)
+    covered = TABLE_SCAN_COVERS if index == TABLE_SCAN else {index}
+    residual = [filter for name, filter in filters.items() if name not in covered]
+    return QueryPlan(index, {name: rows for name, (rows, _) in paths.items()}, residual, paths[index][1])
+
+  def list_expired_products(self, today: date | None = None) -> list[Product]:
+    """Produtos vencidos em relação a today, em ordem de validade"""
+    today = today or date.today()
+    with self.__lock:
+      end = self.expiration_index.position(today.toordinal() - 1)
+      return [self.inventory[id] for _, _, id in self.expiration_index.keys()[:end]]
+
+  def classify_expiration(self, today: date | None = None) -> ExpirationClassification:
+    """Separa os perecíveis em vencidos, vencendo em até 7 dias, em até 30 dias e válidos,
+    todos avaliados contra a mesma data"""
+    today = today or date.today()
+    today_ordinal = today.toordinal()
+    with self.__lock:
+      keys = self.expiration_index.keys()
+      bounds = [
+        0,
+        self.expiration_index.position(today_ordinal - 1),
+        self.expiration_index.position(today_ordinal + EXPIRING_SOON_DAYS),
+        self.expiration_index.position(today_ordinal + EXPIRING_MONTH_DAYS),
+        len(keys),
+      ]
+      buckets = {
+        status: [(self.inventory[id], ordinal - today_ordinal) for ordinal, _, id in keys[start:end]]
+        for status, start, end in zip((EXPIRED, EXPIRING_SOON, EXPIRING_MONTH, VALID), bounds, bounds[1:])
+      }
+      return ExpirationClassification(today, buckets, self.find_products(is_perishable=False))
+
+  def check_indexes(self, rebuild: bool = False) -> bool:
+    """Confere se os índices secundários refletem o inventário; opcionalmente os reconstrói"""
+    self.__refresh_quantities()
+    with self.__lock:
+      expected = ProductRepository()
+      expected.inventory = dict(self.inventory)
+      expected.rebuild_indexes()
+
+      consistent = (
+        self.__barcode_index == expected.__barcode_index
+        and self.__name_index == expected.__name_index
+        and self.__brand_index == expected.__brand_index
+        and self.__indexed_keys == expected.__indexed_keys
+        and self.expiration_index.keys() == expected.expiration_index.keys()
+        and self.price_index.keys() == expected.price_index.keys()
+        and self.quantity_index.keys() == expected.quantity_index.keys()
+        and self.name_search.texts() == expected.name_search.texts()
+        and self.brand_search.texts() == expected.brand_search.texts()
+      )
+      if not consistent and rebuild:
+        self.rebuild_indexes()
+      return consistent
+
+  def rebuild_indexes(self):
+    with self.__lock:
+      with self.__stale_lock:
+        self.__stale_quantities.clear()
+      self.__barcode_index.clear()
+      self.__name_index.clear()
+      self.__brand_index.clear()
+      self.__indexed_keys.clear()
+      self.expiration_index.clear()
+      self.price_index.clear()
+      self.quantity_index.clear()
+      self.table.clear()
+      self.name_search.clear()
+      self.brand_search.clear()
+      pending: dict[SortedIndex, list[tuple[int, UUID]]] = {}
+      for product in self.inventory.values():
+        self.__index(product, pending)
+      for index, entries in pending.items():
+        index.add_many(entries)
+
+  def __refresh_quantities(self):
+    """Reindexa os produtos cujo estoque mudou por compare-and-swap desde a última consulta"""
+    if not self.__stale_quantities:
+      return
+    with self.__lock:
+      with self.__stale_lock:
+        ids, self.__stale_quantities = self.__stale_quantities, set()
+      for id in ids:
+        product = self.inventory.get(id)
+        if product is not None:
+          self.__index(product)
+
+  def __index_keys(self, product: Product) -> tuple:
+    expiration_date = product.get_expiration_date()
+    expiration = expiration_date.toordinal() if product.get_is_perishable() and expiration_date else None
+    return (
+      product.get_barcode(), normalize_key(product.get_name()), normalize_key(product.get_brand()),
+      expiration, price_to_cents(product.get_price()), product.get_quantity(), product.get_is_perishable(),
+    )
+
+  def __index(self, product: Product, pending: dict[SortedIndex, list[tuple[int, UUID]]] | None = None):
+    """Indexa product ou atualiza só as chaves que mudaram desde a última indexação; com pending,
+    as entradas dos índices ordenados são acumuladas para uma inserção em lote"""
+    id = product.get_id()
+    keys = self.__index_keys(product)
+    previous = self.__indexed_keys.get(id)
+    if previous == keys:
+      return
+    self.__indexed_keys[id] = keys
+    barcode, name, brand, expiration, price, quantity, _ = keys
+    old_barcode, old_name, old_brand, old_expiration, old_price, old_quantity, _ = previous or (None,) * len(keys)
+
+    if barcode != old_barcode:
+      if old_barcode is not None and self.__barcode_index.get(old_barcode) == id:
+        del self.__barcode_index[old_barcode]
+      self.__barcode_index[barcode] = id
+    for index, key, old_key in ((self.__name_index, name, old_name), (self.__brand_index, brand, old_brand)):
+      if key != old_key:
+        if old_key is not None:
+          self.__discard(index, old_key, id)
+        index.setdefault(key, set()).add(id)
+    for index, value, old_value in (
+      (self.expiration_index, expiration, old_expiration),
+      (self.price_index, price, old_price),
+      (self.quantity_index, quantity, old_quantity),
+    ):
+      if value != old_value:
+        if old_value is not None:
+          index.remove(old_value, id)
+        if value is None:
+          continue
+        if pending is None:
+          index.add(value, id)
+        else:
+          pending.setdefault(index, []).append((value, id))
+
+    self.table.upsert(product)
+    if name != old_name:
+      self.name_search.add(id, product.get_name())
+    if brand != old_brand:
+      self.brand_search.add(id, product.get_brand())
+
+  def __unindex(self, id: UUID):
+    keys = self.__indexed_keys.pop(id, None)
+    if keys is None:
+      return
+    barcode, name, brand, expiration, price, quantity, _ = keys
+    if self.__barcode_index.get(barcode) == id:
+      del self.__barcode_index[barcode]
+    self.__discard(self.__name_index, name, id)
+    self.__discard(self.__brand_index, brand, id)
+    if expiration is not None:
+      self.expiration_index.remove(expiration, id)
+    self.price_index.remove(price, id)
+    self.quantity_index.remove(quantity, id)
+    self.table.remove(id)
+    self.name_search.remove(id)
+    self.brand_search.remove(id)
+
+  def __discard(self, index: dict[str, set[UUID]], key: str, id: UUID):
+    ids = index.get(key)
+    if ids is not None:
+      ids.discard(id)
+      if not ids:
+        del index[key]
+
+  def save_to_file(self, filename=None):
+    """Grava um snapshot completo e compacta o journal, cujos registros passam a estar no snapshot.
+    Com filename, exporta para esse arquivo JSON em vez de usar o backend de armazenamento."""
+    if filename:
+      save_json([self.product_to_dict(p) for p in self.inventory.values()], filename)
+      return
+    with self.__lock:
+      self.flush()
+      if not self.storage.write_through:
+        typed = self.storage.typed_records
+        self.storage.save_products([self.product_to_dict(p, typed) for p in self.inventory.values()])
+      if self.journal:
+        self.journal.truncate()
+
+  def load_from_file(self, filename=None, journal_filename="inventory.journal", batch_size=10000):
+    """Carrega o último snapshot, reaplica o journal por cima e passa a registrar novas alterações.
+    Os registros do journal são gravados num backend write-through antes de o journal ser reaberto:
+    uma queda entre o journal e o backend não perde a alteração no próximo save_to_file."""
+    if self.journal:
+      self.journal.close()
+      self.journal = None
+
+    self.__loading = True
+    try:
+      data = iter_json_records(filename) if filename else self.storage.load_products()
+      for batch in iter_batches(data, batch_size):
+        self.insert_products([self.dict_to_product(item) for item in batch])
+    finally:
+      self.__loading = False
+
+    # Sem journal aberto, a reaplicação só marca os produtos como pendentes (e insert_products
+    # grava direto no backend); o flush leva as alterações pendentes ao backend write-through
+    for record in read_journal(journal_filename):
+      self.apply_journal_record(record)
+    self.flush()
+
+    self.journal = Journal(journal_filename)
+
+  def close(self):
+    """Grava as alterações pendentes, força a gravação do journal e o fecha"""
+    with self.__lock:
+      self.flush()
+      if self.journal:
+        self.journal.close()
+        self.journal = None
+
+  def dirty_count(self) -> int:
+    return len(self.__dirty_ids)
+
+  def flush(self) -> int:
+    """Força a gravação do journal (escrito a cada alteração, com fsync agrupado) e grava no
+    backend write-through só os produtos alterados desde o último flush (um registro por produto,
+    por mais que ele tenha mudado); retorna quantos foram gravados. Chamado pela thread de autosave."""
+    with self.__lock:
+      with self.__dirty_lock:
+        ids, self.__dirty_ids = self.__dirty_ids, set()
+      if not ids:
+        return 0
+      products = [self.inventory[id] for id in ids if id in self.inventory]
+      removed = [id for id in ids if id not in self.inventory]
+      try:
+        if self.journal:
+          self.journal.sync()
+        if self.storage.write_through:
+          if products:
+            self.storage.upsert_products([self.product_to_dict(product) for product in products])
+          for id in removed:
+            self.storage.delete_product(str(id))
+        for product in products:
+          product.mark_clean()
+      except BaseException:
+        # Regravar um upsert ou remoção já gravado no backend é inofensivo
+        with self.__dirty_lock:
+          self.__dirty_ids |= ids
+        raise
+      return len(ids)
+
+  def apply_journal_record(self, record: dict):
+    if record["op"] == "upsert":
+      self.insert_product(self.dict_to_product(record["product"]))
+    elif record["op"] == "upsert_many":
+      self.insert_products([self.dict_to_product(item) for item in record["products"]])
+    elif record["op"] == "remove":
+      self.remove_product(UUID(record["id"]))
+
+  def __write_upserts(self, products: list[Product]):
+    if products and (self.journal or self.storage.write_through):
+      records = [self.product_to_dict(product) for product in products]
+      if self.journal:
+        self.journal.append({"op": "upsert_many", "products": records})
+      if self.storage.write_through:
+        self.storage.upsert_products(records)
+    for product in products:
+      product.mark_clean()
+
+  def __journal_upsert(self, product: Product):
+    if self.journal:
+      self.journal.append({"op": "upsert", "product": self.product_to_dict(product)})
+
+  def __journal_remove(self, id: UUID):
+    if self.journal:
+      self.journal.append({"op": "remove", "id": str(id)})
+
+  def __track(self, product: Product):
+    """Faz os setters do produto marcarem-no como pendente de gravação"""
+    product.set_change_listener(self.__change_listener)
+
+  def __on_product_change(self, product: Product):
+    self.__mark_dirty(product.get_id())
+
+  def __mark_dirty(self, id: UUID):
+    if self.__loading:
       return
-    for item in data:
-      product = self.dict_to_product(item)
-      self.insert_product(product)
+    # Lock próprio: marcar um produto vendido não disputa o lock do repositório
+    with self.__dirty_lock:
+      self.__dirty_ids.add(id)
+      count = len(self.__dirty_ids)
+    if self.dirty_listener:
+      self.dirty_listener(count)
 
-  def product_to_dict(self, product: Product) -> dict:
+  def product_to_dict(self, product: Product, typed: bool = False) -> dict:
+    """Registro de um produto; com typed, mantém UUID e datas como objetos (para backends binários)"""
+    if typed:
       return {
-        "id": str(product.get_id()),
+        "id": product.get_id(),
         "name": product.get_name(),
         "description": product.get_description(),
         "price": product.get_price(),
         "brand": product.get_brand(),
         "quantity": product.get_quantity(),
         "barcode": product.get_barcode(),
-        "created_at": product.get_created_at().isoformat(),
-        "updated_at": product.get_updated_at().isoformat(),
+        "created_at": product.get_created_at(),
+        "updated_at": product.get_updated_at(),
         "is_perishable": product.get_is_perishable(),
-        "expiration_date": product.get_expiration_date().isoformat() if product.get_expiration_date() else None,
+        "expiration_date": product.get_expiration_date(),
       }
+    return {
+      "id": str(product.get_id()),
+      "name": product.get_name(),
+      "description": product.get_description(),
+      "price": product.get_price(),
+      "brand": product.get_brand(),
+      "quantity": product.get_quantity(),
+      "barcode": product.get_barcode(),
+      "created_at": product.get_created_at().isoformat(),
+      "updated_at": product.get_updated_at().isoformat(),
+      "is_perishable": product.get_is_perishable(),
+      "expiration_date": product.get_expiration_date().isoformat() if product.get_expiration_date() else None,
+    }
 
   def dict_to_product(self, data: dict) -> Product:
+    if isinstance(data["id"], UUID):
+      return Product(**data)
 
-      is_perishable = data.get("is_perishable", True)
-      expiration_date = None
-      
-      if "expiration_date" in data and data["expiration_date"]:
-        expiration_date = date.fromisoformat(data["expiration_date"])
-      
-      return Product(
-        id=UUID(data["id"]),
-        name=data["name"],
-        description=data["description"],
-        price=float(data["price"]),
-        brand=data["brand"],
-        quantity=int(data["quantity"]),
-        barcode=data["barcode"],
-        created_at=datetime.fromisoformat(data["created_at"]),
-        updated_at=datetime.fromisoformat(data["updated_at"]),
-        is_perishable=is_perishable,
-        expiration_date=expiration_date,
-      )
+    is_perishable = data.get("is_perishable", True)
+    expiration_date = None
+
+    if "expiration_date" in data and data["expiration_date"]:
+      expiration_date = date.fromisoformat(data["expiration_date"])
+
+    return Product(
+      id=UUID(data["id"]),
+      name=data["name"],
+      description=data["description"],
+      price=float(data["price"]),
+      brand=data["brand"],
+      quantity=int(data["quantity"]),
+      barcode=data["barcode"],
+      created_at=datetime.fromisoformat(data["created_at"]),
+      updated_at=datetime.fromisoformat(data["updated_at"]),
+      is_perishable=is_perishable,
+      expiration_date=expiration_date,
+    )
 
 repository = ProductRepository()
\ No newline at end of file
@@ -0,0 +1,105 @@
+import math
+import operator
+from array import array
+from datetime import date
+from itertools import compress, repeat
+from uuid import UUID
+from models import Product
+
+NO_EXPIRATION = 2 ** 62
+
+def price_to_cents(price: float) -> int:
+  return round(price * 100)
+
+def price_bounds_cents(min_price: float | None, max_price: float | None) -> tuple[int, int]:
+  """Faixa de preço em centavos inteiros, inclusiva; limites None viram os extremos de int64"""
+  low = math.ceil(round(min_price * 100, 6)) if min_price is not None else -2 ** 63
+  high = math.floor(round(max_price * 100, 6)) if max_price is not None else 2 ** 63 - 1
+  return low, high
+
+class ProductTable:
+  """Tabela colunar (struct-of-arrays) com os campos numéricos dos produtos.
+
+  Cada produto ocupa uma linha; as colunas ficam em arrays compactos do módulo array e
+  os filtros rodam como operações em lote (map/compress) sem chamar getters por produto.
+  Preços são guardados em centavos para que a faixa de preço vire um teste de pertinência
+  em range (feito em C). Remoções movem a última linha para a posição liberada.
+  """
+
+  def __init__(self):
+    self.ids: list[UUID] = []
+    self.price_cents = array("q")
+    self.quantities = array("q")
+    self.expirations = array("q")
+    self.perishable = array("b")
+    self.__rows: dict[UUID, int] = {}
+
+  def __len__(self):
+    return len(self.ids)
+
+  def upsert(self, product: Product):
+    id = product.get_id()
+    expiration_date = product.get_expiration_date()
+    values = (
+      price_to_cents(product.get_price()),
+      product.get_quantity(),
+      expiration_date.toordinal() if product.get_is_perishable() and expiration_date else NO_EXPIRATION,
+      1 if product.get_is_perishable() else 0,
+    )
+    row = self.__rows.get(id)
+    if row is None:
+      self.__rows[id] = len(self.ids)
+      self.ids.append(id)
+      for column, value in zip(self.__columns(), values):
+        column.append(value)
+    else:
+      for column, value in zip(self.__columns(), values):
+        column[row] = value
+
+  def remove(self, id: UUID):
+    row = self.__rows.pop(id, None)
+    if row is None:
+      return
+    last = len(self.ids) - 1
+    if row != last:
+      moved_id = self.ids[last]
+      self.ids[row] = moved_id
+      self.__rows[moved_id] = row
+      for column in self.__columns():
+        column[row] = column[last]
+    self.ids.pop()
+    for column in self.__columns():
+      column.pop()
+
+  def clear(self):
+    self.__init__()
+
+  def filter_ids(
+    self,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    max_quantity: int | None = None,
+    is_perishable: bool | None = None,
+    expiring_before: date | None = None,
+  ) -> list[UUID]:
+    masks = []
+    if min_price is not None or max_price is not None:
+      low, high = price_bounds_cents(min_price, max_price)
+      masks.append(map(range(low, high + 1).__contains__, self.price_cents))
+    if max_quantity is not None:
+      masks.append(map(operator.gt, repeat(max_quantity), self.quantities))
+    if is_perishable is not None:
+      masks.append(self.perishable if is_perishable else map(operator.not_, self.perishable))
+    if expiring_before is not None:
+      masks.append(map(operator.gt, repeat(expiring_before.toordinal()), self.expirations))
+
+    if not masks:
+      return list(self.ids)
+
+    mask = masks[0]
+    for other in masks[1:]:
+      mask = map(operator.and_, mask, other)
+    return list(compress(self.ids, mask))
+
+  def __columns(self):
+    return (self.price_cents, self.quantities, self.expirations, self.perishable)
@@ -0,0 +1,71 @@
+from datetime import date
+from uuid import UUID
+from models import Sale
+
+class SalesAggregates:
+  """Totais de vendas mantidos incrementalmente a cada venda registrada.
+
+  by_product, by_seller e by_day guardam [unidades, receita] (by_day também a quantidade
+  de vendas), de forma que os resumos dos relatórios custam O(chaves distintas). Os rótulos
+  dos produtos vêm dos próprios itens (o da primeira venda de cada produto), sem consultar
+  o estoque.
+  """
+
+  def __init__(self):
+    self.total_sales = 0
+    self.total_items = 0
+    self.total_revenue = 0.0
+    self.labels: dict[UUID, tuple[str, str]] = {}
+    self.by_product: dict[UUID, list] = {}
+    self.by_seller: dict[str, list] = {}
+    self.by_day: dict[date, list] = {}
+
+  def add_sale(self, sale: Sale):
+    day = self.by_day.setdefault(sale.get_sale_date().date(), [0, 0.0, 0])
+    seller = self.by_seller.setdefault(sale.get_seller_name(), [0, 0.0])
+    day[2] += 1
+    self.total_sales += 1
+
+    for item in sale.get_items():
+      product_id = item.get_product_id()
+      quantity = item.get_quantity()
+      subtotal = item.get_subtotal()
+
+      if product_id not in self.labels:
+        self.labels[product_id] = (item.get_barcode(), item.get_product_name())
+      totals = self.by_product.setdefault(product_id, [0, 0.0])
+      for entry in (totals, seller, day):
+        entry[0] += quantity
+        entry[1] += subtotal
+      self.total_items += quantity
+      self.total_revenue += subtotal
+
+  def merge(self, other: "SalesAggregates"):
+    """Soma os totais de other, calculados sobre vendas posteriores às já somadas aqui (as
+    chaves novas entram depois das existentes, preservando a ordem da primeira venda)"""
+    self.total_sales += other.total_sales
+    self.total_items += other.total_items
+    self.total_revenue += other.total_revenue
+    for product_id, label in other.labels.items():
+      self.labels.setdefault(product_id, label)
+    for totals, other_totals in ((self.by_product, other.by_product), (self.by_seller, other.by_seller), (self.by_day, other.by_day)):
+      for key, values in other_totals.items():
+        entry = totals.setdefault(key, [0] * len(values))
+        for index, value in enumerate(values):
+          entry[index] += value
+
+  def units_by_product_label(self) -> dict[tuple[str, str], int]:
+    """Unidades vendidas agrupadas por (código de barras, nome), na ordem da primeira venda"""
+    summary: dict[tuple[str, str], int] = {}
+    for product_id, (units, _) in self.by_product.items():
+      key = self.labels[product_id]
+      summary[key] = summary.get(key, 0) + units
+    return summary
+
+  def units_by_product_name(self) -> dict[str, int]:
+    """Unidades vendidas agrupadas por nome do produto, na ordem da primeira venda"""
+    summary: dict[str, int] = {}
+    for product_id, (units, _) in self.by_product.items():
+      name = self.labels[product_id][1]
+      summary[name] = summary.get(name, 0) + units
+    return summary
@@ -0,0 +1,322 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from datetime import datetime, date, time, timedelta
+from typing import Iterable
+from uuid import UUID
+from models import Sale
+from .snapshot import EPOCH, MICROSECOND, SnapshotError
+
+# Layout (little-endian): cabeçalho de 32 bytes | registros de 32 bytes, um por item vendido.
+# O cabeçalho guarda quantos registros estão confirmados (gravados e sincronizados); o que vier
+# depois disso é uma gravação interrompida e é descartado na abertura. Guarda também a chave
+# (os 8 primeiros bytes do id) da última venda confirmada, para que o SalesRepository encontre
+# no journal as vendas que não chegaram ao ledger (veja sale_key); 0 em ledgers mais antigos. Os registros são
+# alinhados (campos de 8 bytes em deslocamentos múltiplos de 8), então cada coluna pode ser lida
+# diretamente do arquivo mapeado em memória, sem desserializar nada.
+# Os índices de produto e de vendedor apontam para dicionários append-only ao lado do ledger:
+# <ledger>.products (UUIDs de 16 bytes, na ordem da primeira venda) e <ledger>.sellers (um nome
+# por linha).
+LEDGER_MAGIC = b"INVLEDG\x00"
+LEDGER_VERSION = 1
+HEADER = struct.Struct("<8sHHIQQ")
+RECORD = struct.Struct("<IiqqI4x")
+UUID_SIZE = 16
+MICROSECONDS_PER_DAY = 86400 * 10 ** 6
+
+# (nome, formato do struct/array, deslocamento no registro); o mesmo layout como dtype do NumPy:
+# numpy.dtype({"names": [...], "formats": ["<u4", "<i4", "<i8", "<i8", "<u4"], "offsets": [...], "itemsize": 32})
+LEDGER_FIELDS = [
+  ("product_index", "I", 0),
+  ("quantity", "i", 4),
+  ("unit_price_cents", "q", 8),
+  ("timestamp_us", "q", 16),
+  ("seller_id", "I", 24),
+]
+NUMPY_FORMATS = {"I": "<u4", "i": "<i4", "q": "<i8"}
+
+def sale_key(sale_id: UUID) -> int:
+  """Chave de uma venda no cabeçalho do ledger (nunca 0, que indica uma venda desconhecida)"""
+  return int.from_bytes(sale_id.bytes[:8], "little") or 1
+
+def to_micros(value: date | datetime, end: bool = False) -> int:
+  """Microssegundos desde EPOCH; uma data sem hora vale o começo do dia (ou o fim, com end)"""
+  if not isinstance(value, datetime):
+    value = datetime.combine(value, time.max if end else time.min)
+  return (value - EPOCH) // MICROSECOND
+
+class LedgerColumns:
+  """Registros confirmados do ledger mapeados em memória, com uma visão (memoryview) por campo.
+
+  As colunas são fatias com passo sobre o próprio mapeamento: ler product_index[i] ou somar
+  quantity não copia nem desserializa registros. As agregações daqui (units_by_day,
+  units_by_product) ainda são laços em Python, um passo por registro: evitam montar objetos
+  Sale, mas não são varreduras vetorizadas; para isso, use as_numpy. Use como gerenciador de
+  contexto e não guarde colunas depois de fechá-lo.
+  """
+
+  def __init__(self, filename: str, count: int):
+    self.count = count
+    self.__file = open(filename, "rb")
+    self.__map = mmap.mmap(self.__file.fileno(), HEADER.size + count * RECORD.size, access=mmap.ACCESS_READ)
+    records = memoryview(self.__map)[HEADER.size:]
+    self.__views = [records]
+    for name, format, offset in LEDGER_FIELDS:
+      setattr(self, name, self.__column(records, format, offset))
+
+  def __column(self, records: memoryview, format: str, offset: int) -> memoryview:
+    size = struct.calcsize(format)
+    if sys.byteorder == "little":
+      values = records.cast(format)
+    else:
+      # Em máquinas big-endian a coluna é copiada e convertida; o resto funciona igual
+      values = array(format, records.tobytes())
+      values.byteswap()
+      values = memoryview(values)
+    column = values[offset // size::RECORD.size // size]
+    self.__views.extend((values, column))
+    return column
+
+  def __len__(self) -> int:
+    return self.count
+
+  def as_numpy(self):
+    """Os registros como array estruturado do NumPy, sem cópia (exige o NumPy instalado)"""
+    import numpy
+    dtype = numpy.dtype({
+      "names": [name for name, _, _ in LEDGER_FIELDS],
+      "formats": [NUMPY_FORMATS[format] for _, format, _ in LEDGER_FIELDS],
+      "offsets": [offset for _, _, offset in LEDGER_FIELDS],
+      "itemsize": RECORD.size,
+    })
+    return numpy.frombuffer(self.__map, dtype=dtype, count=self.count, offset=HEADER.size)
+
+  def units_by_day(
+    self, product_index: int | None = None, start: date | datetime | None = None, end: date | datetime | None = None
+  ) -> dict[date, int]:
+    """Unidades vendidas por dia (de um produto ou de todos) no período, em ordem de data;
+    percorre as colunas registro a registro, em Python"""
+    low = to_micros(start) if start is not None else -2 ** 63
+    high = to_micros(end, end=True) if end is not None else 2 ** 63 - 1
+    days: dict[int, int] = {}
+    for index, quantity, timestamp in zip(self.product_index, self.quantity, self.timestamp_us):
+      if low <= timestamp <= high and (product_index is None or index == product_index):
+        day = timestamp // MICROSECONDS_PER_DAY
+        days[day] = days.get(day, 0) + quantity
+    epoch = EPOCH.date()
+    return {epoch + timedelta(days=day): units for day, units in sorted(days.items())}
+
+  def units_by_product(self, start: date | datetime | None = None, end: date | datetime | None = None) -> dict[int, int]:
+    """Unidades vendidas por índice de produto no período (laço registro a registro, em Python)"""
+    low = to_micros(start) if start is not None else -2 ** 63
+    high = to_micros(end, end=True) if end is not None else 2 ** 63 - 1
+    units: dict[int, int] = {}
+    for index, quantity, timestamp in zip(self.product_index, self.quantity, self.timestamp_us):
+      if low <= timestamp <= high:
+        units[index] = units.get(index, 0) + quantity
+    return units
+
+  def close(self):
+    for view in reversed(self.__views):
+      view.release()
+    self.__views = []
+    try:
+      self.__map.close()
+    except BufferError:
+      # Ainda há um array do NumPy (ou uma coluna guardada) apontando para o mapeamento; ele é
+      # fechado quando esse último uso for coletado
+      pass
+    self.__file.close()
+
+  def __enter__(self) -> "LedgerColumns":
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+class SalesLedger:
+  """Ledger append-only dos itens vendidos, em registros binários de tamanho fixo, para análises
+  que varrem milhões de itens sem montar objetos Sale (veja LedgerColumns).
+
+  É um índice derivado das vendas: o SalesRepository acrescenta os itens no flush, depois do
+  journal; ao abrir o ledger, acrescenta as vendas do journal posteriores a last_sale_key (as
+  de uma queda entre o journal e o ledger); e rebuild_ledger o reconstrói a partir do histórico
+  (por exemplo, para incluir vendas anteriores à criação do ledger).
+  """
+
+  def __init__(self, filename: str = "sales.ledger"):
+    self.filename = filename
+    self.__lock = threading.Lock()
+    self.__file = self.__open(filename)
+    self.__committed, self.__committed_sale = self.__read_header()
+    self.__file.truncate(HEADER.size + self.__committed * RECORD.size)
+    self.__file.seek(0, os.SEEK_END)
+    self.__count = self.__committed
+    self.__last_sale = self.__committed_sale
+
+    self.__products_file = self.__open(f"{filename}.products")
+    data = self.__products_file.read()
+    complete = len(data) - len(data) % UUID_SIZE
+    self.__product_ids: list[UUID] = [UUID(bytes=data[i:i + UUID_SIZE]) for i in range(0, complete, UUID_SIZE)]
+    self.__products_file.truncate(complete)
+    self.__products_file.seek(0, os.SEEK_END)
+    self.__product_indexes = {product_id: index for index, product_id in enumerate(self.__product_ids)}
+
+    self.__sellers_file = self.__open(f"{filename}.sellers")
+    data = self.__sellers_file.read()
+    complete = data.rfind(b"\n") + 1
+    self.__sellers = data[:complete].decode("utf-8").split("\n")[:-1]
+    self.__sellers_file.truncate(complete)
+    self.__sellers_file.seek(0, os.SEEK_END)
+    self.__seller_ids = {name: index for index, name in enumerate(self.__sellers)}
+    self.__dictionaries_changed = False
+
+  def __open(self, filename: str):
+    try:
+      return open(filename, "r+b")
+    except FileNotFoundError:
+      return open(filename, "w+b")
+
+  def __read_header(self) -> tuple[int, int]:
+    data = self.__file.read(HEADER.size)
+    if not data:
+      self.__write_header(0, 0)
+      return 0, 0
+    if len(data) < HEADER.size:
+      raise SnapshotError(f"{self.filename}: cabeçalho do ledger truncado")
+    magic, version, record_size, _, committed, last_sale = HEADER.unpack(data)
+    if magic != LEDGER_MAGIC:
+      raise SnapshotError(f"{self.filename}: não é um ledger de vendas")
+    if version != LEDGER_VERSION or record_size != RECORD.size:
+      raise SnapshotError(f"{self.filename}: versão {version} de ledger não suportada")
+    size = os.fstat(self.__file.fileno()).st_size
+    if (size - HEADER.size) // RECORD.size < committed:
+      # Registros confirmados faltando: a última venda já não é confiável
+      return (size - HEADER.size) // RECORD.size, 0
+    return committed, last_sale
+
+  def __write_header(self, committed: int, last_sale: int):
+    self.__file.seek(0)
+    self.__file.write(HEADER.pack(LEDGER_MAGIC, LEDGER_VERSION, RECORD.size, 0, committed, last_sale))
+    self.__file.flush()
+    os.fsync(self.__file.fileno())
+    self.__file.seek(0, os.SEEK_END)
+
+  def __len__(self) -> int:
+    return self.__committed
+
+  def last_sale_key(self) -> int:
+    """sale_key da última venda confirmada; 0 se o ledger está vazio ou é anterior a essa chave"""
+    return self.__committed_sale
+
+  def product_index(self, product_id: UUID) -> int | None:
+    return self.__product_indexes.get(product_id)
+
+  def product_id(self, index: int) -> UUID:
+    return self.__product_ids[index]
+
+  def seller_id(self, name: str) -> int | None:
+    return self.__seller_ids.get(name)
+
+  def seller_name(self, seller_id: int) -> str:
+    return self.__sellers[seller_id]
+
+  def append_sales(self, sales: Iterable[Sale]):
+    """Acrescenta um registro por item; só ficam visíveis (e duráveis) depois do sync"""
+    with self.__lock:
+      records = []
+      for sale in sales:
+        self.__last_sale = sale_key(sale.get_id())
+        seller_id = self.__intern_seller(sale.get_seller_name())
+        timestamp = (sale.get_sale_date() - EPOCH) // MICROSECOND
+        for item in sale.get_items():
+          records.append(RECORD.pack(
+            self.__intern_product(item.get_product_id()), item.get_quantity(),
+            round(item.get_unit_price() * 100), timestamp, seller_id,
+          ))
+      # Grava a partir do último registro completo: sobrescreve o que uma gravação que falhou
+      # possa ter deixado pela metade
+      self.__file.seek(HEADER.size + self.__count * RECORD.size)
+      self.__file.write(b"".join(records))
+      self.__count += len(records)
+
+  def sync(self):
+    """Grava os dicionários, depois os registros e por fim o cabeçalho que os confirma"""
+    with self.__lock:
+      if self.__dictionaries_changed:
+        for file in (self.__products_file, self.__sellers_file):
+          file.flush()
+          os.fsync(file.fileno())
+        self.__dictionaries_changed = False
+      if self.__count != self.__committed or self.__last_sale != self.__committed_sale:
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__write_header(self.__count, self.__last_sale)
+        self.__committed = self.__count
+        self.__committed_sale = self.__last_sale
+
+  def discard(self):
+    """Descarta os registros ainda não confirmados pelo sync (depois de uma falha)"""
+    with self.__lock:
+      self.__count = self.__committed
+      self.__last_sale = self.__committed_sale
+
+  def reset(self):
+    """Esvazia o ledger e os dicionários (para reconstruí-lo)"""
+    with self.__lock:
+      self.__write_header(0, 0)
+      self.__file.truncate(HEADER.size)
+      self.__file.seek(0, os.SEEK_END)
+      self.__committed = self.__count = 0
+      self.__committed_sale = self.__last_sale = 0
+      for file in (self.__products_file, self.__sellers_file):
+        file.truncate(0)
+        file.seek(0)
+      self.__product_ids, self.__product_indexes = [], {}
+      self.__sellers, self.__seller_ids = [], {}
+      self.__dictionaries_changed = True
+
+  def columns(self) -> LedgerColumns:
+    """Visão mapeada em memória dos registros confirmados até agora"""
+    with self.__lock:
+      return LedgerColumns(self.filename, self.__committed)
+
+  def units_by_day(
+    self, product_id: UUID | None = None, start: date | datetime | None = None, end: date | datetime | None = None
+  ) -> dict[date, int]:
+    """Unidades vendidas por dia de um produto (ou de todos) no período, sem carregar as vendas"""
+    index = None
+    if product_id is not None:
+      index = self.product_index(product_id)
+      if index is None:
+        return {}
+    with self.columns() as columns:
+      return columns.units_by_day(index, start, end)
+
+  def close(self):
+    if self.__file.closed:
+      return
+    self.sync()
+    for file in (self.__file, self.__products_file, self.__sellers_file):
+      file.close()
+
+  def __intern_product(self, product_id: UUID) -> int:
+    index = self.__product_indexes.get(product_id)
+    if index is None:
+      index = self.__product_indexes[product_id] = len(self.__product_ids)
+      self.__product_ids.append(product_id)
+      self.__products_file.write(product_id.bytes)
+      self.__dictionaries_changed = True
+    return index
+
+  def __intern_seller(self, name: str) -> int:
+    seller_id = self.__seller_ids.get(name)
+    if seller_id is None:
+      seller_id = self.__seller_ids[name] = len(self.__sellers)
+      self.__sellers.append(name)
+      self.__sellers_file.write(name.encode("utf-8") + b"\n")
+      self.__dictionaries_changed = True
+    return seller_id
@@ -1,64 +1,367 @@
-from models import Sale, SaleItem
+import threading
+from models import Product, Sale, SaleItem
 from repositories import repository
-from utils import load_json, save_json, custom_encoder
+from utils import save_json, custom_encoder, Journal, read_journal, iter_json_records, iter_batches, instrument_methods, ValidationError
 from uuid import UUID
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Callable, Iterator
+from .storage import StorageBackend, JsonStorage
+from .sales_aggregates import SalesAggregates
+from .sales_ledger import SalesLedger, sale_key
 
+# Auxiliares chamados por venda ou item dentro de métodos já medidos (flush, load_history, relatórios...)
+@instrument_methods(exclude=("sale_to_dict", "dicts_to_sales", "dict_to_sale", "resolve_product"))
 class SalesRepository:
-  def __init__(self):
+  """Vendas em memória, carregadas sob demanda.
+
+  load_from_file só abre o journal: novas vendas podem ser registradas sem ler o histórico.
+  O histórico é lido na primeira consulta que precisa dele; consultas com período leem só
+  aquele período quando o backend sabe filtrá-lo (ranged_sales), e as demais leem tudo.
+  """
+
+  def __init__(self, storage: StorageBackend | None = None):
     self.__sales: list[Sale] = []
+    self.storage: StorageBackend = storage or JsonStorage()
+    self.__sale_ids: set[UUID] = set()
+    self.__sale_dates: list[datetime] = []
+    self.__sales_by_date: list[Sale] = []
+    self.aggregates = SalesAggregates()
+    self.journal: Journal | None = None
+    self.ledger: SalesLedger | None = None
+    self.__loading = False
+    self.__lock = threading.RLock()
+    self.__unsaved: list[Sale] = []
+    self.dirty_listener: Callable[[int], None] | None = None
+    self.__source: tuple[str | None, str, int] | None = None
+    self.__history_loaded = True
+    self.__loaded_periods: list[tuple[datetime, datetime]] = []
 
   def make_sale(self, sale: Sale) -> bool:
-    if sale:
+    """Registra a venda; seguro para várias threads (a baixa de estoque fica a cargo de quem chama)"""
+    if not sale:
+      return False
+    with self.__lock:
+      if sale.get_id() in self.__sale_ids:
+        return False
       self.__sales.append(sale)
-      return True
-    
-    return False
+      self.__sale_ids.add(sale.get_id())
+      position = bisect_right(self.__sale_dates, sale.get_sale_date())
+      self.__sale_dates.insert(position, sale.get_sale_date())
+      self.__sales_by_date.insert(position, sale)
+      self.aggregates.add_sale(sale)
+      if self.__loading:
+        return True
+      if self.journal:
+        self.journal.append({"op": "sale", "sale": self.sale_to_dict(sale)})
+      self.__unsaved.append(sale)
+      count = len(self.__unsaved)
+    if self.dirty_listener:
+      self.dirty_listener(count)
+    return True
   
-  def list_sales(self) -> list[Sale]:
-    return self.__sales
+  def list_sales(self, start: date | datetime | None = None, end: date | datetime | None = None) -> list[Sale]:
+    """Sem período, retorna todas as vendas na ordem de registro. Com start/end (inclusivos;
+    uma data sem hora cobre o dia inteiro), retorna as vendas do período em ordem de data."""
+    if start is None and end is None:
+      self.load_history()
+      return self.__sales
+
+    if start is not None and not isinstance(start, datetime):
+      start = datetime.combine(start, time.min)
+    if end is not None and not isinstance(end, datetime):
+      end = datetime.combine(end, time.max)
+    with self.__lock:
+      self.__ensure_loaded(start, end)
+      low = bisect_left(self.__sale_dates, start) if start is not None else 0
+      high = bisect_right(self.__sale_dates, end) if end is not None else len(self.__sale_dates)
+      return self.__sales_by_date[low:high]
   
-  def save_to_file(self, filename="sales.json"):
-    data = [self.sale_to_dict(sale) for sale in self.__sales]
-    save_json(data, filename)
+  def aggregate_sales(self, start: date | datetime | None = None, end: date | datetime | None = None) -> SalesAggregates:
+    """Totais do período; sem período, os agregados mantidos incrementalmente"""
+    if start is None and end is None:
+      self.load_history()
+      return self.aggregates
+
+    aggregates = SalesAggregates()
+    for sale in self.list_sales(start, end):
+      aggregates.add_sale(sale)
+    return aggregates
+
+  def product_sales_summary(self) -> dict[UUID, int]:
+    """Unidades vendidas por produto, calculadas no backend quando ele suporta a consulta
+    (depois de gravar as vendas pendentes, para que o backend as inclua)"""
+    with self.__lock:
+      if self.storage.write_through:
+        self.flush()
+      summary = self.storage.product_sales_summary()
+    if summary is not None:
+      return {UUID(product_id): quantity for product_id, quantity in summary.items()}
+
+    self.load_history()
+    return {product_id: units for product_id, (units, _) in self.aggregates.by_product.items()}
+
+  def save_to_file(self, filename=None):
+    """Grava as vendas novas e compacta o journal, cujos registros passam a estar no backend.
+    Backends que sabem acrescentar vendas (append_sales) recebem só o que está no journal; nos
+    demais o histórico inteiro é regravado, o que só acontece se ele já foi carregado (senão as
+    vendas novas ficam no journal: o snapshot continua válido e reescrevê-lo exigiria ler tudo).
+    Com filename, exporta para esse arquivo JSON em vez de usar o backend de armazenamento."""
+    if filename:
+      save_json([self.sale_to_dict(sale) for sale in self.list_sales()], filename)
+      return
+    with self.__lock:
+      self.flush()
+      if not self.storage.write_through:
+        typed = self.storage.typed_records
+        journaled = self.__records(self.__journaled(self.journal.filename), typed) if self.journal else None
+        if journaled is None or not self.storage.append_sales(journaled):
+          if not self.__history_loaded:
+            return
+          self.storage.save_sales([self.sale_to_dict(sale, typed) for sale in self.__sales])
+      if self.journal:
+        self.journal.truncate()
 
-  def load_from_file(self, filename="sales.json"):
-    data = load_json(filename)
-    if not data:
+  def load_from_file(self, filename=None, journal_filename="sales.journal", batch_size=1000, ledger_filename="sales.ledger"):
+    """Passa a registrar novas vendas no journal (e os itens no ledger, se ledger_filename não
+    for None) e guarda de onde o histórico (último snapshot mais o journal) será lido quando
+    alguma consulta precisar dele. Num backend write-through, as vendas do journal são gravadas
+    nele antes (uma queda entre o journal e o backend não as perde no próximo save_to_file), e as
+    que não chegaram ao ledger pelo mesmo motivo são acrescentadas a ele."""
+    with self.__lock:
+      if self.journal:
+        self.journal.close()
+        self.journal = None
+      if self.storage.write_through:
+        for record in self.__journaled(journal_filename):
+          self.storage.insert_sale(record)
+      if self.ledger is not None:
+        self.ledger.close()
+        self.ledger = None
+      self.__source = (filename, journal_filename, batch_size)
+      self.__history_loaded = False
+      self.__loaded_periods = []
+      self.journal = Journal(journal_filename)
+      if ledger_filename:
+        self.ledger = SalesLedger(ledger_filename)
+        self.__catch_up_ledger(journal_filename, batch_size)
+
+  def __catch_up_ledger(self, journal_filename: str, batch_size: int):
+    """Acrescenta ao ledger as vendas do journal registradas depois da última que ele confirmou.
+    O ledger recebe as vendas na ordem do journal, então as que faltam são as que vêm depois
+    dessa; se ela não está no journal, todas as do journal são posteriores (o journal foi
+    compactado depois de ela entrar no ledger)."""
+    last_sale = self.ledger.last_sale_key()
+    if last_sale == 0 and len(self.ledger) > 0:
+      # Ledger anterior à chave da última venda: não há como saber o que falta (rebuild_ledger)
+      return
+    records = list(self.__journaled(journal_filename))
+    keys = [sale_key(as_uuid(record["id"])) for record in records]
+    missing = records[len(keys) - keys[::-1].index(last_sale):] if last_sale in keys else records
+    for batch in iter_batches(missing, batch_size):
+      self.ledger.append_sales(self.dicts_to_sales(batch))
+    if missing:
+      self.ledger.sync()
+
+  def load_history(self):
+    """Garante o histórico inteiro em memória, na ordem de registro"""
+    with self.__lock:
+      if self.__history_loaded:
         return
-    for s in data:
-        sale = self.dict_to_sale(s)
+      filename, journal_filename, batch_size = self.__source
+      # Vendas já em memória (períodos carregados e vendas novas) voltam depois do histórico;
+      # as repetidas são ignoradas pelo make_sale
+      in_memory = self.__sales
+      self.__sales = []
+      self.__sale_ids = set()
+      self.__sale_dates = []
+      self.__sales_by_date = []
+      self.aggregates = SalesAggregates()
+
+      data = iter_json_records(filename) if filename else self.storage.load_sales()
+      self.__replay(chain(data, self.__journaled(journal_filename)), batch_size)
+      self.__replay_sales(in_memory)
+      self.__history_loaded = True
+      self.__loaded_periods = []
+
+  def __ensure_loaded(self, start: datetime | None, end: datetime | None):
+    if self.__history_loaded or self.__covered(start, end):
+      return
+    filename, journal_filename, batch_size = self.__source
+    if filename or not self.storage.ranged_sales:
+      self.load_history()
+      return
+
+    def in_period(record: dict) -> bool:
+      sale_date = datetime.fromisoformat(record["sale_date"])
+      return (start is None or sale_date >= start) and (end is None or sale_date <= end)
+
+    journaled = filter(in_period, self.__journaled(journal_filename))
+    self.__replay(chain(self.storage.load_sales(start, end), journaled), batch_size)
+    self.__add_period(start, end)
+
+  def __replay(self, records: Iterator[dict], batch_size: int):
+    for batch in iter_batches(records, batch_size):
+      self.__replay_sales(self.dicts_to_sales(batch))
+
+  def __replay_sales(self, sales: list[Sale]):
+    self.__loading = True
+    try:
+      for sale in sales:
         self.make_sale(sale)
+    finally:
+      self.__loading = False
+
+  def __records(self, records: Iterator[dict], typed: bool, batch_size: int = 1000) -> Iterator[dict]:
+    """Registros do journal no formato do backend"""
+    for batch in iter_batches(records, batch_size):
+      for sale in self.dicts_to_sales(batch):
+        yield self.sale_to_dict(sale, typed)
+
+  def __journaled(self, journal_filename: str) -> Iterator[dict]:
+    return (record["sale"] for record in read_journal(journal_filename) if record["op"] == "sale")
+
+  def __covered(self, start: datetime | None, end: datetime | None) -> bool:
+    start = start or datetime.min
+    end = end or datetime.max
+    return any(low <= start and end <= high for low, high in self.__loaded_periods)
+
+  def __add_period(self, start: datetime | None, end: datetime | None):
+    """Junta o período aos já carregados, fundindo os que se sobrepõem ou se encostam"""
+    periods = sorted(self.__loaded_periods + [(start or datetime.min, end or datetime.max)])
+    merged = [periods[0]]
+    for low, high in periods[1:]:
+      last_low, last_high = merged[-1]
+      if low - last_high <= timedelta(microseconds=1):
+        merged[-1] = (last_low, max(last_high, high))
+      else:
+        merged.append((low, high))
+    self.__loaded_periods = merged
+
+  def close(self):
+    """Grava as vendas pendentes, força a gravação do journal e o fecha (e o ledger)"""
+    with self.__lock:
+      self.flush()
+      if self.journal:
+        self.journal.close()
+        self.journal = None
+      if self.ledger is not None:
+        self.ledger.close()
+        self.ledger = None
+
+  def rebuild_ledger(self) -> int:
+    """Regrava o ledger com o histórico inteiro; retorna quantos itens ele passou a ter"""
+    with self.__lock:
+      if self.ledger is None:
+        raise ValidationError("O ledger de vendas está desativado (load_from_file com ledger_filename=None)")
+      self.load_history()
+      self.flush()
+      self.ledger.reset()
+      self.ledger.append_sales(self.__sales)
+      self.ledger.sync()
+      return len(self.ledger)
 
-  def sale_to_dict(self, sale: Sale) -> dict:
+  def dirty_count(self) -> int:
+    return len(self.__unsaved)
+
+  def flush(self) -> int:
+    """Força a gravação do journal (escrito a cada venda, com fsync agrupado) e grava no backend
+    write-through e no ledger as vendas registradas desde o último flush; retorna quantas foram"""
+    with self.__lock:
+      sales, self.__unsaved = self.__unsaved, []
+      if sales:
+        try:
+          if self.journal:
+            self.journal.sync()
+          if self.storage.write_through:
+            for sale in sales:
+              self.storage.insert_sale(self.sale_to_dict(sale))
+          # O ledger é derivado: só recebe vendas que já estão no journal
+          if self.ledger is not None:
+            self.ledger.append_sales(sales)
+            self.ledger.sync()
+        except BaseException:
+          # Regravar uma venda no backend é inofensivo (INSERT OR REPLACE)
+          if self.ledger is not None:
+            self.ledger.discard()
+          self.__unsaved[:0] = sales
+          raise
+      return len(sales)
+
+  def resolve_product(self, item: SaleItem) -> Product | None:
+    """Vínculo do item com o produto atual do estoque, resolvido na primeira consulta; None se o
+    produto foi removido. Totais e relatórios não precisam disso: o item guarda seus dados."""
+    product = item.get_product()
+    if product is None:
+      product = repository.get_product(item.get_product_id())
+      item.set_product(product)
+    return product
+
+  def sale_to_dict(self, sale: Sale, typed: bool = False) -> dict:
+    """Registro de uma venda; com typed, mantém UUID e datas como objetos (para backends binários)"""
+    items = [
+      {
+        "product_id": item.get_product_id() if typed else str(item.get_product_id()),
+        "quantity": item.get_quantity(),
+        "unit_price": item.get_unit_price(),
+        "product_name": item.get_product_name(),
+        "barcode": item.get_barcode(),
+      }
+      for item in sale.get_items()
+    ]
+    if typed:
+      return {
+        "id": sale.get_id(),
+        "seller_name": sale.get_seller_name(),
+        "buyer_cpf": sale.get_buyer_cpf(),
+        "sale_date": sale.get_sale_date(),
+        "items": items,
+      }
     return {
       "id": str(sale.get_id()),
       "seller_name": sale.get_seller_name(),
       "buyer_cpf": sale.get_buyer_cpf(),
       "sale_date": sale.get_sale_date().isoformat(),
-      "items": [
-        {
-          "product_id": str(item.get_product().get_id()),
-          "quantity": item.get_quantity()
-        }
-        for item in sale.get_items()
-      ]
+      "items": items,
     }
 
-  def dict_to_sale(self, data: dict) -> Sale:
+  def dicts_to_sales(self, batch: list[dict]) -> list[Sale]:
+    """Hidrata um lote de vendas. Só os itens gravados antes de guardarem preço e nome
+    (formato antigo) são resolvidos no estoque, cada produto distinto uma única vez."""
+    product_ids = {i["product_id"] for data in batch for i in data["items"] if "unit_price" not in i}
+    products = {id: repository.get_product(as_uuid(id)) for id in product_ids}
+    return [self.dict_to_sale(data, products) for data in batch]
+
+  def dict_to_sale(self, data: dict, products: dict | None = None) -> Sale:
     items = []
     for i in data["items"]:
-      product = repository.get_product(UUID(i["product_id"]))
+      if "unit_price" in i:
+        items.append(SaleItem(
+          product_id=as_uuid(i["product_id"]),
+          quantity=int(i["quantity"]),
+          unit_price=float(i["unit_price"]),
+          product_name=i["product_name"],
+          barcode=i["barcode"],
+        ))
+        continue
+      if products is not None:
+        product = products.get(i["product_id"])
+      else:
+        product = repository.get_product(as_uuid(i["product_id"]))
       if product:
         items.append(SaleItem(product=product, quantity=int(i["quantity"])))
+    sale_date = data["sale_date"]
     return Sale(
-      id=UUID(data["id"]),
+      id=as_uuid(data["id"]),
       seller_name=data["seller_name"],
       buyer_cpf=data["buyer_cpf"],
-      sale_date=datetime.fromisoformat(data["sale_date"]),
+      sale_date=sale_date if isinstance(sale_date, datetime) else datetime.fromisoformat(sale_date),
       items=items
     )
 
-  
+def as_uuid(value: UUID | str) -> UUID:
+  return value if isinstance(value, UUID) else UUID(value)
+
 sales_repository = SalesRepository()
 
@@ -0,0 +1,135 @@
+import json
+import os
+from datetime import date, datetime
+from typing import Iterable, Iterator
+from utils import atomic_open, COMPRESSION_EXTENSIONS
+from .snapshot import SnapshotError, save_sales_snapshot, iter_sales_snapshot
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+def month_key(value: date) -> str:
+  return f"{value.year:04d}-{value.month:02d}"
+
+def month_bounds(month: str) -> tuple[datetime, datetime]:
+  """Início do mês e início do mês seguinte"""
+  year, number = map(int, month.split("-"))
+  start = datetime(year, number, 1)
+  return start, datetime(year + number // 12, number % 12 + 1, 1)
+
+class SalesSegments:
+  """Vendas particionadas por mês em snapshots binários (veja repositories.snapshot), com um
+  manifesto JSON que lista as partes de cada mês.
+
+  Só o segmento do mês corrente fica aberto e é regravado quando chegam vendas novas. Na
+  primeira gravação depois da virada do mês, os segmentos de meses passados são fechados
+  (comprimidos, se compression não for None) e nunca mais são alterados: uma venda
+  retroativa para um mês fechado vira uma parte nova desse mês. Leituras com período
+  abrem só os segmentos dos meses que o período toca.
+  """
+
+  def __init__(self, directory: str = "sales", compression: str | None = "gzip"):
+    if compression is not None and compression not in COMPRESSION_EXTENSIONS:
+      raise ValueError(f"Compressão não suportada: {compression}")
+    self.directory = directory
+    self.compression = compression
+
+  def exists(self) -> bool:
+    return os.path.exists(self.__path(MANIFEST_FILENAME))
+
+  def segments(self) -> list[dict]:
+    """Entradas do manifesto: file, month, sales, closed; na ordem de mês e de parte"""
+    try:
+      with open(self.__path(MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    except FileNotFoundError:
+      return []
+    if manifest.get("version") != MANIFEST_VERSION:
+      raise SnapshotError(f"{self.directory}: versão {manifest.get('version')} de manifesto não suportada")
+    return manifest["segments"]
+
+  def load(self, start: datetime | None = None, end: datetime | None = None) -> Iterator[dict]:
+    """Registros tipados das vendas do período (inclusivo), lendo só os segmentos que ele toca"""
+    for segment in self.segments():
+      month_start, next_month = month_bounds(segment["month"])
+      if (end is not None and month_start > end) or (start is not None and next_month <= start):
+        continue
+      for record in iter_sales_snapshot(self.__path(segment["file"])):
+        sale_date = record["sale_date"]
+        if (start is None or sale_date >= start) and (end is None or sale_date <= end):
+          yield record
+
+  def append(self, records: Iterable[dict], today: date | None = None):
+    """Acrescenta vendas novas aos segmentos dos seus meses e fecha os segmentos de meses passados.
+    Vendas cujo id já está no mês são ignoradas (journal reaplicado depois de uma queda)."""
+    current_month = month_key(today or date.today())
+    segments = self.segments()
+    for month, new_records in self.__by_month(records).items():
+      parts = [segment for segment in segments if segment["month"] == month]
+      open_part = next((part for part in parts if not part["closed"]), None)
+      existing = list(iter_sales_snapshot(self.__path(open_part["file"]))) if open_part else []
+      known_ids = {record["id"] for record in existing}
+      for part in parts:
+        if part["closed"]:
+          known_ids.update(record["id"] for record in iter_sales_snapshot(self.__path(part["file"])))
+      new_records = [record for record in new_records if record["id"] not in known_ids]
+      if not new_records:
+        continue
+      if open_part is not None:
+        save_sales_snapshot(existing + new_records, self.__path(open_part["file"]))
+        open_part["sales"] = len(existing) + len(new_records)
+      else:
+        segment = self.__write_part(month, len(parts) + 1, new_records, closed=month < current_month)
+        segments.append(segment)
+
+    obsolete = []
+    for index, segment in enumerate(segments):
+      if not segment["closed"] and segment["month"] < current_month:
+        obsolete.append(segment["file"])
+        records = list(iter_sales_snapshot(self.__path(segment["file"])))
+        segments[index] = self.__write_part(segment["month"], self.__part_number(segment), records, closed=True)
+    self.__save_manifest(segments)
+    self.__remove(file for file in obsolete if file not in {segment["file"] for segment in segments})
+
+  def replace(self, records: Iterable[dict], today: date | None = None):
+    """Regrava todas as vendas, um segmento por mês (usado na migração e em compactações completas)"""
+    current_month = month_key(today or date.today())
+    previous = {segment["file"] for segment in self.segments()}
+    segments = [
+      self.__write_part(month, 1, month_records, closed=month < current_month)
+      for month, month_records in sorted(self.__by_month(records).items())
+    ]
+    self.__save_manifest(segments)
+    self.__remove(previous - {segment["file"] for segment in segments})
+
+  def __by_month(self, records: Iterable[dict]) -> dict[str, list[dict]]:
+    months: dict[str, list[dict]] = {}
+    for record in records:
+      months.setdefault(month_key(record["sale_date"]), []).append(record)
+    return months
+
+  def __write_part(self, month: str, part: int, records: list[dict], closed: bool) -> dict:
+    compression = self.compression if closed else None
+    filename = f"{month}.{part}.snap" + (COMPRESSION_EXTENSIONS[compression] if compression else "")
+    os.makedirs(self.directory, exist_ok=True)
+    save_sales_snapshot(records, self.__path(filename), compression)
+    return {"file": filename, "month": month, "sales": len(records), "closed": closed}
+
+  def __part_number(self, segment: dict) -> int:
+    return int(segment["file"].split(".")[1])
+
+  def __save_manifest(self, segments: list[dict]):
+    segments.sort(key=lambda segment: (segment["month"], self.__part_number(segment)))
+    os.makedirs(self.directory, exist_ok=True)
+    with atomic_open(self.__path(MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+      json.dump({"version": MANIFEST_VERSION, "segments": segments}, f, indent=2)
+
+  def __remove(self, filenames: Iterable[str]):
+    for filename in filenames:
+      try:
+        os.remove(self.__path(filename))
+      except FileNotFoundError:
+        pass
+
+  def __path(self, filename: str) -> str:
+    return os.path.join(self.directory, filename)
@@ -0,0 +1,262 @@
+import gzip
+import lzma
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, date, timedelta
+from itertools import accumulate
+from typing import Callable, Iterable, Iterator
+from uuid import UUID
+from utils import atomic_open
+
+# Layout (little-endian):
+#   cabeçalho | comprimentos da tabela de strings (uint32, em code points) | strings em UTF-8 |
+#   registros de tamanho fixo | itens de venda (só em snapshots de vendas) | CRC32 de tudo o que vem antes
+# Strings repetidas (marcas, descrições, vendedores) são gravadas uma única vez e referenciadas
+# pela posição na tabela; datas com hora viram microssegundos desde 1970-01-01 (horário local,
+# sem fuso) e datas viram o ordinal do dia (0 = sem data).
+# Versão 2: itens de venda passam a guardar preço unitário, nome e código de barras do produto;
+# snapshots de vendas da versão 1 continuam legíveis (itens só com produto e quantidade).
+SNAPSHOT_MAGIC = b"INVSNAP\x00"
+SNAPSHOT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+PRODUCTS_SNAPSHOT = 1
+SALES_SNAPSHOT = 2
+
+HEADER = struct.Struct("<8sHHQQQQ")
+PRODUCT_RECORD = struct.Struct("<16sIIIdqIqq?i")
+SALE_RECORD = struct.Struct("<16sIIqI")
+SALE_ITEM_RECORD = struct.Struct("<16sqdII")
+SALE_ITEM_RECORD_V1 = struct.Struct("<16sq")
+CHECKSUM = struct.Struct("<I")
+
+# Snapshots podem ser gravados comprimidos por inteiro (segmentos de vendas fechados); na
+# leitura, a compressão é reconhecida pelos bytes iniciais
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+class SnapshotError(Exception):
+  """Snapshot binário truncado, corrompido ou de uma versão desconhecida"""
+  pass
+
+class StringTable:
+  def __init__(self):
+    self.strings: list[str] = []
+    self.__positions: dict[str, int] = {}
+
+  def index(self, value: str) -> int:
+    position = self.__positions.get(value)
+    if position is None:
+      position = self.__positions[value] = len(self.strings)
+      self.strings.append(value)
+    return position
+
+  def encode(self) -> tuple[bytes, bytes]:
+    lengths = array("I", map(len, self.strings))
+    if sys.byteorder == "big":
+      lengths.byteswap()
+    return lengths.tobytes(), "".join(self.strings).encode("utf-8")
+
+def decode_strings(lengths_data: memoryview, text_data: memoryview) -> list[str]:
+  lengths = array("I")
+  lengths.frombytes(lengths_data)
+  if sys.byteorder == "big":
+    lengths.byteswap()
+  text = str(text_data, "utf-8")
+  ends = list(accumulate(lengths))
+  return list(map(text.__getitem__, map(slice, [0] + ends[:-1], ends)))
+
+def timestamp_encoder() -> Callable[[datetime], int]:
+  """Converte datetime em microssegundos desde EPOCH; lotes costumam repetir o mesmo instante"""
+  cache: dict[datetime, int] = {}
+  def encode(value: datetime) -> int:
+    micros = cache.get(value)
+    if micros is None:
+      micros = cache[value] = (value - EPOCH) // MICROSECOND
+    return micros
+  return encode
+
+def timestamp_decoder() -> Callable[[int], datetime]:
+  cache: dict[int, datetime] = {}
+  def decode(micros: int) -> datetime:
+    value = cache.get(micros)
+    if value is None:
+      value = cache[micros] = EPOCH + timedelta(0, 0, micros)
+    return value
+  return decode
+
+def write_snapshot(
+  filename: str, kind: int, record_count: int, item_count: int, strings: StringTable, *sections: bytes,
+  compression: str | None = None,
+):
+  lengths, text = strings.encode()
+  header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, kind, record_count, item_count, len(strings.strings), len(text))
+  parts = [header, lengths, text, *sections]
+  checksum = 0
+  for part in parts:
+    checksum = zlib.crc32(part, checksum)
+  parts.append(CHECKSUM.pack(checksum))
+  if compression is not None:
+    parts = [compress(b"".join(parts), compression)]
+  with atomic_open(filename, "wb") as f:
+    for part in parts:
+      f.write(part)
+
+def compress(data: bytes, compression: str) -> bytes:
+  if compression == "gzip":
+    return gzip.compress(data, compresslevel=6)
+  if compression == "lzma":
+    return lzma.compress(data)
+  raise ValueError(f"Compressão não suportada: {compression}")
+
+def decompress(data: bytes) -> bytes:
+  if data.startswith(GZIP_MAGIC):
+    return gzip.decompress(data)
+  if data.startswith(XZ_MAGIC):
+    return lzma.decompress(data)
+  return data
+
+def read_snapshot(filename: str, kind: int) -> tuple[int, int, int, list[str], memoryview] | None:
+  """Lê e confere um snapshot; retorna (versão, registros, itens, strings, corpo) ou None se o arquivo não existe"""
+  try:
+    with open(filename, "rb") as f:
+      data = f.read()
+  except FileNotFoundError:
+    return None
+  try:
+    data = decompress(data)
+  except (OSError, EOFError, lzma.LZMAError) as e:
+    raise SnapshotError(f"{filename}: falha ao descomprimir o snapshot ({e})")
+
+  if len(data) < HEADER.size + CHECKSUM.size:
+    raise SnapshotError(f"{filename}: snapshot truncado")
+  magic, version, file_kind, record_count, item_count, string_count, text_size = HEADER.unpack_from(data)
+  if magic != SNAPSHOT_MAGIC:
+    raise SnapshotError(f"{filename}: não é um snapshot do estoque")
+  if version not in SUPPORTED_VERSIONS:
+    raise SnapshotError(f"{filename}: versão {version} de snapshot não suportada")
+  if file_kind != kind:
+    raise SnapshotError(f"{filename}: tipo de snapshot inesperado ({file_kind})")
+
+  view = memoryview(data)
+  body_end = len(data) - CHECKSUM.size
+  (checksum,) = CHECKSUM.unpack_from(view, body_end)
+  if zlib.crc32(view[:body_end]) != checksum:
+    raise SnapshotError(f"{filename}: checksum não confere, snapshot corrompido")
+
+  position = HEADER.size
+  lengths = view[position:position + 4 * string_count]
+  position += 4 * string_count
+  strings = decode_strings(lengths, view[position:position + text_size])
+  position += text_size
+  return version, record_count, item_count, strings, view[position:body_end]
+
+def save_products_snapshot(records: Iterable[dict], filename: str):
+  """Grava registros de produto com valores tipados (veja ProductRepository.product_to_dict)"""
+  strings = StringTable()
+  index = strings.index
+  to_micros = timestamp_encoder()
+  pack = PRODUCT_RECORD.pack
+  body = bytearray()
+  count = 0
+  for record in records:
+    expiration_date = record["expiration_date"]
+    body += pack(
+      record["id"].bytes, index(record["name"]), index(record["description"]), index(record["brand"]),
+      record["price"], record["quantity"], index(record["barcode"]),
+      to_micros(record["created_at"]), to_micros(record["updated_at"]),
+      record["is_perishable"], expiration_date.toordinal() if expiration_date else 0,
+    )
+    count += 1
+  write_snapshot(filename, PRODUCTS_SNAPSHOT, count, 0, strings, body)
+
+def iter_products_snapshot(filename: str) -> Iterator[dict]:
+  snapshot = read_snapshot(filename, PRODUCTS_SNAPSHOT)
+  if snapshot is None:
+    return
+  _, record_count, _, strings, body = snapshot
+  if len(body) != record_count * PRODUCT_RECORD.size:
+    raise SnapshotError(f"{filename}: tamanho dos registros não confere com o cabeçalho")
+
+  to_datetime = timestamp_decoder()
+  dates: dict[int, date] = {}
+  for id, name, description, brand, price, quantity, barcode, created_at, updated_at, is_perishable, expiration in PRODUCT_RECORD.iter_unpack(body):
+    expiration_date = None
+    if expiration:
+      expiration_date = dates.get(expiration)
+      if expiration_date is None:
+        expiration_date = dates[expiration] = date.fromordinal(expiration)
+    yield {
+      "id": UUID(bytes=id),
+      "name": strings[name],
+      "description": strings[description],
+      "price": price,
+      "brand": strings[brand],
+      "quantity": quantity,
+      "barcode": strings[barcode],
+      "created_at": to_datetime(created_at),
+      "updated_at": to_datetime(updated_at),
+      "is_perishable": is_perishable,
+      "expiration_date": expiration_date,
+    }
+
+def save_sales_snapshot(records: Iterable[dict], filename: str, compression: str | None = None):
+  """Grava registros de venda com valores tipados (veja SalesRepository.sale_to_dict)"""
+  strings = StringTable()
+  index = strings.index
+  to_micros = timestamp_encoder()
+  pack_sale = SALE_RECORD.pack
+  pack_item = SALE_ITEM_RECORD.pack
+  sales, items = bytearray(), bytearray()
+  sale_count = item_count = 0
+  for record in records:
+    sale_items = record["items"]
+    sales += pack_sale(
+      record["id"].bytes, index(record["seller_name"]), index(record["buyer_cpf"]),
+      to_micros(record["sale_date"]), len(sale_items),
+    )
+    for item in sale_items:
+      items += pack_item(
+        item["product_id"].bytes, item["quantity"], item["unit_price"],
+        index(item["product_name"]), index(item["barcode"]),
+      )
+    sale_count += 1
+    item_count += len(sale_items)
+  write_snapshot(filename, SALES_SNAPSHOT, sale_count, item_count, strings, sales, items, compression=compression)
+
+def iter_sales_snapshot(filename: str) -> Iterator[dict]:
+  snapshot = read_snapshot(filename, SALES_SNAPSHOT)
+  if snapshot is None:
+    return
+  version, sale_count, item_count, strings, body = snapshot
+  item_record = SALE_ITEM_RECORD if version >= 2 else SALE_ITEM_RECORD_V1
+  sales_size = sale_count * SALE_RECORD.size
+  if len(body) != sales_size + item_count * item_record.size:
+    raise SnapshotError(f"{filename}: tamanho dos registros não confere com o cabeçalho")
+
+  to_datetime = timestamp_decoder()
+  product_ids: dict[bytes, UUID] = {}
+  items = item_record.iter_unpack(body[sales_size:])
+  for id, seller_name, buyer_cpf, sale_date, count in SALE_RECORD.iter_unpack(body[:sales_size]):
+    sale_items = []
+    for _ in range(count):
+      product_id, quantity, *snapshot_fields = next(items)
+      uuid = product_ids.get(product_id)
+      if uuid is None:
+        uuid = product_ids[product_id] = UUID(bytes=product_id)
+      item = {"product_id": uuid, "quantity": quantity}
+      if snapshot_fields:
+        unit_price, product_name, barcode = snapshot_fields
+        item.update(unit_price=unit_price, product_name=strings[product_name], barcode=strings[barcode])
+      sale_items.append(item)
+    yield {
+      "id": UUID(bytes=id),
+      "seller_name": strings[seller_name],
+      "buyer_cpf": strings[buyer_cpf],
+      "sale_date": to_datetime(sale_date),
+      "items": sale_items,
+    }
@@ -0,0 +1,55 @@
+from bisect import bisect_left, bisect_right, insort
+from uuid import UUID
+
+AFTER_ANY_ID = 1 << 128
+
+class SortedIndex:
+  """Índice secundário ordenado por (valor, id), para consultas por faixa com bisect.
+
+  As chaves são (valor, id.int, id): o inteiro do UUID desempata sem cair na comparação
+  de UUIDs, que é feita em Python e domina o custo de ordenações grandes.
+  """
+
+  def __init__(self):
+    self.__keys: list[tuple[int, int, UUID]] = []
+
+  def __len__(self):
+    return len(self.__keys)
+
+  def add(self, value: int, id: UUID):
+    insort(self.__keys, (value, id.int, id))
+
+  def add_many(self, entries: list[tuple[int, UUID]]):
+    """Insere várias entradas (valor, id) de uma vez, reordenando uma única vez"""
+    if entries:
+      self.__keys.extend((value, id.int, id) for value, id in entries)
+      self.__keys.sort()
+
+  def remove(self, value: int, id: UUID):
+    position = bisect_left(self.__keys, (value, id.int))
+    if position < len(self.__keys) and self.__keys[position][2] == id:
+      del self.__keys[position]
+
+  def clear(self):
+    self.__keys.clear()
+
+  def keys(self) -> list[tuple[int, int, UUID]]:
+    return self.__keys
+
+  def position(self, value: int) -> int:
+    """Posição da primeira chave com valor maior que value"""
+    return bisect_right(self.__keys, (value, AFTER_ANY_ID))
+
+  def bounds(self, low: int | None = None, high: int | None = None) -> tuple[int, int]:
+    """Posições [início, fim) das chaves com low <= valor <= high (limites None são abertos)"""
+    start = bisect_left(self.__keys, (low,)) if low is not None else 0
+    end = self.position(high) if high is not None else len(self.__keys)
+    return start, max(start, end)
+
+  def count(self, low: int | None = None, high: int | None = None) -> int:
+    start, end = self.bounds(low, high)
+    return end - start
+
+  def ids(self, low: int | None = None, high: int | None = None) -> list[UUID]:
+    start, end = self.bounds(low, high)
+    return [id for _, _, id in self.__keys[start:end]]
@@ -0,0 +1,397 @@
+import contextlib
+import os
+import sqlite3
+from datetime import date, datetime
+from typing import Iterable, Iterator
+from itertools import groupby
+from uuid import UUID
+from utils import iter_json_records, save_records, ValidationError
+from .snapshot import save_products_snapshot, iter_products_snapshot, iter_sales_snapshot
+from .sales_segments import SalesSegments
+
+class StorageBackend:
+  """Interface de armazenamento usada pelos repositórios.
+
+  Os registros trafegam no mesmo formato de dicionário de product_to_dict/sale_to_dict.
+  Backends com typed_records recebem esses registros com os valores já tipados (UUID,
+  datetime, date) em vez de texto; na leitura, os repositórios aceitam as duas formas.
+  Os métodos de consulta retornam None quando o backend não sabe respondê-los; nesse
+  caso o repositório resolve a consulta nos objetos em memória. Backends com ranged_sales
+  sabem ler só as vendas de um período em load_sales; os demais sempre devolvem todas.
+  """
+
+  write_through = False
+  typed_records = False
+  ranged_sales = False
+
+  def load_products(self) -> Iterator[dict]:
+    raise NotImplementedError
+
+  def save_products(self, records: Iterable[dict]):
+    raise NotImplementedError
+
+  def load_sales(self, start: datetime | None = None, end: datetime | None = None) -> Iterator[dict]:
+    raise NotImplementedError
+
+  def save_sales(self, records: Iterable[dict]):
+    raise NotImplementedError
+
+  def upsert_product(self, record: dict):
+    pass
+
+  def upsert_products(self, records: list[dict]):
+    for record in records:
+      self.upsert_product(record)
+
+  def delete_product(self, id: str):
+    pass
+
+  def insert_sale(self, record: dict):
+    pass
+
+  def append_sales(self, records: Iterable[dict]) -> bool:
+    """Acrescenta vendas novas ao que já está gravado, sem reescrever o resto; retorna False
+    (sem consumir records) se o backend só sabe gravar o histórico inteiro em save_sales"""
+    return False
+
+  def query_product_ids(
+    self,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    max_quantity: int | None = None,
+    is_perishable: bool | None = None,
+    expiring_before: date | None = None,
+  ) -> list[str] | None:
+    return None
+
+  def product_sales_summary(self) -> dict[str, int] | None:
+    return None
+
+class JsonStorage(StorageBackend):
+  """Backend padrão: snapshots completos em arquivos JSON (ou JSON Lines, para nomes .jsonl)"""
+
+  def __init__(self, inventory_filename="inventory.json", sales_filename="sales.json"):
+    self.inventory_filename = inventory_filename
+    self.sales_filename = sales_filename
+
+  def load_products(self) -> Iterator[dict]:
+    return iter_json_records(self.inventory_filename)
+
+  def save_products(self, records: Iterable[dict]):
+    save_records(records, self.inventory_filename)
+
+  def load_sales(self, start: datetime | None = None, end: datetime | None = None) -> Iterator[dict]:
+    return iter_json_records(self.sales_filename)
+
+  def save_sales(self, records: Iterable[dict]):
+    save_records(records, self.sales_filename)
+
+class SnapshotStorage(StorageBackend):
+  """Backend padrão: snapshots binários (veja repositories.snapshot) gravados de forma atômica.
+  Os produtos ficam num único snapshot; as vendas, em segmentos mensais (veja SalesSegments).
+  Enquanto ainda não existem segmentos, lê o snapshot de vendas único ou os arquivos JSON
+  antigos, que são convertidos na primeira gravação completa; o JSON continua disponível
+  como formato de exportação e importação em save_to_file/load_from_file."""
+
+  typed_records = True
+
+  def __init__(
+    self,
+    inventory_filename="inventory.snap",
+    sales_directory="sales",
+    sales_compression: str | None = "gzip",
+    legacy_sales_filename="sales.snap",
+    legacy_inventory_filename="inventory.json",
+    legacy_sales_json_filename="sales.json",
+  ):
+    self.inventory_filename = inventory_filename
+    self.sales_segments = SalesSegments(sales_directory, sales_compression)
+    self.legacy_sales_filename = legacy_sales_filename
+    self.legacy_inventory_filename = legacy_inventory_filename
+    self.legacy_sales_json_filename = legacy_sales_json_filename
+
+  @property
+  def ranged_sales(self) -> bool:
+    return self.sales_segments.exists()
+
+  def load_products(self) -> Iterator[dict]:
+    if os.path.exists(self.inventory_filename):
+      return iter_products_snapshot(self.inventory_filename)
+    return iter_json_records(self.legacy_inventory_filename)
+
+  def save_products(self, records: Iterable[dict]):
+    save_products_snapshot(records, self.inventory_filename)
+
+  def load_sales(self, start: datetime | None = None, end: datetime | None = None) -> Iterator[dict]:
+    if self.sales_segments.exists():
+      return self.sales_segments.load(start, end)
+    if os.path.exists(self.legacy_sales_filename):
+      return iter_sales_snapshot(self.legacy_sales_filename)
+    return iter_json_records(self.legacy_sales_json_filename)
+
+  def save_sales(self, records: Iterable[dict]):
+    self.sales_segments.replace(records)
+
+  def append_sales(self, records: Iterable[dict]) -> bool:
+    # Vendas ainda só nos formatos antigos precisam de uma gravação completa para virar segmentos
+    if not self.sales_segments.exists() and self.__has_legacy_sales():
+      return False
+    self.sales_segments.append(records)
+    return True
+
+  def has_data(self) -> bool:
+    return self.sales_segments.exists() or self.__has_legacy_sales() or any(
+      os.path.exists(filename) for filename in (self.inventory_filename, self.legacy_inventory_filename)
+    )
+
+  def __has_legacy_sales(self) -> bool:
+    return os.path.exists(self.legacy_sales_filename) or os.path.exists(self.legacy_sales_json_filename)
+
+PRODUCT_COLUMNS = (
+  "id", "name", "description", "price", "brand", "quantity", "barcode",
+  "created_at", "updated_at", "is_perishable", "expiration_date",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+  id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  description TEXT NOT NULL,
+  price REAL NOT NULL,
+  brand TEXT NOT NULL,
+  quantity INTEGER NOT NULL,
+  barcode TEXT NOT NULL,
+  created_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL,
+  is_perishable INTEGER NOT NULL,
+  expiration_date TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_barcode ON products (barcode);
+CREATE INDEX IF NOT EXISTS idx_products_brand ON products (brand COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (price);
+CREATE INDEX IF NOT EXISTS idx_products_quantity ON products (quantity);
+CREATE INDEX IF NOT EXISTS idx_products_expiration_date ON products (expiration_date);
+
+CREATE TABLE IF NOT EXISTS sales (
+  id TEXT PRIMARY KEY,
+  seller_name TEXT NOT NULL,
+  buyer_cpf TEXT NOT NULL,
+  sale_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales (sale_date);
+
+CREATE TABLE IF NOT EXISTS sale_items (
+  sale_id TEXT NOT NULL REFERENCES sales (id),
+  position INTEGER NOT NULL,
+  product_id TEXT NOT NULL,
+  quantity INTEGER NOT NULL,
+  unit_price REAL,
+  product_name TEXT,
+  barcode TEXT,
+  PRIMARY KEY (sale_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_sale_items_product_id ON sale_items (product_id);
+"""
+
+# Colunas acrescentadas depois da criação do esquema; bancos antigos as ganham ao abrir (nulas
+# nos itens antigos, que continuam sendo resolvidos pelo estoque)
+SALE_ITEM_SNAPSHOT_COLUMNS = {"unit_price": "REAL", "product_name": "TEXT", "barcode": "TEXT"}
+
+class SqliteStorage(StorageBackend):
+  """Backend SQLite (stdlib) com colunas indexadas e escrita imediata de cada alteração"""
+
+  write_through = True
+  ranged_sales = True
+
+  def __init__(self, path="inventory.db"):
+    self.path = path
+    # As alterações pendentes são gravadas pela thread de autosave; o repositório serializa
+    # essas escritas e o módulo sqlite3 é compilado em modo serializado
+    self.connection = sqlite3.connect(path, check_same_thread=False)
+    self.connection.executescript(SCHEMA)
+    self.__upgrade_schema()
+
+  def load_products(self) -> Iterator[dict]:
+    rows = self.connection.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products")
+    return (self.__row_to_product(row) for row in rows)
+
+  def save_products(self, records: Iterable[dict]):
+    with self.__unique_barcodes(), self.connection:
+      self.connection.execute("DELETE FROM products")
+      self.connection.executemany(self.__upsert_product_sql(), [self.__product_to_row(r) for r in records])
+
+  def load_sales(self, start: datetime | None = None, end: datetime | None = None) -> Iterator[dict]:
+    clauses, params = [], []
+    if start is not None:
+      clauses.append("s.sale_date >= ?")
+      params.append(start.isoformat())
+    if end is not None:
+      clauses.append("s.sale_date <= ?")
+      params.append(end.isoformat())
+    rows = self.connection.execute(
+      f"""
+      SELECT s.id, s.seller_name, s.buyer_cpf, s.sale_date,
+        i.product_id, i.quantity, i.unit_price, i.product_name, i.barcode
+      FROM sales s LEFT JOIN sale_items i ON i.sale_id = s.id
+      {"WHERE " + " AND ".join(clauses) if clauses else ""}
+      ORDER BY s.sale_date, s.id, i.position
+      """,
+      params,
+    )
+    for (id, seller_name, buyer_cpf, sale_date), group in groupby(rows, key=lambda row: row[:4]):
+      items = []
+      for *_, product_id, quantity, unit_price, product_name, barcode in group:
+        if product_id is None:
+          continue
+        item = {"product_id": product_id, "quantity": quantity}
+        if unit_price is not None:
+          item.update(unit_price=unit_price, product_name=product_name, barcode=barcode)
+        items.append(item)
+      yield {"id": id, "seller_name": seller_name, "buyer_cpf": buyer_cpf, "sale_date": sale_date, "items": items}
+
+  def save_sales(self, records: Iterable[dict]):
+    with self.connection:
+      self.connection.execute("DELETE FROM sale_items")
+      self.connection.execute("DELETE FROM sales")
+      for record in records:
+        self.__insert_sale(record)
+
+  def upsert_product(self, record: dict):
+    with self.__unique_barcodes(), self.connection:
+      self.connection.execute(self.__upsert_product_sql(), self.__product_to_row(record))
+
+  def upsert_products(self, records: list[dict]):
+    with self.__unique_barcodes(), self.connection:
+      self.connection.executemany(self.__upsert_product_sql(), [self.__product_to_row(r) for r in records])
+
+  def delete_product(self, id: str):
+    with self.connection:
+      self.connection.execute("DELETE FROM products WHERE id = ?", (id,))
+
+  def insert_sale(self, record: dict):
+    with self.connection:
+      self.__insert_sale(record)
+
+  def query_product_ids(
+    self,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    max_quantity: int | None = None,
+    is_perishable: bool | None = None,
+    expiring_before: date | None = None,
+  ) -> list[str] | None:
+    clauses, params = [], []
+    if min_price is not None:
+      clauses.append("price >= ?")
+      params.append(min_price)
+    if max_price is not None:
+      clauses.append("price <= ?")
+      params.append(max_price)
+    if max_quantity is not None:
+      clauses.append("quantity < ?")
+      params.append(max_quantity)
+    if is_perishable is not None:
+      clauses.append("is_perishable = ?")
+      params.append(int(is_perishable))
+    if expiring_before is not None:
+      clauses.append("expiration_date < ?")
+      params.append(expiring_before.isoformat())
+
+    sql = "SELECT id FROM products"
+    if clauses:
+      sql += " WHERE " + " AND ".join(clauses)
+    return [row[0] for row in self.connection.execute(sql, params)]
+
+  def product_sales_summary(self) -> dict[str, int] | None:
+    rows = self.connection.execute("SELECT product_id, SUM(quantity) FROM sale_items GROUP BY product_id")
+    return {product_id: total for product_id, total in rows}
+
+  def close(self):
+    self.connection.close()
+
+  def __insert_sale(self, record: dict):
+    self.connection.execute(
+      "INSERT OR REPLACE INTO sales (id, seller_name, buyer_cpf, sale_date) VALUES (?, ?, ?, ?)",
+      (str(record["id"]), record["seller_name"], record["buyer_cpf"], sql_value(record["sale_date"])),
+    )
+    self.connection.execute("DELETE FROM sale_items WHERE sale_id = ?", (str(record["id"]),))
+    self.connection.executemany(
+      """
+      INSERT INTO sale_items (sale_id, position, product_id, quantity, unit_price, product_name, barcode)
+      VALUES (?, ?, ?, ?, ?, ?, ?)
+      """,
+      [
+        (
+          str(record["id"]), position, str(item["product_id"]), item["quantity"],
+          item.get("unit_price"), item.get("product_name"), item.get("barcode"),
+        )
+        for position, item in enumerate(record["items"])
+      ],
+    )
+
+  def __upgrade_schema(self):
+    columns = {row[1] for row in self.connection.execute("PRAGMA table_info(sale_items)")}
+    with self.connection:
+      for column, type in SALE_ITEM_SNAPSHOT_COLUMNS.items():
+        if column not in columns:
+          self.connection.execute(f"ALTER TABLE sale_items ADD COLUMN {column} {type}")
+
+  def __upsert_product_sql(self) -> str:
+    """Atualiza o produto pelo id; um código de barras de outro produto viola idx_products_barcode
+    (INSERT OR REPLACE apagaria esse outro produto em silêncio)"""
+    placeholders = ", ".join("?" for _ in PRODUCT_COLUMNS)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in PRODUCT_COLUMNS if column != "id")
+    return (
+      f"INSERT INTO products ({', '.join(PRODUCT_COLUMNS)}) VALUES ({placeholders}) "
+      f"ON CONFLICT(id) DO UPDATE SET {updates}"
+    )
+
+  @contextlib.contextmanager
+  def __unique_barcodes(self):
+    """Transforma a violação do código de barras único em ValidationError (a transação é desfeita)"""
+    try:
+      yield
+    except sqlite3.IntegrityError as e:
+      if "products.barcode" not in str(e):
+        raise
+      raise ValidationError("Código de barras já cadastrado em outro produto") from e
+
+  def __product_to_row(self, record: dict) -> tuple:
+    return tuple(
+      int(record.get("is_perishable", True)) if column == "is_perishable" else sql_value(record.get(column))
+      for column in PRODUCT_COLUMNS
+    )
+
+  def __row_to_product(self, row: tuple) -> dict:
+    record = dict(zip(PRODUCT_COLUMNS, row))
+    record["is_perishable"] = bool(record["is_perishable"])
+    return record
+
+def sql_value(value):
+  """Registros tipados chegam com UUID/datetime/date; o SQLite guarda o texto de sempre"""
+  if isinstance(value, UUID):
+    return str(value)
+  if isinstance(value, date):
+    return value.isoformat()
+  return value
+
+def migrate_to_sqlite(source: StorageBackend, db_path="inventory.db") -> SqliteStorage:
+  """Migração única dos dados de outro backend para um banco SQLite"""
+  target = SqliteStorage(db_path)
+  target.save_products(source.load_products())
+  target.save_sales(source.load_sales())
+  return target
+
+def migrate_json_to_sqlite(db_path="inventory.db", inventory_filename="inventory.json", sales_filename="sales.json") -> SqliteStorage:
+  """Migração única dos arquivos JSON existentes para um banco SQLite"""
+  return migrate_to_sqlite(JsonStorage(inventory_filename, sales_filename), db_path)
+
+def open_storage(db_path: str | None = None) -> StorageBackend:
+  """Abre o backend SQLite quando um caminho é informado (migrando os snapshots ou JSON na primeira
+  vez); senão usa os snapshots binários"""
+  snapshots = SnapshotStorage()
+  if not db_path:
+    return snapshots
+  if not os.path.exists(db_path) and snapshots.has_data():
+    return migrate_to_sqlite(snapshots, db_path)
+  return SqliteStorage(db_path)
@@ -0,0 +1,152 @@
+import heapq
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from uuid import UUID
+
+COMBINING_MARKS = {code: None for code in range(0x300, 0x370)}
+FUZZY_MIN_COVERAGE = 0.5
+
+def fold_text(value: str) -> str:
+  """Remove acentos, ignora maiúsculas/minúsculas e colapsa espaços ("Açúcar  União" -> "acucar uniao")"""
+  return " ".join(map(fold_word, value.split()))
+
+@lru_cache(maxsize=1 << 16)
+def fold_word(word: str) -> str:
+  if not word.isascii():
+    word = unicodedata.normalize("NFKD", word).translate(COMBINING_MARKS)
+  return word.casefold()
+
+def trigrams(text: str) -> set[str]:
+  return {text[i:i + 3] for i in range(len(text) - 2)}
+
+@lru_cache(maxsize=1 << 16)
+def word_trigrams(word: str) -> frozenset[str]:
+  return frozenset(trigrams(f" {word} "))
+
+def text_trigrams(text: str) -> set[str]:
+  """Trigramas de cada palavra com um espaço em cada ponta; catálogos repetem muito as mesmas palavras"""
+  return set().union(*map(word_trigrams, text.split()))
+
+class TrigramIndex:
+  """Índice invertido de trigramas sobre um texto por produto (nome ou marca).
+
+  Os textos são guardados já normalizados por fold_text e indexados palavra a palavra, com um
+  espaço em cada ponta, para que inícios e fins de palavra também virem trigramas. Buscas por
+  trecho intersectam as listas de postagem dos trigramas de cada palavra da consulta e
+  confirmam o trecho no texto;
+  se nada contém o trecho, a busca aproximada ranqueia quem compartilha mais trigramas.
+  As listas de postagem guardam id.int: o hash de um int é feito em C, o de um UUID não.
+  """
+
+  def __init__(self):
+    self.__postings: defaultdict[str, set[int]] = defaultdict(set)
+    self.__texts: dict[int, str] = {}
+    self.__ids: dict[int, UUID] = {}
+
+  def __len__(self):
+    return len(self.__texts)
+
+  def texts(self) -> dict[UUID, str]:
+    return {self.__ids[key]: text for key, text in self.__texts.items()}
+
+  def add(self, id: UUID, value: str):
+    """Indexa (ou reindexa) o texto de id; não faz nada se o texto normalizado não mudou"""
+    key = id.int
+    text = fold_text(value)
+    previous = self.__texts.get(key)
+    if previous == text:
+      return
+    if previous is not None:
+      self.remove(id)
+    self.__texts[key] = text
+    self.__ids[key] = id
+    postings = self.__postings
+    for gram in text_trigrams(text):
+      postings[gram].add(key)
+
+  def remove(self, id: UUID):
+    key = id.int
+    text = self.__texts.pop(key, None)
+    if text is None:
+      return
+    del self.__ids[key]
+    for gram in text_trigrams(text):
+      keys = self.__postings.get(gram)
+      if keys is not None:
+        keys.discard(key)
+        if not keys:
+          del self.__postings[gram]
+
+  def clear(self):
+    self.__postings.clear()
+    self.__texts.clear()
+    self.__ids.clear()
+
+  def estimate(self, query: str) -> int:
+    """Limite superior barato de quantos textos contêm query: o tamanho da menor lista de postagem"""
+    grams = set().union(*map(trigrams, fold_text(query).split()))
+    if not grams:
+      return len(self.__texts)
+    return min(len(self.__postings.get(gram, ())) for gram in grams)
+
+  def matches(self, query: str) -> list[UUID]:
+    """Ids cujo texto contém query, sem ranqueamento nem busca aproximada"""
+    query = fold_text(query)
+    return [self.__ids[key] for *_, key in self.__substring_matches(query)] if query else []
+
+  def search(self, query: str, limit: int | None = None, fuzzy: bool = True) -> list[UUID]:
+    """Ids cujo texto contém a consulta, do melhor para o pior casamento; sem nenhum, os aproximados"""
+    query = fold_text(query)
+    if not query:
+      return []
+    ranked = self.__substring_matches(query)
+    if not ranked and fuzzy:
+      ranked = self.__fuzzy_matches(query)
+    ranked = heapq.nsmallest(limit, ranked) if limit is not None else sorted(ranked)
+    return [self.__ids[key] for *_, key in ranked]
+
+  def __substring_matches(self, query: str) -> list[tuple]:
+    texts = self.__texts
+    grams = set().union(*map(trigrams, query.split()))
+    if grams:
+      postings = sorted((self.__postings.get(gram, ()) for gram in grams), key=len)
+      if not postings[0]:
+        return []
+      candidates = set(postings[0]).intersection(*postings[1:])
+    else:
+      candidates = texts.keys()
+
+    ranked = []
+    for key in candidates:
+      text = texts[key]
+      position = text.find(query)
+      if position < 0:
+        continue
+      # Igual > começa com a consulta > começa numa palavra > no meio; depois, textos mais curtos
+      if text == query:
+        quality = 0
+      elif position == 0:
+        quality = 1
+      elif text[position - 1] == " ":
+        quality = 2
+      else:
+        quality = 3
+      ranked.append((quality, len(text), text, key))
+    return ranked
+
+  def __fuzzy_matches(self, query: str) -> list[tuple]:
+    grams = text_trigrams(query)
+    needed = max(1, int(len(grams) * FUZZY_MIN_COVERAGE + 0.5))
+    postings = sorted((self.__postings.get(gram, set()) for gram in grams), key=len)
+
+    # Quem compartilha `needed` trigramas aparece em ao menos uma das len - needed + 1 menores listas
+    candidates = set().union(*postings[:len(postings) - needed + 1])
+    texts = self.__texts
+    ranked = []
+    for key in candidates:
+      shared = sum(1 for keys in postings if key in keys)
+      if shared >= needed:
+        text = texts[key]
+        ranked.append((-shared, len(text), text, key))
+    return ranked
@@ -0,0 +1,291 @@
+"""Servidor de estoque para os caixas (PDV): JSON por linha sobre TCP, só com a stdlib.
+
+Cada linha recebida é uma requisição {"id": ..., "op": ..., ...} e cada resposta é uma linha
+{"id": ..., "ok": true, "result": ...} ou {"id": ..., "ok": false, "error": "..."}. As respostas
+saem na ordem das requisições da conexão, então o cliente pode mandar várias sem esperar
+(pipelining). Leituras são respondidas na hora; escritas (add, restock, sell) são agrupadas em
+micro-lotes com um único fsync do journal por lote e só são confirmadas depois de gravadas.
+
+Operações:
+  product          barcode
+  search           name, brand, barcode, min_price, max_price, max_quantity, is_perishable,
+                   expiring_before (AAAA-MM-DD), limit
+  add              barcode, name, description, price, brand, quantity, expiration_date
+  restock          barcode, quantity
+  sell             items ([[código, quantidade], ...]), seller, cpf
+  sales_report     start, end (AAAA-MM-DD, opcionais)
+  expiration_report
+
+Uso: python server.py [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from datetime import date
+from typing import Callable
+from repositories import repository, sales_repository, open_storage, ProductQuery
+from services import add_product, restock_product, find_product, search_products_by_name, search_products_by_brand, sell_products
+from utils import ValidationError
+
+MAX_LINE = 1 << 20
+MAX_BATCH = 256
+DEFAULT_SEARCH_LIMIT = 50
+
+class RequestError(Exception):
+  pass
+
+def optional_date(request: dict, field: str) -> date | None:
+  value = request.get(field)
+  return date.fromisoformat(value) if value else None
+
+def required(request: dict, field: str):
+  if field not in request:
+    raise RequestError(f"campo obrigatório ausente: {field}")
+  return request[field]
+
+def product_result(product) -> dict:
+  return repository.product_to_dict(product)
+
+def get_product(request: dict) -> dict:
+  product = find_product(str(required(request, "barcode")))
+  if product is None:
+    raise RequestError(f"Produto com código {request['barcode']} não encontrado")
+  return product_result(product)
+
+def search(request: dict) -> list[dict]:
+  limit = request.get("limit", DEFAULT_SEARCH_LIMIT)
+  query = ProductQuery(
+    barcode=request.get("barcode"),
+    name=request.get("name"),
+    brand=request.get("brand"),
+    min_price=request.get("min_price"),
+    max_price=request.get("max_price"),
+    max_quantity=request.get("max_quantity"),
+    is_perishable=request.get("is_perishable"),
+    expiring_before=optional_date(request, "expiring_before"),
+  )
+  criteria = query.filters()
+  if not criteria:
+    raise RequestError("Informe ao menos um critério de busca")
+  # Mesma regra do cli: um único critério de texto usa a busca ranqueada
+  if criteria.keys() == {"name"}:
+    found_products = search_products_by_name(query.name, limit)
+  elif criteria.keys() == {"brand"}:
+    found_products = search_products_by_brand(query.brand, limit)
+  else:
+    found_products = repository.query(query)[:limit]
+  return [product_result(product) for product in found_products]
+
+def sales_report(request: dict) -> dict:
+  aggregates = sales_repository.aggregate_sales(optional_date(request, "start"), optional_date(request, "end"))
+  return {
+    "total_sales": aggregates.total_sales,
+    "total_items": aggregates.total_items,
+    "total_revenue": round(aggregates.total_revenue, 2),
+    "by_seller": {seller: {"units": units, "revenue": round(revenue, 2)} for seller, (units, revenue) in aggregates.by_seller.items()},
+    "by_product": [[barcode, name, units] for (barcode, name), units in aggregates.units_by_product_label().items()],
+  }
+
+def expiration_report(request: dict) -> dict:
+  classification = repository.classify_expiration()
+  def rows(bucket):
+    return [[product.get_barcode(), product.get_name(), days] for product, days in bucket]
+  return {
+    "today": classification.today.isoformat(),
+    "expired": rows(classification.expired),
+    "expiring_soon": rows(classification.expiring_soon),
+    "expiring_month": rows(classification.expiring_month),
+    "valid": len(classification.valid),
+    "non_perishable": len(classification.non_perishable),
+  }
+
+def add(request: dict) -> dict:
+  expiration_date = optional_date(request, "expiration_date")
+  return product_result(add_product(
+    str(required(request, "barcode")), required(request, "name"), required(request, "description"),
+    required(request, "price"), required(request, "brand"), required(request, "quantity"),
+    expiration_date is not None, expiration_date,
+  ))
+
+def restock(request: dict) -> dict:
+  return product_result(restock_product(str(required(request, "barcode")), required(request, "quantity")))
+
+def sell(request: dict) -> dict:
+  items = [(str(barcode), int(quantity)) for barcode, quantity in required(request, "items")]
+  sale = sell_products(items, required(request, "seller"), required(request, "cpf"))
+  return {"id": str(sale.get_id()), "total": round(sale.get_total(), 2)}
+
+READ_OPERATIONS = {
+  "product": get_product,
+  "search": search,
+  "sales_report": sales_report,
+  "expiration_report": expiration_report,
+}
+
+WRITE_OPERATIONS = {
+  "add": add,
+  "restock": restock,
+  "sell": sell,
+}
+
+def execute(operation, request: dict) -> dict:
+  try:
+    return {"id": request.get("id"), "ok": True, "result": operation(request)}
+  except (ValidationError, RequestError, ValueError, TypeError) as e:
+    return {"id": request.get("id"), "ok": False, "error": str(e)}
+  except Exception as e:
+    # Um erro inesperado vira resposta de erro: não pode derrubar o WriteBatcher nem a conexão
+    print(f"Erro ao executar {request.get('op')}: {e!r}", file=sys.stderr)
+    return internal_error(request)
+
+def internal_error(request: dict, message: str = "erro interno") -> dict:
+  return {"id": request.get("id"), "ok": False, "error": message}
+
+class WriteBatcher:
+  """Agrupa as escritas que chegam de todas as conexões em lotes de até max_batch.
+
+  As operações de um lote rodam no próprio loop de eventos, uma após a outra, então nunca
+  concorrem com as leituras; só o flush dos repositórios (journal e backend) vai para uma
+  thread. Enquanto um lote está sendo gravado, as escritas seguintes se acumulam na fila e
+  formam o próximo lote: sob carga o fsync é dividido por muitas escritas, e com pouca carga
+  nenhuma escrita espera por um lote encher.
+  """
+
+  def __init__(self, max_batch: int = MAX_BATCH):
+    self.max_batch = max_batch
+    self.batches = 0
+    self.writes = 0
+    self.__queue: asyncio.Queue = asyncio.Queue()
+
+  def submit(self, operation, request: dict) -> asyncio.Future:
+    future = asyncio.get_running_loop().create_future()
+    self.__queue.put_nowait((operation, request, future))
+    return future
+
+  async def run(self):
+    loop = asyncio.get_running_loop()
+    while True:
+      batch = [await self.__queue.get()]
+      while len(batch) < self.max_batch and not self.__queue.empty():
+        batch.append(self.__queue.get_nowait())
+
+      responses = [execute(operation, request) for operation, request, _ in batch]
+      try:
+        await loop.run_in_executor(None, self.flush)
+      except Exception as e:
+        # Nenhuma escrita do lote é confirmada se o flush falhou
+        print(f"Erro ao gravar lote: {e!r}", file=sys.stderr)
+        responses = [internal_error(request, "erro interno ao gravar") for _, request, _ in batch]
+      for (_, _, future), response in zip(batch, responses):
+        if not future.done():
+          future.set_result(response)
+      self.batches += 1
+      self.writes += len(batch)
+
+  def flush(self):
+    repository.flush()
+    sales_repository.flush()
+
+class InventoryServer:
+  def __init__(self, batcher: WriteBatcher):
+    self.batcher = batcher
+
+  def dispatch(self, line: bytes) -> asyncio.Future | Callable[[], dict]:
+    """Escritas vão logo para o WriteBatcher e voltam como Future; leituras voltam como uma
+    função, executada só quando chega a vez da resposta, depois das escritas anteriores da
+    mesma conexão (quem vende e em seguida consulta o estoque enxerga a própria venda)"""
+    try:
+      request = json.loads(line)
+      if not isinstance(request, dict):
+        raise ValueError("a requisição deve ser um objeto JSON")
+    except ValueError as e:
+      return lambda: {"id": None, "ok": False, "error": f"JSON inválido: {e}"}
+
+    op = request.get("op")
+    if op in WRITE_OPERATIONS:
+      return self.batcher.submit(WRITE_OPERATIONS[op], request)
+    if op in READ_OPERATIONS:
+      return lambda: execute(READ_OPERATIONS[op], request)
+    return lambda: {"id": request.get("id"), "ok": False, "error": f"operação desconhecida: {op}"}
+
+  async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    responses: asyncio.Queue = asyncio.Queue()
+    sender = asyncio.create_task(self.send(responses, writer))
+    try:
+      while line := await reader.readline():
+        if line.strip():
+          responses.put_nowait(self.dispatch(line))
+    except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+      pass
+    finally:
+      responses.put_nowait(None)
+      await sender
+      writer.close()
+
+  async def send(self, responses: asyncio.Queue, writer: asyncio.StreamWriter):
+    """Escreve as respostas na ordem das requisições; só espera o socket quando a fila esvazia,
+    para que respostas de requisições em sequência saiam juntas"""
+    try:
+      while (pending := await responses.get()) is not None:
+        if isinstance(pending, asyncio.Future):
+          response = await pending
+        else:
+          try:
+            response = pending()
+          except Exception as e:
+            print(f"Erro ao responder leitura: {e!r}", file=sys.stderr)
+            response = {"id": None, "ok": False, "error": "erro interno"}
+        writer.write(json.dumps(response, ensure_ascii=False, separators=(",", ":")).encode() + b"\n")
+        if responses.empty():
+          await writer.drain()
+    except ConnectionError:
+      while await responses.get() is not None:
+        pass
+
+async def serve(host: str, port: int):
+  batcher = WriteBatcher()
+  server = InventoryServer(batcher)
+  batch_task = asyncio.create_task(batcher.run())
+  listener = await asyncio.start_server(server.handle, host, port, limit=MAX_LINE)
+
+  stop = asyncio.Event()
+  loop = asyncio.get_running_loop()
+  for signum in (signal.SIGINT, signal.SIGTERM):
+    loop.add_signal_handler(signum, stop.set)
+
+  address = listener.sockets[0].getsockname()
+  print(f"Servidor de estoque em {address[0]}:{address[1]}", file=sys.stderr, flush=True)
+  async with listener:
+    await stop.wait()
+  batch_task.cancel()
+  print(f"{batcher.writes} escrita(s) em {batcher.batches} lote(s)", file=sys.stderr)
+
+def main(argv=None) -> int:
+  parser = argparse.ArgumentParser(description="Servidor de estoque (JSON por linha sobre TCP)")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8765)
+  args = parser.parse_args(argv)
+
+  storage = open_storage(os.environ.get("INVENTORY_DB"))
+  repository.storage = storage
+  sales_repository.storage = storage
+  start = time.perf_counter()
+  repository.load_from_file()
+  sales_repository.load_from_file()
+  print(f"Dados carregados em {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+  try:
+    asyncio.run(serve(args.host, args.port))
+  finally:
+    repository.save_to_file()
+    sales_repository.save_to_file()
+    repository.close()
+    sales_repository.close()
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
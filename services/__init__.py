@@ -1,7 +1,13 @@
 from .inventory_service import (
     insert_product, update_product, show_inventory, make_sale, 
     generate_sales_report, generate_sales_csv_report, 
-    generate_sales_text_report, get_product, search_products,
+    generate_sales_text_report, generate_sales_reports, get_product, search_products,
     show_expiration_report, generate_expiration_text_report,
-    generate_expiration_csv_report, remove_expired_products
-)
\ No newline at end of file
+    generate_expiration_csv_report, remove_expired_products, show_metrics
+)
+from .inventory_operations import (
+    add_product, restock_product, edit_product, find_product, require_product,
+    search_products_by_name, search_products_by_brand, check_sellable,
+    sell_products, purge_expired_products
+)
+from .bulk_import import ImportResult, import_products
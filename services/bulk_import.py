@@ -0,0 +1,143 @@
+import csv
+import json
+from uuid import uuid4
+from datetime import datetime, date
+from repositories import repository
+from models import Product
+from utils import BatchValidators, BatchValidationResult, validate_columns, iter_json_records, iter_batches
+
+class ImportResult:
+  def __init__(self):
+    self.inserted = 0
+    self.updated = 0
+    self.rejected = 0
+
+def iter_import_rows(filename: str):
+  """Lê as linhas de um arquivo de fornecedor em CSV ou JSON Lines (ou array JSON)"""
+  if filename.lower().endswith(".csv"):
+    with open(filename, "r", encoding="utf-8", newline="") as f:
+      yield from csv.DictReader(f)
+  else:
+    yield from iter_json_records(filename)
+
+def parse_perishable(row: dict) -> bool:
+  value = row.get("is_perishable")
+  if value is None or value == "":
+    return bool(row.get("expiration_date"))
+  if isinstance(value, bool):
+    return value
+  return str(value).strip().lower() in ("1", "s", "sim", "y", "yes", "true")
+
+IMPORT_ROW_RULES = {
+  "barcode": BatchValidators.barcodes,
+  "quantity": BatchValidators.non_negative_integers("Quantidade"),
+}
+
+def text_column(rows: list[dict], field: str) -> list[str]:
+  return [str(row.get(field) or "") for row in rows]
+
+def validate_import_rows(rows: list[dict]) -> BatchValidationResult:
+  """Valida código de barras e quantidade, os campos exigidos de toda linha"""
+  return validate_columns(
+    {"barcode": text_column(rows, "barcode"), "quantity": [row.get("quantity") for row in rows]},
+    IMPORT_ROW_RULES,
+  )
+
+def validate_new_products(rows: list[dict], today: date) -> BatchValidationResult:
+  """Valida os campos de cadastro; a validade só é exigida dos perecíveis"""
+  perishable = [parse_perishable(row) for row in rows]
+  columns = {
+    "name": text_column(rows, "name"),
+    "description": text_column(rows, "description"),
+    "price": [row.get("price") for row in rows],
+    "brand": text_column(rows, "brand"),
+    "expiration_date": [
+      str(row.get("expiration_date") or "") if is_perishable else None
+      for row, is_perishable in zip(rows, perishable)
+    ],
+  }
+  result = validate_columns(columns, {
+    "name": BatchValidators.names,
+    "description": BatchValidators.descriptions,
+    "price": BatchValidators.prices,
+    "brand": BatchValidators.brands,
+    "expiration_date": BatchValidators.dates("Data de validade", not_before=today, optional=True),
+  })
+  result.values["is_perishable"] = perishable
+  return result
+
+def import_products(
+  filename: str,
+  error_filename: str | None = None,
+  batch_size: int = 10000,
+  now: datetime | None = None,
+) -> ImportResult:
+  """Importa produtos em lote: códigos novos são cadastrados e os existentes têm a quantidade somada,
+  como em insert_product. Linhas rejeitadas vão para error_filename (JSON Lines) com o motivo."""
+  now = now or datetime.now()
+  error_filename = error_filename or f"{filename}.errors.jsonl"
+  result = ImportResult()
+
+  with open(error_filename, "w", encoding="utf-8") as errors:
+    def reject(line_number: int, row: dict, message: str):
+      result.rejected += 1
+      errors.write(json.dumps({"line": line_number, "error": message, "row": row}, ensure_ascii=False, default=str))
+      errors.write("\n")
+
+    rows = enumerate(iter_import_rows(filename), 1)
+    for batch in iter_batches(rows, batch_size):
+      batch_rows = [row for _, row in batch]
+      checked = validate_import_rows(batch_rows)
+      barcodes, quantities = checked.values["barcode"], checked.values["quantity"]
+
+      # Só as linhas cujo código não está no estoque podem virar cadastro
+      candidates = [
+        position for position in range(len(batch))
+        if checked.is_valid(position) and repository.get_product_by_barcode(barcodes[position]) is None
+      ]
+      new_products = validate_new_products([batch_rows[position] for position in candidates], now.date())
+      candidate_rows = {position: index for index, position in enumerate(candidates)}
+      fields = new_products.values
+
+      # Produtos cadastrados neste lote; os que já estavam no estoque são repostos por
+      # adjust_quantity, que não perde a baixa de uma venda feita ao mesmo tempo
+      created: dict[str, Product] = {}
+      for position, (line_number, row) in enumerate(batch):
+        if not checked.is_valid(position):
+          reject(line_number, row, checked.errors[position])
+          continue
+        barcode, quantity = barcodes[position], quantities[position]
+        product = created.get(barcode) or repository.get_product_by_barcode(barcode)
+        if product:
+          if quantity <= 0:
+            reject(line_number, row, "Quantidade deve ser maior que zero")
+            continue
+          if barcode in created:
+            product.set_quantity(product.get_quantity() + quantity)
+          elif repository.adjust_quantity(product.get_id(), quantity, now) is None:
+            reject(line_number, row, f"Produto com código {barcode} não encontrado")
+            continue
+          result.updated += 1
+        else:
+          index = candidate_rows[position]
+          if not new_products.is_valid(index):
+            reject(line_number, row, new_products.errors[index])
+            continue
+          created[barcode] = Product(
+            id=uuid4(),
+            barcode=barcode,
+            quantity=quantity,
+            created_at=now,
+            updated_at=now,
+            name=fields["name"][index],
+            description=fields["description"][index],
+            price=fields["price"][index],
+            brand=fields["brand"][index],
+            is_perishable=fields["is_perishable"][index],
+            expiration_date=fields["expiration_date"][index],
+          )
+          result.inserted += 1
+
+      repository.insert_products(list(created.values()))
+
+  return result
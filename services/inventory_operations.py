@@ -0,0 +1,175 @@
+from uuid import uuid4
+from datetime import datetime, date
+from repositories import repository, sales_repository
+from models import Product, SaleItem, Sale
+from utils import Validators, ValidationError, instrumented
+
+@instrumented
+def add_product(
+  barcode: str,
+  name: str,
+  description: str,
+  price: float,
+  brand: str,
+  quantity: int,
+  is_perishable: bool,
+  expiration_date: date | None = None,
+  now: datetime | None = None,
+) -> Product:
+  """Cadastra um novo produto; lança ValidationError se algum campo for inválido ou o código já existir"""
+  barcode = Validators.validate_barcode(barcode)
+  if repository.get_product_by_barcode(barcode):
+    raise ValidationError(f"Produto com código {barcode} já cadastrado")
+
+  name, description, price, brand, quantity, expiration_date = validate_product_fields(
+    name, description, price, brand, quantity, is_perishable, expiration_date
+  )
+
+  now = now or datetime.now()
+  product = Product(
+    id=uuid4(),
+    name=name,
+    description=description,
+    price=price,
+    brand=brand,
+    quantity=quantity,
+    barcode=barcode,
+    created_at=now,
+    updated_at=now,
+    is_perishable=is_perishable,
+    expiration_date=expiration_date
+  )
+  repository.insert_product(product)
+  return product
+
+@instrumented
+def restock_product(barcode: str, quantity: int, now: datetime | None = None) -> Product:
+  """Soma quantity ao estoque de um produto já cadastrado"""
+  product = require_product(barcode)
+  quantity = Validators.validate_positive_integer(quantity, "Quantidade")
+
+  if repository.adjust_quantity(product.get_id(), quantity, now or datetime.now()) is None:
+    raise ValidationError(f"Produto com código {barcode} não encontrado")
+  return product
+
+@instrumented
+def edit_product(
+  barcode: str,
+  name: str,
+  description: str,
+  price: float,
+  brand: str,
+  quantity: int,
+  is_perishable: bool,
+  expiration_date: date | None = None,
+  now: datetime | None = None,
+) -> Product:
+  """Substitui os dados de um produto já cadastrado"""
+  product = require_product(barcode)
+  name, description, price, brand, quantity, expiration_date = validate_product_fields(
+    name, description, price, brand, quantity, is_perishable, expiration_date
+  )
+
+  # Sob o lock do produto, uma venda concorrente não intercala sua baixa com esta edição
+  with repository.product_lock(product.get_id()):
+    product.set_name(name)
+    product.set_description(description)
+    product.set_price(price)
+    product.set_brand(brand)
+    product.set_quantity(quantity)
+    product.set_is_perishable(is_perishable)
+    product.set_expiration_date(expiration_date)
+    product.set_updated_at(now or datetime.now())
+  return repository.update_product(product.get_id(), product)
+
+@instrumented
+def find_product(barcode: str) -> Product | None:
+  return repository.get_product_by_barcode(Validators.validate_barcode(barcode))
+
+def require_product(barcode: str) -> Product:
+  product = find_product(barcode)
+  if product is None:
+    raise ValidationError(f"Produto com código {barcode} não encontrado")
+  return product
+
+@instrumented
+def search_products_by_name(name: str, limit: int | None = None) -> list[Product]:
+  """Busca por trecho do nome, sem diferenciar acentos ("acucar" encontra "Açúcar"), com os melhores casamentos primeiro"""
+  return repository.search_by_name(Validators.validate_non_empty_string(name, "Nome"), limit)
+
+@instrumented
+def search_products_by_brand(brand: str, limit: int | None = None) -> list[Product]:
+  return repository.search_by_brand(Validators.validate_non_empty_string(brand, "Marca"), limit)
+
+def check_sellable(product: Product, quantity: int, today: date | None = None) -> int:
+  """Valida a venda de quantity unidades; retorna os dias até o vencimento (None se não perecível)"""
+  today = today or date.today()
+  days_until_expiration = None
+  if product.get_is_perishable() and product.get_expiration_date():
+    days_until_expiration = (product.get_expiration_date() - today).days
+    if days_until_expiration < 0:
+      raise ValidationError(f"Produto '{product.get_name()}' está vencido desde {product.get_expiration_date().strftime('%d/%m/%Y')}")
+
+  Validators.validate_quantity_for_sale(quantity, product.get_quantity())
+  return days_until_expiration
+
+@instrumented
+def sell_products(
+  items: list[tuple[str, int]],
+  seller_name: str,
+  buyer_cpf: str,
+  now: datetime | None = None,
+) -> Sale:
+  """Registra uma venda de (código de barras, quantidade); valida todos os itens antes de baixar o estoque"""
+  if not items:
+    raise ValidationError("Nenhum item foi adicionado à venda")
+  seller_name = Validators.validate_seller_name(seller_name)
+  buyer_cpf = Validators.validate_cpf(buyer_cpf)
+  now = now or datetime.now()
+
+  requested: dict[str, tuple[Product, int]] = {}
+  for barcode, quantity in items:
+    product = require_product(barcode)
+    _, previous = requested.get(product.get_barcode(), (product, 0))
+    requested[product.get_barcode()] = (product, previous + quantity)
+  for product, quantity in requested.values():
+    check_sellable(product, quantity, now.date())
+
+  # Baixa atômica item a item; se outro caixa esgotou algum produto nesse meio tempo, as baixas
+  # já feitas são devolvidas e a venda inteira é recusada
+  sale_items = []
+  try:
+    for product, quantity in requested.values():
+      if repository.adjust_quantity(product.get_id(), -quantity) is None:
+        Validators.validate_quantity_for_sale(quantity, product.get_quantity())
+        raise ValidationError(f"Produto '{product.get_name()}' não está mais disponível")
+      sale_items.append(SaleItem(product=product, quantity=quantity))
+
+    sale = Sale(seller_name=seller_name, buyer_cpf=buyer_cpf, sale_date=now, items=sale_items)
+    if not sales_repository.make_sale(sale):
+      raise ValidationError("Erro ao realizar a venda")
+  except ValidationError:
+    for item in sale_items:
+      repository.adjust_quantity(item.get_product_id(), item.get_quantity())
+    raise
+  return sale
+
+@instrumented
+def purge_expired_products(today: date | None = None) -> list[Product]:
+  """Remove do estoque todos os produtos vencidos e os retorna"""
+  expired_products = repository.list_expired_products(today)
+  return [product for product in expired_products if repository.remove_product(product.get_id())]
+
+def validate_product_fields(name, description, price, brand, quantity, is_perishable, expiration_date):
+  name = Validators.validate_name(name)
+  description = Validators.validate_description(description)
+  price = Validators.validate_price(float(price))
+  brand = Validators.validate_brand(brand)
+  quantity = Validators.validate_non_negative_integer(int(quantity), "Quantidade")
+  if is_perishable:
+    if expiration_date is None:
+      raise ValidationError("Produto perecível precisa de data de validade")
+    expiration_date = Validators.validate_expiration_date(expiration_date)
+  else:
+    expiration_date = None
+  return name, description, price, brand, quantity, expiration_date
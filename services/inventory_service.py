@@ -1,29 +1,32 @@
-from uuid import uuid4
 from datetime import datetime, date
-from repositories import repository, sales_repository
+from functools import partial
+from repositories import (
+  repository, sales_repository, classify_days, EXPIRED, EXPIRING_SOON, EXPIRING_MONTH, VALID, ProductQuery, SalesAggregates
+)
 from models import Product, SaleItem, Sale
-from utils import (show_selling_options_menu, safe_input, safe_input_number, safe_input_date, safe_input_yes_no, Validators)
+from utils import (show_selling_options_menu, safe_input, safe_input_number, safe_input_date, safe_input_yes_no, Validators, ValidationError, open_report, LineWriter, safe_input_number_optional, safe_input_date_optional, instrumented, metrics, map_shards, render_text_shard, render_csv_shard)
+from .inventory_operations import (
+  add_product, restock_product, edit_product, find_product, search_products_by_name,
+  search_products_by_brand, sell_products, purge_expired_products
+)
 import csv
 import os
-from collections import defaultdict
 
+@instrumented
 def insert_product():
   barcode = safe_input("Digite o código de barras do produto: ", Validators.validate_barcode)
   if barcode is None:
     return
 
-  product = repository.get_product_by_barcode(barcode)
+  product = find_product(barcode)
 
   if product:
     print("Produto já cadastrado. Atualizando quantidade...")
     quantity = safe_input_number("Digite a quantidade que será inserida: ", int, Validators.validate_positive_integer, "Quantidade")
     if quantity is None:
       return
-    new_quantity = product.get_quantity() + quantity
-    product.set_quantity(new_quantity)
-    product.set_updated_at(datetime.now())
-    repository.update_product(product.get_id(), product)
-    print(f"Quantidade atualizada para {new_quantity}.")
+    product = restock_product(barcode, quantity)
+    print(f"Quantidade atualizada para {product.get_quantity()}.")
     return
 
   name = safe_input("Digite o nome do produto: ", Validators.validate_name)
@@ -56,30 +59,16 @@ def insert_product():
     if expiration_date is None:
       return
 
-  now = datetime.now()
-  new_product = Product(
-    id=uuid4(),
-    name=name,
-    description=description,
-    price=price,
-    brand=brand,
-    quantity=quantity,
-    barcode=barcode,
-    created_at=now,
-    updated_at=now,
-    is_perishable=is_perishable,
-    expiration_date=expiration_date
-  )
-
-  repository.insert_product(new_product)
+  add_product(barcode, name, description, price, brand, quantity, is_perishable, expiration_date)
   print("Produto inserido com sucesso!")
 
+@instrumented
 def update_product():
   barcode = safe_input("\nDigite o código de barras do produto: ", Validators.validate_barcode)
   if barcode is None:
     return
 
-  product = repository.get_product_by_barcode(barcode)
+  product = find_product(barcode)
   if product is None:
     print("Produto não encontrado!")
     return
@@ -114,22 +103,12 @@ def update_product():
     if expiration_date is None:
       return
 
-  now = datetime.now()
-
-  product.set_name(name)
-  product.set_description(description)
-  product.set_price(price)
-  product.set_brand(brand)
-  product.set_quantity(quantity)
-  product.set_is_perishable(is_perishable)
-  product.set_expiration_date(expiration_date)
-  product.set_updated_at(now)
-  
-  updated_product = repository.update_product(product.get_id(), product)
+  updated_product = edit_product(barcode, name, description, price, brand, quantity, is_perishable, expiration_date)
 
   if updated_product:
     print("Produto atualizado com sucesso!")
 
+@instrumented
 def show_inventory():
   inventory = repository.list_products()
 
@@ -155,12 +134,13 @@ def show_inventory():
     print(f"Criado em: {product.get_created_at().strftime('%d/%m/%Y %H:%M:%S')}")
     print(f"Atualizado em: {product.get_updated_at().strftime('%d/%m/%Y %H:%M:%S')}")
 
+@instrumented
 def get_product():
   barcode = safe_input("Digite o código de barras: ", Validators.validate_barcode)
   if barcode is None:
     return
 
-  product = repository.get_product_by_barcode(barcode)
+  product = find_product(barcode)
 
   if product is None:
     print("Produto não encontrado!")
@@ -182,16 +162,18 @@ def get_product():
   print(f"Atualizado em: {product.get_updated_at().strftime('%d/%m/%Y %H:%M:%S')}")
 
 
+@instrumented
 def make_sale():
   keep_selling = True
   sale_items: list[SaleItem] = []
+  in_cart: dict[str, int] = {}
 
   while keep_selling:
     barcode = safe_input("Digite o código de barras do produto: ", Validators.validate_barcode)
     if barcode is None:
       return
 
-    product = repository.get_product_by_barcode(barcode)
+    product = find_product(barcode)
 
     if product is None:
       print("Produto não encontrado!")
@@ -218,22 +200,21 @@ def make_sale():
           continue
         print()
     
+    available_quantity = product.get_quantity() - in_cart.get(barcode, 0)
+
     print(f"Produto encontrado: {product.get_name()}")
     print(f"   Preço: R$ {product.get_price():.2f}")
-    print(f"   Disponível: {product.get_quantity()} unidades")
+    print(f"   Disponível: {available_quantity} unidades")
     if product.get_is_perishable():
       print(f"   Validade: {product.get_expiration_date().strftime('%d/%m/%Y')}")
     else:
       print("   Produto não perecível")
     
-    quantity = safe_input_number("Digite a quantidade: ", int, Validators.validate_quantity_for_sale, product.get_quantity())
+    quantity = safe_input_number("Digite a quantidade: ", int, Validators.validate_quantity_for_sale, available_quantity)
     if quantity is None:
       return
     
-    quantity_remaining = product.get_quantity() - quantity
-    product.set_quantity(quantity_remaining)
-    repository.update_product(product.get_id(), product)
-
+    in_cart[barcode] = in_cart.get(barcode, 0) + quantity
     sale_item = SaleItem(product=product, quantity=quantity)
     sale_items.append(sale_item)
     
@@ -257,8 +238,7 @@ def make_sale():
   print("\n" + "=" * 40)
   print("RESUMO DA VENDA:")
   for item in sale_items:
-    product = item.get_product()
-    print(f"- {product.get_name()} x{item.get_quantity()} = R$ {item.get_subtotal():.2f}")
+    print(f"- {item.get_product_name()} x{item.get_quantity()} = R$ {item.get_subtotal():.2f}")
   print("-" * 40)
   print(f"TOTAL: R$ {total_venda:.2f}")
   print("=" * 40)
@@ -271,50 +251,41 @@ def make_sale():
   if buyer_cpf is None:
     return
 
-  now = datetime.now()
+  try:
+    sale = sell_products(list(in_cart.items()), seller_name, buyer_cpf)
+  except ValidationError as e:
+    print(f"Erro ao realizar a venda: {e}")
+    return
 
-  sale = Sale(
-    seller_name = seller_name,
-    buyer_cpf = buyer_cpf,
-    sale_date = now,
-    items = sale_items
-  )
+  print("\nVenda realizada com sucesso!")
+  print(f"Total: R$ {sale.get_total():.2f}")
+  print(f"Data: {sale.get_sale_date().strftime('%d/%m/%Y %H:%M:%S')}")
 
-  is_sale_made = sales_repository.make_sale(sale)
+def describe_period(start: date | None, end: date | None) -> str:
+  start_label = start.strftime('%d/%m/%Y') if start else "início"
+  end_label = end.strftime('%d/%m/%Y') if end else "hoje"
+  return f"{start_label} a {end_label}"
 
-  if is_sale_made:
-    print("\nVenda realizada com sucesso!")
-    print(f"Total: R$ {sale.get_total():.2f}")
-    print(f"Data: {now.strftime('%d/%m/%Y %H:%M:%S')}")
-  else:
-    print("Erro ao realizar a venda")
-
-def generate_sales_report():
-  sales = sales_repository.list_sales()
+@instrumented
+def generate_sales_report(start: date | None = None, end: date | None = None):
+  sales = sales_repository.list_sales(start, end)
 
   if not sales:
     print("Nenhuma venda registrada.")
     return
 
+  aggregates = sales_repository.aggregate_sales(start, end)
   total_sales = len(sales)
-  total_items_sold = 0
-  item_sales_summary = defaultdict(int)
+  total_items_sold = aggregates.total_items
+  item_sales_summary = aggregates.units_by_product_label()
 
   print("\n")
   print("=" * 50)
   print(f"RELATÓRIO DE VENDAS")
+  if start or end:
+    print(f"Período: {describe_period(start, end)}")
   print(f"Total de vendas realizadas: {total_sales}")
 
-  for sale in sales:
-    for item in sale.get_items():
-      quantity = item.get_quantity()
-      product = item.get_product()
-      barcode = product.get_barcode()
-      name = product.get_name()
-
-      total_items_sold += quantity
-      item_sales_summary[(barcode, name)] += quantity
-
   print(f"Total de itens vendidos: {total_items_sold}")
   print("\nQuantidade vendida por produto:")
   for (barcode, name), quantity in item_sales_summary.items():
@@ -330,81 +301,138 @@ def generate_sales_report():
     print("Itens vendidos:")
 
     for item in sale.get_items():
-      product = item.get_product()
-      print(f"  - {product.get_name()} (x{item.get_quantity()})")
+      print(f"  - {item.get_product_name()} (x{item.get_quantity()})")
 
     print(f"Total da venda: R$ {sale.get_total():.2f}")
   print("=" * 50)
 
-def generate_sales_text_report():
-  sales = sales_repository.list_sales()
-  
-  total_sales = len(sales)
-  total_items_sold = 0
-  items_summary = {} 
+SALES_CSV_HEADERS = ["Data", "Vendedor", "CPF do Comprador", "Produto", "Quantidade"]
 
-  lines = []
-  lines.append("RELATÓRIO DE VENDAS\n")
-  lines.append(f"Total de vendas: {total_sales}\n")
+def iter_sales_text_header(total_sales: int, start: date | None = None, end: date | None = None):
+  yield "RELATÓRIO DE VENDAS\n"
+  if start or end:
+    yield f"Período: {describe_period(start, end)}\n"
+  yield f"Total de vendas: {total_sales}\n"
 
-  for sale in sales:
-    lines.append("-" * 40)
-    lines.append(f"Data: {sale.get_sale_date().strftime('%d/%m/%Y %H:%M:%S')}")
-    lines.append(f"Vendedor: {sale.get_seller_name()}")
-    lines.append(f"CPF do comprador: {sale.get_buyer_cpf()}")
-    lines.append("Itens:")
+def iter_sale_text_lines(sale: Sale):
+  yield "-" * 40
+  yield f"Data: {sale.get_sale_date().strftime('%d/%m/%Y %H:%M:%S')}"
+  yield f"Vendedor: {sale.get_seller_name()}"
+  yield f"CPF do comprador: {sale.get_buyer_cpf()}"
+  yield "Itens:"
 
-    for item in sale.get_items():
-      name = item.get_product().get_name()
-      qty = item.get_quantity()
-      lines.append(f"- {name}: {qty}")
-      total_items_sold += qty
+  for item in sale.get_items():
+    yield f"- {item.get_product_name()}: {item.get_quantity()}"
 
-      if name in items_summary:
-        items_summary[name] += qty
-      else:
-        items_summary[name] = qty
+  yield ""
 
-    lines.append("")
+def iter_sales_text_footer(aggregates):
+  yield "=" * 40
+  yield f"\nTotal de itens vendidos: {aggregates.total_items}"
+  yield "\nQuantidade vendida por item:"
 
-  lines.append("=" * 40)
-  lines.append(f"\nTotal de itens vendidos: {total_items_sold}")
-  lines.append("\nQuantidade vendida por item:")
+  for name, qty in aggregates.units_by_product_name().items():
+    yield f"- {name}: {qty}"
 
-  for name, qty in items_summary.items():
-    lines.append(f"- {name}: {qty}")
+def iter_sale_csv_rows(sale: Sale):
+  sale_date = sale.get_sale_date().strftime("%d/%m/%Y %H:%M:%S")
+  seller = sale.get_seller_name()
+  buyer_cpf = sale.get_buyer_cpf()
 
-  timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-  with open(f"sales_report_{timestamp}.txt", "w", encoding="utf-8") as f:
-    f.write("\n".join(lines))
-  
-  print(f"Relatório gerado com sucesso em 'sales_report_{timestamp}.txt'")
+  for item in sale.get_items():
+    yield [sale_date, seller, buyer_cpf, item.get_product_name(), item.get_quantity()]
 
-def generate_sales_csv_report():
-  sales = sales_repository.list_sales()
+def render_sales_shard(sales: list[Sale], text: bool, csv_rows: bool, aggregate: bool) -> tuple[str | None, str | None, SalesAggregates | None]:
+  """Texto, linhas CSV e totais parciais de uma fatia de vendas (veja utils.map_shards)"""
+  aggregates = None
+  if aggregate:
+    aggregates = SalesAggregates()
+    for sale in sales:
+      aggregates.add_sale(sale)
+  return (
+    render_text_shard(iter_sale_text_lines, sales) if text else None,
+    render_csv_shard(iter_sale_csv_rows, sales) if csv_rows else None,
+    aggregates,
+  )
+
+def sales_report_shards(start: date | None, end: date | None, text: bool, csv_rows: bool, workers: int | None):
+  """Vendas do período, totais e as fatias formatadas (texto, CSV) em ordem. Sem período os totais
+  são os mantidos pelo repositório; com período, são somados fatia a fatia e só ficam completos
+  depois de consumidas todas as fatias."""
+  sales = sales_repository.list_sales(start, end)
+  ranged = start is not None or end is not None
+  aggregates = SalesAggregates() if ranged else sales_repository.aggregate_sales()
+
+  def shards():
+    render = partial(render_sales_shard, text=text, csv_rows=csv_rows, aggregate=ranged)
+    for text_chunk, csv_chunk, shard_aggregates in map_shards(sales, render, workers):
+      if ranged:
+        aggregates.merge(shard_aggregates)
+      yield text_chunk, csv_chunk
+  return sales, aggregates, shards()
+
+@instrumented
+def generate_sales_text_report(start: date | None = None, end: date | None = None, compression: str | None = None, workers: int | None = None):
+  """Gera o relatório de vendas em TXT; com workers > 1, formata as vendas em paralelo em
+  vários processos (o arquivo gerado é o mesmo)"""
+  sales, aggregates, shards = sales_report_shards(start, end, True, False, workers)
+
+  timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+  file, filename = open_report(f"sales_report_{timestamp}.txt", compression)
+  with file:
+    writer = LineWriter(file)
+    writer.write_all(iter_sales_text_header(len(sales), start, end))
+    for text_chunk, _ in shards:
+      writer.write(text_chunk)
+    writer.write_all(iter_sales_text_footer(aggregates))
+  
+  print(f"Relatório gerado com sucesso em '{filename}'")
+  return filename
+
+@instrumented
+def generate_sales_csv_report(start: date | None = None, end: date | None = None, compression: str | None = None, workers: int | None = None):
+  """Gera o relatório de vendas em CSV; workers como em generate_sales_text_report"""
+  _, _, shards = sales_report_shards(start, end, False, True, workers)
   
   timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-  filename = f"sales_report_{timestamp}.csv"
-  filepath = os.path.join(os.getcwd(), filename)
+  filepath = os.path.join(os.getcwd(), f"sales_report_{timestamp}.csv")
 
-  headers = ["Data", "Vendedor", "CPF do Comprador", "Produto", "Quantidade"]
-
-  with open(filepath, mode="w", newline="", encoding="utf-8") as file:
+  file, filepath = open_report(filepath, compression, newline="")
+  with file:
     writer = csv.writer(file)
-    writer.writerow(headers)
-
-    for sale in sales:
-      sale_date = sale.get_sale_date().strftime("%d/%m/%Y %H:%M:%S")
-      seller = sale.get_seller_name()
-      buyer_cpf = sale.get_buyer_cpf()
+    writer.writerow(SALES_CSV_HEADERS)
 
-      for item in sale.get_items():
-        product_name = item.get_product().get_name()
-        quantity = item.get_quantity()
-        writer.writerow([sale_date, seller, buyer_cpf, product_name, quantity])
+    for _, csv_chunk in shards:
+      file.write(csv_chunk)
 
+  filename = os.path.basename(filepath)
   print(f"Relatório gerado com sucesso: {filename}")
+  return filename
+
+@instrumented
+def generate_sales_reports(start: date | None = None, end: date | None = None, compression: str | None = None, workers: int | None = None):
+  """Gera os relatórios de vendas em TXT e CSV percorrendo as vendas uma única vez"""
+  sales, aggregates, shards = sales_report_shards(start, end, True, True, workers)
+
+  timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+  text_file, text_filename = open_report(f"sales_report_{timestamp}.txt", compression)
+  csv_file, csv_filename = open_report(f"sales_report_{timestamp}.csv", compression, newline="")
+  with text_file, csv_file:
+    text_writer = LineWriter(text_file)
+    csv_writer = csv.writer(csv_file)
+    text_writer.write_all(iter_sales_text_header(len(sales), start, end))
+    csv_writer.writerow(SALES_CSV_HEADERS)
+
+    for text_chunk, csv_chunk in shards:
+      text_writer.write(text_chunk)
+      csv_file.write(csv_chunk)
+
+    text_writer.write_all(iter_sales_text_footer(aggregates))
 
+  print(f"Relatórios gerados com sucesso: {text_filename} e {csv_filename}")
+  return text_filename, csv_filename
+
+@instrumented
 def show_expiration_report():
   """Mostra relatório de validade no terminal"""
   inventory = repository.list_products()
@@ -413,26 +441,12 @@ def show_expiration_report():
       print("\nO estoque está vazio.")
       return
 
-  perishable_products = [p for p in inventory.values() if p.get_is_perishable()]
-  non_perishable_products = [p for p in inventory.values() if not p.get_is_perishable()]
-  
-  today = date.today()
-  expired_products = []
-  expiring_soon = []
-  expiring_month = []
-  valid_products = []
-  
-  for product in perishable_products:
-      days_until_expiration = product.days_until_expiration()
-      
-      if days_until_expiration < 0:
-          expired_products.append((product, abs(days_until_expiration)))
-      elif days_until_expiration <= 7:
-          expiring_soon.append((product, days_until_expiration))
-      elif days_until_expiration <= 30:
-          expiring_month.append((product, days_until_expiration))
-      else:
-          valid_products.append((product, days_until_expiration))
+  classification = repository.classify_expiration()
+  expired_products = [(product, abs(days)) for product, days in classification.expired]
+  expiring_soon = classification.expiring_soon
+  expiring_month = classification.expiring_month
+  valid_products = classification.valid
+  non_perishable_products = classification.non_perishable
   
   print("\n" + "=" * 60)
   print("RELATÓRIO DE CONTROLE DE VALIDADE")
@@ -474,103 +488,128 @@ def show_expiration_report():
   
   print("=" * 60)
 
-def generate_expiration_text_report():
-  """Gera relatório de validade em arquivo TXT"""
+def iter_expired_text_lines(entry: tuple[Product, int]):
+  product, days_until_expiration = entry
+  yield f"Nome: {product.get_name()}"
+  yield f"Código: {product.get_barcode()}"
+  yield f"Vencido há: {abs(days_until_expiration)} dia(s)"
+  yield f"Data de validade: {product.get_expiration_date()}"
+  yield f"Quantidade: {product.get_quantity()}"
+  yield ""
+
+def iter_expiring_text_lines(entry: tuple[Product, int]):
+  product, days_left = entry
+  yield f"Nome: {product.get_name()}"
+  yield f"Código: {product.get_barcode()}"
+  yield f"Vence em: {days_left} dia(s)"
+  yield f"Data de validade: {product.get_expiration_date()}"
+  yield f"Quantidade: {product.get_quantity()}"
+  yield ""
+
+def iter_non_perishable_text_lines(product: Product):
+  yield f"Nome: {product.get_name()}"
+  yield f"Código: {product.get_barcode()}"
+  yield f"Quantidade: {product.get_quantity()}"
+  yield ""
+
+def iter_expiration_text_lines(classification, workers: int | None = None):
+  """Linhas do relatório de validade; os produtos de cada seção vêm em blocos de várias linhas,
+  formatados em paralelo quando workers > 1"""
+  today = classification.today
+  non_perishable_products = classification.non_perishable
+  sections = [
+      ("PRODUTOS VENCIDOS:", classification.expired, iter_expired_text_lines),
+      ("PRODUTOS VENCENDO EM ATÉ 7 DIAS:", classification.expiring_soon, iter_expiring_text_lines),
+      ("PRODUTOS VENCENDO EM ATÉ 30 DIAS:", classification.expiring_month, iter_expiring_text_lines),
+      ("PRODUTOS NÃO PERECÍVEIS:", non_perishable_products, iter_non_perishable_text_lines),
+  ]
+  
+  yield "RELATÓRIO DE CONTROLE DE VALIDADE"
+  yield f"Gerado em: {today.strftime('%d/%m/%Y')}"
+  yield "=" * 60
+  yield ""
+
+  yield f"RESUMO DO STATUS DOS PRODUTOS (EM LOTES):"
+  yield f"- Produtos vencidos: {len(classification.expired)}"
+  yield f"- Vencendo em até 7 dias: {len(classification.expiring_soon)}"
+  yield f"- Vencendo em até 30 dias: {len(classification.expiring_month)}"
+  yield f"- Produtos com validade adequada: {len(classification.valid)}"
+  yield f"- Produtos não perecíveis: {len(non_perishable_products)}"
+  yield ""
+  
+  for title, products, line_function in sections:
+      if products:
+          yield title
+          yield "-" * 40
+          yield from map_shards(products, partial(render_text_shard, line_function), workers)
+
+@instrumented
+def generate_expiration_text_report(compression: str | None = None, workers: int | None = None):
+  """Gera relatório de validade em arquivo TXT; com workers > 1, formata os produtos em paralelo
+  em vários processos (o arquivo gerado é o mesmo)"""
   inventory = repository.list_products()
   
   if not inventory:
       print("\nO estoque está vazio.")
       return
 
-  perishable_products = [p for p in inventory.values() if p.get_is_perishable()]
-  non_perishable_products = [p for p in inventory.values() if not p.get_is_perishable()]
-  
-  today = date.today()
-  products_by_status = {
-      'expired': [],
-      'expiring_soon': [],
-      'expiring_month': [],
-      'valid': []
-  }
-  
-  for product in perishable_products:
-      days_until_expiration = product.days_until_expiration()
-      
-      if days_until_expiration < 0:
-          products_by_status['expired'].append((product, abs(days_until_expiration)))
-      elif days_until_expiration <= 7:
-          products_by_status['expiring_soon'].append((product, days_until_expiration))
-      elif days_until_expiration <= 30:
-          products_by_status['expiring_month'].append((product, days_until_expiration))
-      else:
-          products_by_status['valid'].append((product, days_until_expiration))
-  
-  lines = []
-  lines.append("RELATÓRIO DE CONTROLE DE VALIDADE")
-  lines.append(f"Gerado em: {today.strftime('%d/%m/%Y')}")
-  lines.append("=" * 60)
-  lines.append("")
-
-  lines.append(f"RESUMO DO STATUS DOS PRODUTOS (EM LOTES):")
-  lines.append(f"- Produtos vencidos: {len(products_by_status['expired'])}")
-  lines.append(f"- Vencendo em até 7 dias: {len(products_by_status['expiring_soon'])}")
-  lines.append(f"- Vencendo em até 30 dias: {len(products_by_status['expiring_month'])}")
-  lines.append(f"- Produtos com validade adequada: {len(products_by_status['valid'])}")
-  lines.append(f"- Produtos não perecíveis: {len(non_perishable_products)}")
-  lines.append("")
-  
-  if products_by_status['expired']:
-      lines.append("PRODUTOS VENCIDOS:")
-      lines.append("-" * 40)
-      for product, days_expired in products_by_status['expired']:
-          lines.append(f"Nome: {product.get_name()}")
-          lines.append(f"Código: {product.get_barcode()}")
-          lines.append(f"Vencido há: {days_expired} dia(s)")
-          lines.append(f"Data de validade: {product.get_expiration_date()}")
-          lines.append(f"Quantidade: {product.get_quantity()}")
-          lines.append("")
-  
-  if products_by_status['expiring_soon']:
-      lines.append("PRODUTOS VENCENDO EM ATÉ 7 DIAS:")
-      lines.append("-" * 40)
-      for product, days_left in products_by_status['expiring_soon']:
-          lines.append(f"Nome: {product.get_name()}")
-          lines.append(f"Código: {product.get_barcode()}")
-          lines.append(f"Vence em: {days_left} dia(s)")
-          lines.append(f"Data de validade: {product.get_expiration_date()}")
-          lines.append(f"Quantidade: {product.get_quantity()}")
-          lines.append("")
-  
-  if products_by_status['expiring_month']:
-      lines.append("PRODUTOS VENCENDO EM ATÉ 30 DIAS:")
-      lines.append("-" * 40)
-      for product, days_left in products_by_status['expiring_month']:
-          lines.append(f"Nome: {product.get_name()}")
-          lines.append(f"Código: {product.get_barcode()}")
-          lines.append(f"Vence em: {days_left} dia(s)")
-          lines.append(f"Data de validade: {product.get_expiration_date()}")
-          lines.append(f"Quantidade: {product.get_quantity()}")
-          lines.append("")
-  
-  if non_perishable_products:
-      lines.append("PRODUTOS NÃO PERECÍVEIS:")
-      lines.append("-" * 40)
-      for product in non_perishable_products:
-          lines.append(f"Nome: {product.get_name()}")
-          lines.append(f"Código: {product.get_barcode()}")
-          lines.append(f"Quantidade: {product.get_quantity()}")
-          lines.append("")
-  
   timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-  filename = f"expiration_report_{timestamp}.txt"
+  file, filename = open_report(f"expiration_report_{timestamp}.txt", compression)
   
-  with open(filename, "w", encoding="utf-8") as f:
-      f.write("\n".join(lines))
+  with file:
+      LineWriter(file).write_all(iter_expiration_text_lines(repository.classify_expiration(), workers))
   
   print(f"Relatório de validade gerado: {filename}")
-
-def generate_expiration_csv_report():
-  """Gera relatório de validade em arquivo CSV"""
+  return filename
+
+CSV_EXPIRATION_STATUS = {
+  EXPIRED: "VENCIDO",
+  EXPIRING_SOON: "VENCE_EM_7_DIAS",
+  EXPIRING_MONTH: "VENCE_EM_30_DIAS",
+  VALID: "VALIDO",
+}
+
+EXPIRATION_CSV_HEADERS = ["Nome", "Codigo_Barras", "Marca", "Quantidade", "Tipo", "Data_Validade", "Status", "Dias_Para_Vencer"]
+
+def iter_perishable_csv_rows(entry: tuple[Product, int]):
+  product, days_until_expiration = entry
+  status = CSV_EXPIRATION_STATUS[classify_days(days_until_expiration)]
+  if days_until_expiration < 0:
+      days_display = f"Vencido há {abs(days_until_expiration)} dia(s)"
+  else:
+      days_display = f"{days_until_expiration} dia(s)"
+  
+  yield [
+      product.get_name(),
+      product.get_barcode(),
+      product.get_brand(),
+      product.get_quantity(),
+      "PERECIVEL",
+      product.get_expiration_date().strftime("%d/%m/%Y"),
+      status,
+      days_display
+  ]
+
+def iter_non_perishable_csv_rows(product: Product):
+  yield [
+      product.get_name(),
+      product.get_barcode(),
+      product.get_brand(),
+      product.get_quantity(),
+      "NAO_PERECIVEL",
+      "N/A",
+      "NAO_APLICAVEL",
+      "N/A"
+  ]
+
+def iter_expiration_csv_chunks(classification, workers: int | None = None):
+  """Linhas CSV dos perecíveis e depois dos não perecíveis, em blocos de texto já formatado"""
+  yield from map_shards(classification.perishable(), partial(render_csv_shard, iter_perishable_csv_rows), workers)
+  yield from map_shards(classification.non_perishable, partial(render_csv_shard, iter_non_perishable_csv_rows), workers)
+
+@instrumented
+def generate_expiration_csv_report(compression: str | None = None, workers: int | None = None):
+  """Gera relatório de validade em arquivo CSV; workers como em generate_expiration_text_report"""
   inventory = repository.list_products()
   
   if not inventory:
@@ -578,56 +617,20 @@ def generate_expiration_csv_report():
       return
   
   timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-  filename = f"expiration_report_{timestamp}.csv"
-  filepath = os.path.join(os.getcwd(), filename)
+  filepath = os.path.join(os.getcwd(), f"expiration_report_{timestamp}.csv")
 
-  headers = ["Nome", "Codigo_Barras", "Marca", "Quantidade", "Tipo", "Data_Validade", "Status", "Dias_Para_Vencer"]
-
-  with open(filepath, mode="w", newline="", encoding="utf-8") as file:
+  file, filepath = open_report(filepath, compression, newline="")
+  with file:
       writer = csv.writer(file)
-      writer.writerow(headers)
-
-      for product in inventory.values():
-          if product.get_is_perishable():
-              days_until_expiration = product.days_until_expiration()
-              
-              if days_until_expiration < 0:
-                  status = "VENCIDO"
-                  days_display = f"Vencido há {abs(days_until_expiration)} dia(s)"
-              elif days_until_expiration <= 7:
-                  status = "VENCE_EM_7_DIAS"
-                  days_display = f"{days_until_expiration} dia(s)"
-              elif days_until_expiration <= 30:
-                  status = "VENCE_EM_30_DIAS"
-                  days_display = f"{days_until_expiration} dia(s)"
-              else:
-                  status = "VALIDO"
-                  days_display = f"{days_until_expiration} dia(s)"
-              
-              writer.writerow([
-                  product.get_name(),
-                  product.get_barcode(),
-                  product.get_brand(),
-                  product.get_quantity(),
-                  "PERECIVEL",
-                  product.get_expiration_date().strftime("%d/%m/%Y"),
-                  status,
-                  days_display
-              ])
-          else:
-              writer.writerow([
-                  product.get_name(),
-                  product.get_barcode(),
-                  product.get_brand(),
-                  product.get_quantity(),
-                  "NAO_PERECIVEL",
-                  "N/A",
-                  "NAO_APLICAVEL",
-                  "N/A"
-              ])
+      writer.writerow(EXPIRATION_CSV_HEADERS)
+      for chunk in iter_expiration_csv_chunks(repository.classify_expiration(), workers):
+          file.write(chunk)
 
+  filename = os.path.basename(filepath)
   print(f"Relatório de validade gerado: {filename}")
+  return filename
 
+@instrumented
 def remove_expired_products():
   """Remove produtos vencidos do estoque"""
   inventory = repository.list_products()
@@ -636,7 +639,8 @@ def remove_expired_products():
       print("\nO estoque está vazio.")
       return
 
-  expired_products = [p for p in inventory.values() if p.get_is_perishable() and p.is_expired()]
+  today = date.today()
+  expired_products = repository.list_expired_products(today)
   
   if not expired_products:
       print("\nNão há produtos vencidos no estoque.")
@@ -644,7 +648,7 @@ def remove_expired_products():
   
   print("\nPRODUTOS VENCIDOS ENCONTRADOS:")
   for i, product in enumerate(expired_products, 1):
-      days_expired = abs(product.days_until_expiration())
+      days_expired = (today - product.get_expiration_date()).days
       print(f"{i}. {product.get_name()} (Código: {product.get_barcode()})")
       print(f"   Vencido há {days_expired} dia(s)")
       print(f"   Quantidade: {product.get_quantity()}")
@@ -653,15 +657,41 @@ def remove_expired_products():
   confirm = input("Deseja remover TODOS os produtos vencidos? (s/N): ").strip().lower()
   
   if confirm == 's' or confirm == 'sim':
-      removed_count = 0
-      for product in expired_products:
-          if repository.remove_product(product.get_id()):
-              removed_count += 1
+      removed_products = purge_expired_products(today)
       
-      print(f"\n{removed_count} produto(s) vencido(s) removido(s) do estoque.")
+      print(f"\n{len(removed_products)} produto(s) vencido(s) removido(s) do estoque.")
   else:
       print("\nOperação cancelada.")
 
+def ask_product_query() -> ProductQuery | None:
+  """Pergunta os critérios da busca combinada; Enter deixa o critério de fora"""
+  print("\nDeixe em branco os critérios que não quiser usar.")
+  name = safe_input("Nome contém: ", None)
+  brand = safe_input("Marca contém: ", None)
+  min_price = safe_input_number_optional("Preço mínimo: ", float, Validators.validate_positive_number, "Preço mínimo")
+  max_price = safe_input_number_optional("Preço máximo: ", float, Validators.validate_positive_number, "Preço máximo")
+  max_quantity = safe_input_number_optional("Quantidade em estoque menor que: ", int, Validators.validate_positive_integer, "Quantidade")
+  perishable = (safe_input("Perecível? (s/n): ", None) or "").lower()
+  expiring_before = safe_input_date_optional("Vencendo antes de (AAAA-MM-DD): ", "Data")
+
+  query = ProductQuery(
+    name=name or None,
+    brand=brand or None,
+    min_price=min_price,
+    max_price=max_price,
+    max_quantity=max_quantity,
+    is_perishable=True if perishable in ("s", "sim") else False if perishable in ("n", "não", "nao") else None,
+    expiring_before=expiring_before,
+  )
+  if not query.filters():
+    print("Nenhum critério informado.")
+    return None
+  if min_price is not None and max_price is not None and min_price > max_price:
+    print("Erro: Preço mínimo não pode ser maior que o máximo!")
+    return None
+  return query
+
+@instrumented
 def search_products():
   """Busca produtos por diferentes critérios"""
   print("\n========== Buscar Produtos ==========")
@@ -672,6 +702,7 @@ def search_products():
   print("5 - Listar produtos por faixa de preço")
   print("6 - Listar apenas produtos perecíveis")
   print("7 - Listar apenas produtos não perecíveis")
+  print("8 - Busca combinada (vários critérios ao mesmo tempo)")
   
   option = safe_input_number("Escolha uma opção: ", int)
   if option is None:
@@ -688,7 +719,7 @@ def search_products():
     barcode = safe_input("Digite o código de barras: ", Validators.validate_barcode)
     if barcode is None:
       return
-    product = repository.get_product_by_barcode(barcode)
+    product = find_product(barcode)
     if product:
       found_products = [product]
   
@@ -696,21 +727,19 @@ def search_products():
     name = safe_input("Digite parte do nome do produto: ", Validators.validate_non_empty_string, "Nome")
     if name is None:
       return
-    found_products = [p for p in inventory.values() 
-                     if name.lower() in p.get_name().lower()]
+    found_products = search_products_by_name(name)
   
   elif option == 3:
     brand = safe_input("Digite a marca: ", Validators.validate_non_empty_string, "Marca")
     if brand is None:
       return
-    found_products = [p for p in inventory.values() 
-                     if brand.lower() in p.get_brand().lower()]
+    found_products = search_products_by_brand(brand)
   
   elif option == 4:
     threshold = safe_input_number("Digite a quantidade mínima (padrão 5): ", int, Validators.validate_positive_integer, "Quantidade")
     if threshold is None:
       threshold = 5
-    found_products = [p for p in inventory.values() if p.get_quantity() < threshold]
+    found_products = repository.find_products(max_quantity=threshold)
     print(f"\nProdutos com menos de {threshold} itens em estoque:")
   
   elif option == 5:
@@ -725,17 +754,23 @@ def search_products():
       print("Erro: Preço mínimo não pode ser maior que o máximo!")
       return
     
-    found_products = [p for p in inventory.values() 
-                     if min_price <= p.get_price() <= max_price]
+    found_products = repository.find_products(min_price=min_price, max_price=max_price)
     print(f"\nProdutos na faixa de R$ {min_price:.2f} - R$ {max_price:.2f}:")
   
   elif option == 6:
-    found_products = [p for p in inventory.values() if p.get_is_perishable()]
+    found_products = repository.find_products(is_perishable=True)
     print("\nProdutos perecíveis:")
   
   elif option == 7:
-    found_products = [p for p in inventory.values() if not p.get_is_perishable()]
+    found_products = repository.find_products(is_perishable=False)
     print("\nProdutos não perecíveis:")
+
+  elif option == 8:
+    query = ask_product_query()
+    if query is None:
+      return
+    print(f"\n{repository.explain(query)}")
+    found_products = repository.query(query)
   
   else:
     print("Opção inválida!")
@@ -747,6 +782,8 @@ def search_products():
   
   print(f"\n{len(found_products)} produto(s) encontrado(s):")
   print("=" * 60)
+
+  today = date.today()
   
   for i, product in enumerate(found_products, 1):
     print(f"\n{i}. {product.get_name()}")
@@ -755,20 +792,63 @@ def search_products():
     print(f"   Preço: R$ {product.get_price():.2f}")
     print(f"   Quantidade: {product.get_quantity()}")
     
-    if product.get_is_perishable():
+    if product.get_is_perishable() and not product.get_expiration_date():
+      print("   Validade: não informada")
+    elif product.get_is_perishable():
       print(f"   Validade: {product.get_expiration_date().strftime('%d/%m/%Y')}")
       
-      days_until_expiration = product.days_until_expiration()
+      days_until_expiration = (product.get_expiration_date() - today).days
+      status = classify_days(days_until_expiration)
       
-      if days_until_expiration < 0:
+      if status == EXPIRED:
         print(f"   Status: ❌ VENCIDO há {abs(days_until_expiration)} dia(s)")
-      elif days_until_expiration <= 7:
+      elif status == EXPIRING_SOON:
         print(f"   Status: ⚠️  Vence em {days_until_expiration} dia(s)")
-      elif days_until_expiration <= 30:
+      elif status == EXPIRING_MONTH:
         print(f"   Status: 🟡 Vence em {days_until_expiration} dia(s)")
       else:
         print(f"   Status: ✅ Válido por {days_until_expiration} dia(s)")
     else:
       print(f"   Tipo: 📦 Produto não perecível")
   
-  print("=" * 60)
\ No newline at end of file
+  print("=" * 60)
+
+METRICS_TOP = 20
+
+def show_metrics():
+  """Mostra as funções mais custosas e permite ligar/desligar a coleta, exportar e zerar as métricas"""
+  print("\n========== Métricas de desempenho ==========")
+  print(f"Coleta: {'ligada' if metrics.enabled else 'desligada'}")
+
+  summary = metrics.summary()
+  if summary:
+    print(f"\n{'Função':<48}{'Chamadas':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Total s':>10}")
+    ranked = sorted(summary.items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+    for name, values in ranked[:METRICS_TOP]:
+      print(
+        f"{name:<48}{values['count']:>10}{values['p50_seconds'] * 1000:>10.3f}"
+        f"{values['p95_seconds'] * 1000:>10.3f}{values['p99_seconds'] * 1000:>10.3f}{values['total_seconds']:>10.3f}"
+      )
+  else:
+    print("Nenhuma chamada registrada.")
+
+  print("\n1 - Desligar a coleta" if metrics.enabled else "\n1 - Ligar a coleta")
+  print("2 - Exportar em formato Prometheus (texto)")
+  print("3 - Exportar em JSON")
+  print("4 - Zerar as métricas")
+  print("5 - Voltar")
+
+  option = safe_input_number("Escolha uma opção: ", int)
+  if option == 1:
+    metrics.enabled = not metrics.enabled
+    print(f"Coleta de métricas {'ligada' if metrics.enabled else 'desligada'}.")
+  elif option in (2, 3):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    extension = "prom" if option == 2 else "json"
+    filename = metrics.dump(f"metrics_{timestamp}.{extension}")
+    print(f"Métricas exportadas em '{filename}'")
+  elif option == 4:
+    metrics.reset()
+    print("Métricas zeradas.")
+  elif option not in (5, None):
+    print("Opção inválida!")
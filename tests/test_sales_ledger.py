@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+from uuid import uuid4
+from models import Product, Sale, SaleItem
+from repositories import SalesLedger, SalesRepository, JsonStorage
+from utils import ValidationError
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+NOW = datetime(2026, 3, 10, 15, 30)
+
+def make_product(price: float = 2.5) -> Product:
+  return Product(uuid4(), "Arroz", "Tipo 1", price, "Marca", 100, "7891000000017", NOW, NOW, False, None)
+
+def make_sale(product: Product, quantity: int, seller: str = "Ana", sale_date: datetime = NOW) -> Sale:
+  return Sale(seller_name=seller, buyer_cpf="52998224725", sale_date=sale_date, items=[SaleItem(product=product, quantity=quantity)])
+
+class SalesLedgerTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = lambda name: os.path.join(self.directory.name, name)
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def open_repository(self, ledger_filename: str | None = "sales.ledger") -> SalesRepository:
+    repository = SalesRepository(JsonStorage(self.path("inventory.json"), self.path("sales.json")))
+    repository.load_from_file(
+      journal_filename=self.path("sales.journal"),
+      ledger_filename=self.path(ledger_filename) if ledger_filename else None,
+    )
+    return repository
+
+  def test_units_by_day_reads_committed_records(self):
+    product = make_product()
+    ledger = SalesLedger(self.path("sales.ledger"))
+    ledger.append_sales([make_sale(product, 2), make_sale(product, 3, sale_date=datetime(2026, 3, 11))])
+    self.assertEqual(ledger.units_by_day(), {})
+    ledger.sync()
+    self.assertEqual(ledger.units_by_day(product.get_id()), {date(2026, 3, 10): 2, date(2026, 3, 11): 3})
+    self.assertEqual(ledger.units_by_day(product.get_id(), start=date(2026, 3, 11)), {date(2026, 3, 11): 3})
+    ledger.close()
+
+  @unittest.skipIf(numpy is None, "NumPy não instalado")
+  def test_as_numpy_matches_columns(self):
+    product = make_product(price=1.99)
+    ledger = SalesLedger(self.path("sales.ledger"))
+    ledger.append_sales([make_sale(product, 2), make_sale(product, 5, seller="Bia")])
+    ledger.sync()
+    with ledger.columns() as columns:
+      records = columns.as_numpy()
+      self.assertEqual(len(records), len(columns))
+      self.assertEqual(records["quantity"].tolist(), list(columns.quantity))
+      self.assertEqual(records["unit_price_cents"].tolist(), [199, 199])
+      self.assertEqual(records["seller_id"].tolist(), [ledger.seller_id("Ana"), ledger.seller_id("Bia")])
+      self.assertEqual(records["timestamp_us"].tolist(), list(columns.timestamp_us))
+      del records
+    ledger.close()
+
+  def test_load_appends_journaled_sales_missing_from_ledger(self):
+    product = make_product()
+    repository = self.open_repository()
+    repository.make_sale(make_sale(product, 1))
+    repository.flush()
+    # Queda depois do journal e antes do flush: as duas vendas não chegam ao ledger
+    repository.make_sale(make_sale(product, 2))
+    repository.make_sale(make_sale(product, 4))
+    repository.journal.sync()
+    self.assertEqual(len(repository.ledger), 1)
+
+    reopened = self.open_repository()
+    self.assertEqual(len(reopened.ledger), 3)
+    self.assertEqual(reopened.ledger.units_by_day(product.get_id()), {NOW.date(): 7})
+    reopened.close()
+
+    # Nada é acrescentado duas vezes ao reabrir de novo
+    again = self.open_repository()
+    self.assertEqual(len(again.ledger), 3)
+    again.close()
+    repository.close()
+
+  def test_rebuild_ledger_requires_ledger(self):
+    repository = self.open_repository(ledger_filename=None)
+    with self.assertRaises(ValidationError):
+      repository.rebuild_ledger()
+    repository.close()
+
+if __name__ == "__main__":
+  unittest.main()
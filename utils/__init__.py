@@ -1,6 +1,15 @@
 from .show_options_menu import show_options_menu, show_selling_options_menu
-from .serializations import custom_encoder, load_json, save_json
+from .serializations import (
+    custom_encoder, load_json, save_json, save_json_lines, save_records,
+    iter_json_records, iter_batches, atomic_open
+)
+from .journal import Journal, read_journal
+from .report_writer import open_report, LineWriter, COMPRESSION_EXTENSIONS
 from .validators import (
     ValidationError, Validators, safe_input, safe_input_number, 
-    safe_input_date, safe_input_yes_no, safe_input_date_optional
-)
\ No newline at end of file
+    safe_input_date, safe_input_yes_no, safe_input_date_optional, safe_input_number_optional,
+    BatchValidators, BatchValidationResult, validate_columns
+)
+from .autosave import AutoSaver
+from .metrics import Metrics, LatencyHistogram, metrics, instrumented, instrument_methods
+from .sharding import SHARD_SIZE, map_shards, parallel_supported, render_text_shard, render_csv_shard
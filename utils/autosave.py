@@ -0,0 +1,52 @@
+import sys
+import threading
+
+class AutoSaver:
+  """Thread em segundo plano que chama flush() dos repositórios a cada interval segundos, ou antes
+  disso quando algum deles acumula max_dirty alterações pendentes (avisadas via dirty_listener).
+
+  Os alvos são gravados na ordem informada (produtos antes das vendas, para que o backend de
+  vendas nunca referencie um produto ainda não gravado). stop() faz a gravação final.
+  """
+
+  def __init__(self, targets: list, interval: float = 2.0, max_dirty: int = 500):
+    self.targets = targets
+    self.interval = interval
+    self.max_dirty = max_dirty
+    self.__wake = threading.Event()
+    self.__stopping = False
+    self.__thread: threading.Thread | None = None
+
+  def start(self):
+    for target in self.targets:
+      target.dirty_listener = self.__on_dirty
+    self.__thread = threading.Thread(target=self.__run, name="autosave", daemon=True)
+    self.__thread.start()
+
+  def stop(self):
+    """Encerra a thread e grava o que ainda estiver pendente"""
+    self.__stopping = True
+    self.__wake.set()
+    if self.__thread:
+      self.__thread.join()
+      self.__thread = None
+    for target in self.targets:
+      target.dirty_listener = None
+    self.flush()
+
+  def flush(self) -> int:
+    return sum(target.flush() for target in self.targets)
+
+  def __on_dirty(self, count: int):
+    if count >= self.max_dirty:
+      self.__wake.set()
+
+  def __run(self):
+    while not self.__stopping:
+      self.__wake.wait(self.interval)
+      self.__wake.clear()
+      try:
+        self.flush()
+      except Exception as e:
+        # As alterações que falharam voltam a ser tentadas no próximo ciclo ou no flush final
+        print(f"\nErro no salvamento automático: {e}", file=sys.stderr)
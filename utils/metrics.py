@@ -0,0 +1,168 @@
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+from .serializations import atomic_open
+
+# Limites superiores dos baldes, em nanossegundos: 4 baldes por potência de 2 (erro relativo
+# dos percentis abaixo de 19%), de 1µs até ~18 minutos; o último balde pega o que passar disso
+BUCKET_BOUNDS_NS = [round(1000 * 2 ** (i / 4)) for i in range(4 * 30 + 1)]
+PERCENTILES = (0.5, 0.95, 0.99)
+PROMETHEUS_METRIC = "inventory_call_duration_seconds"
+
+class LatencyHistogram:
+  """Contagem de chamadas e histograma de latência com baldes logarítmicos fixos: registrar é
+  uma busca binária e alguns incrementos, e os percentis saem dos baldes sem guardar amostras"""
+
+  def __init__(self):
+    self.__lock = threading.Lock()
+    self.reset()
+
+  def reset(self):
+    with self.__lock:
+      self.count = 0
+      self.total_ns = 0
+      self.max_ns = 0
+      self.buckets = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+
+  def record(self, elapsed_ns: int):
+    index = bisect_left(BUCKET_BOUNDS_NS, elapsed_ns)
+    with self.__lock:
+      self.count += 1
+      self.total_ns += elapsed_ns
+      self.buckets[index] += 1
+      if elapsed_ns > self.max_ns:
+        self.max_ns = elapsed_ns
+
+  def percentile(self, fraction: float) -> float:
+    """Limite superior do balde que contém o percentil (em segundos), limitado ao máximo observado"""
+    with self.__lock:
+      if not self.count:
+        return 0.0
+      rank = max(1, math.ceil(fraction * self.count))
+      seen = 0
+      for index, bucket in enumerate(self.buckets):
+        seen += bucket
+        if seen >= rank:
+          bound = BUCKET_BOUNDS_NS[index] if index < len(BUCKET_BOUNDS_NS) else self.max_ns
+          return min(bound, self.max_ns) / 1e9
+    return self.max_ns / 1e9
+
+  def summary(self) -> dict:
+    with self.__lock:
+      count, total_ns, max_ns = self.count, self.total_ns, self.max_ns
+    summary = {
+      "count": count,
+      "total_seconds": total_ns / 1e9,
+      "mean_seconds": total_ns / count / 1e9 if count else 0.0,
+      "max_seconds": max_ns / 1e9,
+    }
+    for fraction in PERCENTILES:
+      summary[f"p{round(fraction * 100)}_seconds"] = self.percentile(fraction)
+    return summary
+
+class Metrics:
+  """Registro das latências das funções instrumentadas (veja instrumented). Desligado, o custo
+  de uma chamada instrumentada é só o teste de enabled; pode ser ligado e desligado a qualquer
+  momento, inclusive com outras threads em execução."""
+
+  def __init__(self, enabled: bool = False):
+    self.enabled = enabled
+    self.__histograms: dict[str, LatencyHistogram] = {}
+    self.__lock = threading.Lock()
+
+  def histogram(self, name: str) -> LatencyHistogram:
+    with self.__lock:
+      histogram = self.__histograms.get(name)
+      if histogram is None:
+        histogram = self.__histograms[name] = LatencyHistogram()
+      return histogram
+
+  def reset(self):
+    """Zera as contagens, mantendo os histogramas já ligados às funções instrumentadas"""
+    with self.__lock:
+      histograms = list(self.__histograms.values())
+    for histogram in histograms:
+      histogram.reset()
+
+  def summary(self) -> dict[str, dict]:
+    """Resumo das funções chamadas ao menos uma vez, em ordem de nome"""
+    with self.__lock:
+      histograms = sorted(self.__histograms.items())
+    return {name: histogram.summary() for name, histogram in histograms if histogram.count}
+
+  def to_json(self) -> str:
+    return json.dumps({"enabled": self.enabled, "functions": self.summary()}, indent=2, ensure_ascii=False)
+
+  def to_prometheus(self) -> str:
+    """Formato texto de exposição do Prometheus: um summary com os percentis por função"""
+    lines = [
+      "# HELP inventory_metrics_enabled Se a coleta de métricas está ligada",
+      "# TYPE inventory_metrics_enabled gauge",
+      f"inventory_metrics_enabled {int(self.enabled)}",
+      f"# HELP {PROMETHEUS_METRIC} Latência das chamadas instrumentadas",
+      f"# TYPE {PROMETHEUS_METRIC} summary",
+    ]
+    summary = self.summary()
+    for name, values in summary.items():
+      for fraction in PERCENTILES:
+        lines.append(f'{PROMETHEUS_METRIC}{{function="{name}",quantile="{fraction}"}} {values[f"p{round(fraction * 100)}_seconds"]:.9g}')
+      lines.append(f'{PROMETHEUS_METRIC}_sum{{function="{name}"}} {values["total_seconds"]:.9g}')
+      lines.append(f'{PROMETHEUS_METRIC}_count{{function="{name}"}} {values["count"]}')
+    lines.append(f"# HELP {PROMETHEUS_METRIC}_max Maior latência observada")
+    lines.append(f"# TYPE {PROMETHEUS_METRIC}_max gauge")
+    for name, values in summary.items():
+      lines.append(f'{PROMETHEUS_METRIC}_max{{function="{name}"}} {values["max_seconds"]:.9g}')
+    return "\n".join(lines) + "\n"
+
+  def dump(self, filename: str, format: str | None = None) -> str:
+    """Grava as métricas em filename; format é "json" ou "prometheus" (pelo padrão, deduzido da extensão)"""
+    format = format or ("json" if filename.endswith(".json") else "prometheus")
+    if format not in ("json", "prometheus"):
+      raise ValueError(f"Formato de métricas não suportado: {format}")
+    content = self.to_json() if format == "json" else self.to_prometheus()
+    with atomic_open(filename, "w", encoding="utf-8") as f:
+      f.write(content)
+    return filename
+
+metrics = Metrics(enabled=os.environ.get("INVENTORY_METRICS", "") not in ("", "0"))
+
+def instrumented(function: Callable) -> Callable:
+  """Mede cada chamada de function em metrics, com o nome "módulo.função" ou "Classe.método".
+  Funções geradoras não são medidas: a chamada só cria o gerador."""
+  if inspect.isgeneratorfunction(function):
+    return function
+  qualname = function.__qualname__
+  name = qualname if "." in qualname else f"{function.__module__.rsplit('.', 1)[-1]}.{qualname}"
+  histogram = metrics.histogram(name)
+
+  @functools.wraps(function)
+  def wrapper(*args, **kwargs):
+    if not metrics.enabled:
+      return function(*args, **kwargs)
+    start = time.perf_counter_ns()
+    try:
+      return function(*args, **kwargs)
+    finally:
+      histogram.record(time.perf_counter_ns() - start)
+  return wrapper
+
+def instrument_methods(cls: type | None = None, *, exclude: Iterable[str] = ()):
+  """Decorador de classe: instrumenta os métodos públicos (inclusive os estáticos) da classe,
+  menos os de exclude (auxiliares chamados por registro dentro de métodos já medidos, cujo
+  tempo seria contado duas vezes). Use como @instrument_methods ou @instrument_methods(exclude=...)."""
+  def decorate(cls: type) -> type:
+    for name, attribute in list(vars(cls).items()):
+      if name.startswith("_") or name in exclude:
+        continue
+      if isinstance(attribute, staticmethod):
+        setattr(cls, name, staticmethod(instrumented(attribute.__func__)))
+      elif inspect.isfunction(attribute):
+        setattr(cls, name, instrumented(attribute))
+    return cls
+  return decorate(cls) if cls is not None else decorate
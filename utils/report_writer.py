@@ -0,0 +1,36 @@
+import gzip
+import lzma
+from typing import Iterable, TextIO
+
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "lzma": ".xz"}
+BUFFER_SIZE = 1 << 16
+
+def open_report(filename: str, compression: str | None = None, newline: str | None = None) -> tuple[TextIO, str]:
+  """Abre um arquivo de relatório para escrita bufferizada, opcionalmente comprimido com gzip ou lzma.
+  Retorna o arquivo aberto e o nome efetivamente usado."""
+  if compression is None:
+    return open(filename, "w", encoding="utf-8", newline=newline, buffering=BUFFER_SIZE), filename
+  if compression not in COMPRESSION_EXTENSIONS:
+    raise ValueError(f"Compressão não suportada: {compression}")
+
+  filename += COMPRESSION_EXTENSIONS[compression]
+  opener = gzip.open if compression == "gzip" else lzma.open
+  return opener(filename, "wt", encoding="utf-8", newline=newline), filename
+
+class LineWriter:
+  """Escreve linhas separadas por '\\n', sem quebra após a última (equivalente a "\\n".join)"""
+
+  def __init__(self, file: TextIO):
+    self.file = file
+    self.__first = True
+
+  def write(self, line: str):
+    if self.__first:
+      self.__first = False
+    else:
+      self.file.write("\n")
+    self.file.write(line)
+
+  def write_all(self, lines: Iterable[str]):
+    for line in lines:
+      self.write(line)
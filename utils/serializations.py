@@ -1,4 +1,6 @@
 import json
+import os
+from contextlib import contextmanager
 from datetime import datetime, date
 
 def custom_encoder(obj):
@@ -8,8 +10,35 @@ def custom_encoder(obj):
     return obj.__dict__
   return str(obj)
 
+@contextmanager
+def atomic_open(filename, mode="w", **kwargs):
+  """Grava em um arquivo temporário ao lado de filename e, só se tudo der certo, faz fsync e o
+  renomeia por cima do destino: uma gravação interrompida nunca deixa o arquivo pela metade"""
+  temp_filename = f"{filename}.tmp"
+  try:
+    with open(temp_filename, mode, **kwargs) as f:
+      yield f
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(temp_filename, filename)
+  except BaseException:
+    if os.path.exists(temp_filename):
+      os.remove(temp_filename)
+    raise
+  sync_directory(os.path.dirname(os.path.abspath(filename)))
+
+def sync_directory(directory):
+  """Garante que a renomeação chegou ao disco (sem efeito em sistemas sem O_DIRECTORY)"""
+  if not hasattr(os, "O_DIRECTORY"):
+    return
+  fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+  try:
+    os.fsync(fd)
+  finally:
+    os.close(fd)
+
 def save_json(data, filename):
-  with open(filename, "w", encoding="utf-8") as f:
+  with atomic_open(filename, "w", encoding="utf-8") as f:
     json.dump(data, f, ensure_ascii=False, indent=2, default=custom_encoder)
 
 def load_json(filename):
@@ -18,3 +47,69 @@ def load_json(filename):
       return json.load(f)
   except FileNotFoundError:
     return None
+
+def save_json_lines(records, filename):
+  with atomic_open(filename, "w", encoding="utf-8") as f:
+    for record in records:
+      f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=custom_encoder))
+      f.write("\n")
+
+def save_records(records, filename):
+  """Grava os registros como array JSON ou, para arquivos .jsonl, como JSON Lines"""
+  if filename.endswith(".jsonl"):
+    save_json_lines(records, filename)
+  else:
+    save_json(records, filename)
+
+def iter_json_records(filename, read_size=1 << 16):
+  """Lê incrementalmente os registros de um array JSON ou de um arquivo JSON Lines,
+  sem carregar o arquivo inteiro na memória"""
+  try:
+    f = open(filename, "r", encoding="utf-8")
+  except FileNotFoundError:
+    return
+
+  with f:
+    decoder = json.JSONDecoder()
+    buffer = f.read(read_size)
+    pos = 0
+    while pos < len(buffer) and buffer[pos].isspace():
+      pos += 1
+    is_array = buffer[pos:pos + 1] == "["
+    if is_array:
+      pos += 1
+    separators = " \t\r\n," if is_array else " \t\r\n"
+
+    while True:
+      while pos < len(buffer) and buffer[pos] in separators:
+        pos += 1
+      if pos == len(buffer):
+        chunk = f.read(read_size)
+        if not chunk:
+          return
+        buffer, pos = chunk, 0
+        continue
+      if is_array and buffer[pos] == "]":
+        return
+
+      try:
+        record, end = decoder.raw_decode(buffer, pos)
+      except json.JSONDecodeError:
+        chunk = f.read(read_size)
+        if not chunk:
+          raise
+        buffer, pos = buffer[pos:] + chunk, 0
+        continue
+
+      yield record
+      pos = end
+
+def iter_batches(iterable, batch_size):
+  batch = []
+  for item in iterable:
+    batch.append(item)
+    if len(batch) >= batch_size:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
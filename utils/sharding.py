@@ -0,0 +1,61 @@
+import csv
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+SHARD_SIZE = 10000
+
+# Itens do map_shards que criou o processo filho, definidos pelo initializer do pool (só nos
+# filhos): com fork, os argumentos do initializer são herdados em vez de serializados, e cada
+# tarefa leva só os limites da sua fatia. O processo pai nunca o altera, então chamadas
+# simultâneas de map_shards (em threads diferentes) não trocam as entradas umas das outras.
+_worker_items: list = []
+
+def parallel_supported() -> bool:
+  """Os processos do map_shards dependem do fork (Linux e afins); sem ele tudo roda em série"""
+  return "fork" in multiprocessing.get_all_start_methods()
+
+def shard_bounds(count: int, shard_size: int = SHARD_SIZE) -> list[tuple[int, int]]:
+  return [(start, min(start + shard_size, count)) for start in range(0, count, shard_size)]
+
+def _init_worker(items: list):
+  global _worker_items
+  _worker_items = items
+
+def _run_shard(function: Callable[[list], T], start: int, stop: int) -> T:
+  return function(_worker_items[start:stop])
+
+def map_shards(items: list, function: Callable[[list], T], workers: int | None = None, shard_size: int = SHARD_SIZE) -> Iterator[T]:
+  """Aplica function a fatias consecutivas de items e devolve os resultados na ordem das fatias.
+
+  Com workers > 1 as fatias são processadas por um ProcessPoolExecutor; senão, aqui mesmo, uma
+  após a outra. As fatias dependem só de len(items) e shard_size, nunca de workers, então quem
+  combina os resultados na ordem recebida obtém o mesmo resultado nos dois modos. function
+  precisa ser definida no nível de um módulo (ou ser um functools.partial de uma), e não deve
+  usar locks nem gravar nada: os filhos são cópias do processo no momento do fork.
+  """
+  bounds = shard_bounds(len(items), shard_size)
+  if not workers or workers <= 1 or len(bounds) < 2 or not parallel_supported():
+    for start, stop in bounds:
+      yield function(items[start:stop])
+    return
+
+  context = multiprocessing.get_context("fork")
+  with ProcessPoolExecutor(
+    min(workers, len(bounds)), mp_context=context, initializer=_init_worker, initargs=(items,)
+  ) as executor:
+    starts, stops = zip(*bounds)
+    yield from executor.map(_run_shard, repeat(function), starts, stops)
+
+def render_text_shard(line_function: Callable[[object], Iterable[str]], items: list) -> str:
+  """Linhas de todos os itens da fatia unidas por "\\n" (para LineWriter.write, que põe o "\\n" entre as fatias)"""
+  return "\n".join(line for item in items for line in line_function(item))
+
+def render_csv_shard(row_function: Callable[[object], Iterable[list]], items: list) -> str:
+  """Linhas CSV de todos os itens da fatia, como o csv.writer as gravaria no arquivo"""
+  buffer = io.StringIO()
+  csv.writer(buffer).writerows(row for item in items for row in row_function(item))
+  return buffer.getvalue()
@@ -13,7 +13,8 @@ def show_options_menu():
   print("11 - Gerar relatório de validade em txt")
   print("12 - Gerar relatório de validade em csv")
   print("13 - Remover produtos vencidos")
-  print("14 - Sair")
+  print("14 - Métricas de desempenho")
+  print("15 - Sair")
 
 def show_selling_options_menu():
   print("\n========== Escolha uma das opções abaixo ==========")
@@ -1,6 +1,39 @@
 import re
 from datetime import date, datetime
-from typing import Optional, Union
+from typing import Callable, Optional, Union
+
+NAME_PATTERN = re.compile(r'[a-zA-Z0-9\sÀ-ÿ\-\.\,\(\)]+')
+BRAND_PATTERN = re.compile(r'[a-zA-Z0-9\sÀ-ÿ\-\.\&]+')
+SELLER_NAME_PATTERN = re.compile(r'[a-zA-ZÀ-ÿ\s]+')
+NON_DIGITS_PATTERN = re.compile(r'[^0-9]')
+
+def _cpf_weight_tables(first_weight: int) -> tuple[list[int], ...]:
+    """Uma tabela por posição do CPF com dígito * peso, indexada pelo código ASCII do dígito"""
+    return tuple([0] * 48 + [digit * weight for digit in range(10)] for weight in range(first_weight, 1, -1))
+
+CPF_DIGIT_TABLES = _cpf_weight_tables(10)
+CPF_CHECK_DIGITS = tuple(0 if remainder < 2 else 11 - remainder for remainder in range(11))
+
+def cpf_error(cpf: str) -> Optional[str]:
+    """Confere um CPF já reduzido aos dígitos; retorna a mensagem de erro ou None se for válido"""
+    if len(cpf) != 11:
+        return "CPF deve ter 11 dígitos"
+
+    if cpf == cpf[0] * 11:
+        return "CPF inválido"
+
+    # Os pesos do segundo dígito são os do primeiro + 1, então sua soma reaproveita a primeira
+    digits = cpf.encode("ascii")
+    weighted_sum = sum(map(list.__getitem__, CPF_DIGIT_TABLES, digits))
+    first_digit = digits[9] - 48
+    if first_digit != CPF_CHECK_DIGITS[weighted_sum % 11]:
+        return "CPF inválido - primeiro dígito verificador"
+
+    weighted_sum += sum(digits[:9]) - 48 * 9 + 2 * first_digit
+    if digits[10] - 48 != CPF_CHECK_DIGITS[weighted_sum % 11]:
+        return "CPF inválido - segundo dígito verificador"
+
+    return None
 
 class ValidationError(Exception):
     """Exceção customizada para erros de validação"""
@@ -70,26 +103,11 @@ class Validators:
         """Valida formato e dígitos verificadores do CPF"""
         cpf = Validators.validate_non_empty_string(cpf, "CPF")
 
-        cpf = re.sub(r'[^0-9]', '', cpf)
-
-        if len(cpf) != 11:
-            raise ValidationError("CPF deve ter 11 dígitos")
-
-        if cpf == cpf[0] * 11:
-            raise ValidationError("CPF inválido")
-
-        def calculate_digit(cpf_digits, position):
-            sum_result = sum(int(digit) * weight for digit, weight in zip(cpf_digits, range(position, 1, -1)))
-            remainder = sum_result % 11
-            return 0 if remainder < 2 else 11 - remainder
+        cpf = NON_DIGITS_PATTERN.sub('', cpf)
 
-        first_digit = calculate_digit(cpf[:9], 10)
-        if int(cpf[9]) != first_digit:
-            raise ValidationError("CPF inválido - primeiro dígito verificador")
-
-        second_digit = calculate_digit(cpf[:10], 11)
-        if int(cpf[10]) != second_digit:
-            raise ValidationError("CPF inválido - segundo dígito verificador")
+        error = cpf_error(cpf)
+        if error:
+            raise ValidationError(error)
         
         return cpf
     
@@ -137,7 +155,7 @@ class Validators:
         if len(name) > 100:
             raise ValidationError("Nome deve ter no máximo 100 caracteres")
 
-        if not re.match(r'^[a-zA-Z0-9\sÀ-ÿ\-\.\,\(\)]+$', name):
+        if not NAME_PATTERN.fullmatch(name):
             raise ValidationError("Nome contém caracteres inválidos")
         
         return name.title()  # Capitaliza o nome
@@ -163,7 +181,7 @@ class Validators:
         if len(brand) > 50:
             raise ValidationError("Marca deve ter no máximo 50 caracteres")
 
-        if not re.match(r'^[a-zA-Z0-9\sÀ-ÿ\-\.\&]+$', brand):
+        if not BRAND_PATTERN.fullmatch(brand):
             raise ValidationError("Marca contém caracteres inválidos")
         
         return brand.title() 
@@ -179,7 +197,7 @@ class Validators:
         if len(name) > 100:
             raise ValidationError("Nome do vendedor deve ter no máximo 100 caracteres")
 
-        if not re.match(r'^[a-zA-ZÀ-ÿ\s]+$', name):
+        if not SELLER_NAME_PATTERN.fullmatch(name):
             raise ValidationError("Nome do vendedor deve conter apenas letras e espaços")
         
         return name.title()
@@ -194,6 +212,186 @@ class Validators:
         
         return requested_quantity
 
+BatchRule = Callable[[list], tuple[list, dict[int, str]]]
+
+class BatchValidationResult:
+    """Valores normalizados por coluna (None nas linhas rejeitadas) e o primeiro erro de cada linha"""
+
+    def __init__(self, values: dict[str, list], errors: dict[int, str]):
+        self.values = values
+        self.errors = errors
+
+    def is_valid(self, row: int) -> bool:
+        return row not in self.errors
+
+def validate_columns(columns: dict[str, list], rules: dict[str, BatchRule]) -> BatchValidationResult:
+    """Aplica cada regra à sua coluna inteira; as linhas inválidas são reportadas sem lançar exceção.
+
+    As regras são avaliadas na ordem do dicionário e cada linha guarda apenas o primeiro erro,
+    como aconteceria validando campo a campo com Validators.
+    """
+    values, errors = {}, {}
+    for column, rule in rules.items():
+        values[column], column_errors = rule(columns[column])
+        for row, message in column_errors.items():
+            errors.setdefault(row, message)
+    return BatchValidationResult(values, errors)
+
+def _text_rule(field_name: str, max_length: int, pattern=None, invalid_message: str = "", min_length: int = 1, title: bool = False) -> BatchRule:
+    def rule(values: list) -> tuple[list, dict[int, str]]:
+        fullmatch = pattern.fullmatch if pattern else None
+        results, errors = [], {}
+        for row, value in enumerate(values):
+            if not isinstance(value, str):
+                error = f"{field_name} deve ser uma string"
+            else:
+                value = value.strip()
+                if not value:
+                    error = f"{field_name} não pode estar vazio"
+                elif len(value) < min_length:
+                    error = f"{field_name} deve ter pelo menos {min_length} caracteres"
+                elif len(value) > max_length:
+                    error = f"{field_name} deve ter no máximo {max_length} caracteres"
+                elif fullmatch and not fullmatch(value):
+                    error = invalid_message
+                else:
+                    results.append(value.title() if title else value)
+                    continue
+            errors[row] = error
+            results.append(None)
+        return results, errors
+    return rule
+
+class BatchValidators:
+    """Versões em lote das regras de Validators: recebem a coluna inteira e devolvem (valores, erros por linha).
+
+    As mensagens são as mesmas da validação campo a campo.
+    """
+
+    names = staticmethod(_text_rule("Nome", 100, NAME_PATTERN, "Nome contém caracteres inválidos", min_length=2, title=True))
+    descriptions = staticmethod(_text_rule("Descrição", 500))
+    brands = staticmethod(_text_rule("Marca", 50, BRAND_PATTERN, "Marca contém caracteres inválidos", min_length=2, title=True))
+    seller_names = staticmethod(_text_rule(
+        "Nome do vendedor", 100, SELLER_NAME_PATTERN, "Nome do vendedor deve conter apenas letras e espaços",
+        min_length=2, title=True
+    ))
+
+    @staticmethod
+    def barcodes(values: list) -> tuple[list, dict[int, str]]:
+        results, errors = [], {}
+        for row, value in enumerate(values):
+            if not isinstance(value, str):
+                errors[row] = "Código de barras deve ser uma string"
+            elif not value.strip():
+                errors[row] = "Código de barras não pode estar vazio"
+            else:
+                value = value.strip().replace(" ", "")
+                if value.isdigit():
+                    results.append(value)
+                    continue
+                errors[row] = "Código de barras deve conter apenas números"
+            results.append(None)
+        return results, errors
+
+    @staticmethod
+    def cpfs(values: list) -> tuple[list, dict[int, str]]:
+        results, errors = [], {}
+        sub = NON_DIGITS_PATTERN.sub
+        for row, value in enumerate(values):
+            if not isinstance(value, str):
+                error = "CPF deve ser uma string"
+            elif not value.strip():
+                error = "CPF não pode estar vazio"
+            else:
+                if not (value.isascii() and value.isdigit()):
+                    value = sub('', value)
+                error = cpf_error(value)
+                if error is None:
+                    results.append(value)
+                    continue
+            errors[row] = error
+            results.append(None)
+        return results, errors
+
+    @staticmethod
+    def prices(values: list) -> tuple[list, dict[int, str]]:
+        """Preços como número ou texto (arquivos de importação trazem tudo como texto)"""
+        results, errors = [], {}
+        for row, value in enumerate(values):
+            try:
+                price = float(value) if isinstance(value, (str, int, float)) and not isinstance(value, bool) else None
+            except ValueError:
+                price = None
+            if price is None or price != price:
+                error = "Preço deve ser um número"
+            elif price <= 0:
+                error = "Preço deve ser maior que zero"
+            elif round(price, 2) != price:
+                error = "Preço deve ter no máximo 2 casas decimais"
+            elif price > 999999.99:
+                error = "Preço não pode ser maior que R$ 999.999,99"
+            else:
+                results.append(price)
+                continue
+            errors[row] = error
+            results.append(None)
+        return results, errors
+
+    @staticmethod
+    def non_negative_integers(field_name: str) -> BatchRule:
+        """Inteiros como número ou texto; bool e float não são aceitos"""
+        def rule(values: list) -> tuple[list, dict[int, str]]:
+            results, errors = [], {}
+            for row, value in enumerate(values):
+                if value.__class__ is int:
+                    number = value
+                else:
+                    try:
+                        number = int(value) if isinstance(value, str) else None
+                    except ValueError:
+                        number = None
+                if number is None:
+                    error = f"{field_name} deve ser um número inteiro"
+                elif number < 0:
+                    error = f"{field_name} não pode ser negativo"
+                else:
+                    results.append(number)
+                    continue
+                errors[row] = error
+                results.append(None)
+            return results, errors
+        return rule
+
+    @staticmethod
+    def dates(field_name: str, not_before: Optional[date] = None, optional: bool = False) -> BatchRule:
+        """Datas AAAA-MM-DD; com optional, None é aceito e vira None (ex.: validade de não perecíveis)"""
+        def rule(values: list) -> tuple[list, dict[int, str]]:
+            results, errors = [], {}
+            for row, value in enumerate(values):
+                if value is None and optional:
+                    results.append(None)
+                    continue
+                if isinstance(value, date):
+                    parsed = value
+                elif not isinstance(value, str):
+                    parsed, error = None, f"{field_name} deve ser uma string"
+                elif not value.strip():
+                    parsed, error = None, f"{field_name} não pode estar vazio"
+                else:
+                    try:
+                        parsed = date.fromisoformat(value.strip())
+                    except ValueError:
+                        parsed, error = None, f"{field_name} deve estar no formato AAAA-MM-DD"
+                if parsed is not None:
+                    if not_before is None or parsed >= not_before:
+                        results.append(parsed)
+                        continue
+                    error = f"{field_name} não pode ser anterior à data atual"
+                errors[row] = error
+                results.append(None)
+            return results, errors
+        return rule
+
 def safe_input(prompt: str, validator_func, *args):
     """Função helper para entrada segura de dados com validação"""
     while True:
@@ -230,6 +428,28 @@ def safe_input_number(prompt: str, number_type=float, validator_func=None, *args
         except Exception as e:
             print(f"Erro inesperado: {e}")
 
+def safe_input_number_optional(prompt: str, number_type=float, validator_func=None, *args):
+    """Função helper para entrada segura de números opcionais"""
+    while True:
+        try:
+            user_input = input(prompt).strip()
+            if not user_input:
+                return None
+            number_value = number_type(user_input)
+            if validator_func:
+                return validator_func(number_value, *args)
+            return number_value
+        except ValueError:
+            type_name = "número inteiro" if number_type == int else "número"
+            print(f"Erro: Digite um {type_name} válido")
+        except ValidationError as e:
+            print(f"Erro: {e}")
+        except KeyboardInterrupt:
+            print("\nOperação cancelada pelo usuário")
+            return None
+        except Exception as e:
+            print(f"Erro inesperado: {e}")
+
 def safe_input_date(prompt: str, field_name: str, validate_future=False):
     """Função helper para entrada segura de datas"""
     while True: